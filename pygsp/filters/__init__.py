@@ -16,9 +16,11 @@ The :class:`Filter` base class implements a common interface to all filters:
 
     Filter.evaluate
     Filter.filter
+    Filter.filter_stream
     Filter.analyze
     Filter.synthesize
     Filter.compute_frame
+    Filter.as_linear_operator
     Filter.estimate_frame_bounds
     Filter.plot
     Filter.localize
@@ -56,6 +58,14 @@ Then, derived classes implement various common graph filters.
     Heat
     Expwin
 
+**Joint time-vertex filters**
+
+.. autosummary::
+
+    TimeVertexFilter
+    TimeVertexFilter.evaluate
+    TimeVertexFilter.filter
+
 Approximations
 --------------
 
@@ -100,6 +110,7 @@ _FILTERS = [
     'Regular',
     'Simoncelli',
     'SimpleTight',
+    'TimeVertexFilter',
 ]
 _APPROXIMATIONS = [
     'compute_cheby_coeff',
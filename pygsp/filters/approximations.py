@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 
 import numpy as np
-from scipy import sparse
+from scipy import sparse, fft
 
 from pygsp import utils
 
@@ -40,19 +40,45 @@ def compute_cheby_coeff(f, m=30, N=None, *args, **kwargs):
     if not N:
         N = m + 1
 
-    a_arange = [0, G.lmax]
+    x = _cheby_nodes(G.lmax, N)
+    y = np.broadcast_to(f._kernels[i](x), x.shape)
+    return _cheby_coeff(y, m)
 
-    a1 = (a_arange[1] - a_arange[0]) / 2
-    a2 = (a_arange[1] + a_arange[0]) / 2
-    c = np.zeros(m + 1)
 
-    tmpN = np.arange(N)
-    num = np.cos(np.pi * (tmpN + 0.5) / N)
-    for o in range(m + 1):
-        c[o] = 2. / N * np.dot(f._kernels[i](a1 * num + a2),
-                               np.cos(np.pi * o * (tmpN + 0.5) / N))
+def _cheby_nodes(lmax, N):
+    r"""Chebyshev nodes of the first kind, mapped from [-1, 1] to [0, lmax]."""
+    x = np.cos(np.pi * (np.arange(N) + 0.5) / N)
+    return lmax / 2. * (x + 1)
 
-    return c
+
+def _cheby_coeff(y, m):
+    r"""
+    Chebyshev coefficients from samples at the Chebyshev nodes.
+
+    The quadrature over the N nodes is a type-II discrete cosine transform,
+    computed at once for all the rows of y.
+
+    Parameters
+    ----------
+    y : ndarray
+        Function samples at the N nodes given by :func:`_cheby_nodes`, along
+        the last dimension.
+    m : int
+        Maximum order of the coefficients.
+
+    Returns
+    -------
+    c : ndarray
+        Coefficients of orders 0 to m, along the last dimension.
+
+    """
+    N = y.shape[-1]
+    if m < N:
+        return fft.dct(y, type=2, axis=-1)[..., :m + 1] / N
+    else:
+        # More coefficients than nodes: those are aliased.
+        T = np.cos(np.pi * np.outer(np.arange(N) + 0.5, np.arange(m + 1)) / N)
+        return 2. / N * np.dot(y, T)
 
 
 def cheby_op(G, c, signal, **kwargs):
@@ -83,33 +109,174 @@ def cheby_op(G, c, signal, **kwargs):
     if M < 2:
         raise TypeError("The coefficients have an invalid shape")
 
-    # thanks to that, we can also have 1d signal.
-    try:
-        Nv = np.shape(signal)[1]
-        r = np.zeros((G.N * Nscales, Nv))
-    except IndexError:
-        r = np.zeros((G.N * Nscales))
+    signal = np.asarray(signal)
+    is1d = (signal.ndim == 1)
+    if is1d:
+        signal = signal[:, np.newaxis]
+
+    r = _cheby_filter(G, c, signal[:, :, np.newaxis])
 
-    a_arange = [0, G.lmax]
+    # Stack the filtered signals of each scale along the first dimension.
+    r = r.transpose(2, 0, 1).reshape(Nscales * G.N, -1)
+    return r[:, 0] if is1d else r
+
+
+def _buffer(buffers, name, shape, dtype):
+    r"""Empty array, reusing the memory of ``buffers[name]`` if possible."""
+    if buffers is None:
+        return np.empty(shape, dtype)
+    size = int(np.prod(shape))
+    b = buffers.get(name)
+    if b is None or b.dtype != dtype or b.size < size:
+        b = buffers[name] = np.empty(size, dtype)
+    return b[:size].reshape(shape)
+
+
+def _cheby_filter(G, c, s, buffers=None):
+    r"""
+    Apply a bank of Chebyshev polynomials of the Laplacian to a block of
+    signals (analysis or synthesis).
+
+    A single three-term recurrence is run on all the signals and features at
+    once, with the scaled Laplacian cached by the graph. Each order then
+    contributes to the output through one contraction with the coefficient
+    matrix, which maps 1 input feature to all the filters (analysis) or all
+    the filters to 1 output feature (synthesis). Synthesis with a bank of
+    ``n_filters`` filters thus costs ``order`` block products instead of
+    ``n_filters * order`` products.
+
+    Parameters
+    ----------
+    G : Graph
+    c : ndarray
+        Chebyshev coefficients, of shape ``(n_filters, order + 1)``.
+    s : ndarray
+        Signals, of shape ``(G.N, n_signals, n_features_in)``, where
+        ``n_features_in`` is either 1 (analysis) or ``n_filters``
+        (synthesis).
+    buffers : dict, optional
+        Storage of the recurrence state. The buffers are allocated on the
+        first call and reused by later calls with as many or fewer signals.
+
+    Returns
+    -------
+    r : ndarray
+        Filtered signals, of shape ``(G.N, n_signals, n_features_out)``, where
+        ``n_features_out`` is either ``n_filters`` (analysis) or 1
+        (synthesis).
 
-    a1 = float(a_arange[1] - a_arange[0]) / 2.
-    a2 = float(a_arange[1] + a_arange[0]) / 2.
+    """
+    c = np.atleast_2d(c)
+    n_nodes, n_signals, n_features_in = s.shape
+
+    # One coefficient matrix of shape (n_features_in, n_features_out) per
+    # order.
+    if n_features_in == 1:
+        c = c.T[:, np.newaxis, :]
+    else:
+        c = c.T[:, :, np.newaxis]
+    n_features_out = c.shape[2]
+
+    L = G._scaled_laplacian()
+
+    # Computations are done in the type of the graph (or of the signal if
+    # more precise or complex). The real coefficients must not upcast them.
+    dtype = utils._signal_dtype(s, L.dtype)
+    c = c.astype(np.finfo(dtype).dtype, copy=False)
+
+    # Recurrence state: T_{k-1}(L) s and T_k(L) s. Both buffers are updated
+    # in place, such that the only allocation per order is the result of the
+    # sparse matrix product.
+    shape = (n_nodes, n_signals * n_features_in)
+    T_old = _buffer(buffers, 'T_old', shape, dtype)
+    T_cur = _buffer(buffers, 'T_cur', shape, dtype)
+    T_old[:] = s.reshape(shape)
+    T_cur[:] = L.dot(T_old)
+
+    # Contribution of an order to the output.
+    shape = (n_nodes * n_signals, n_features_out)
+    term = _buffer(buffers, 'term', shape, dtype)
+
+    r = T_old.reshape(-1, n_features_in).dot(c[0] / 2.)
+    r += np.dot(T_cur.reshape(-1, n_features_in), c[1], out=term)
+
+    for k in range(2, c.shape[0]):
+        # T_k = 2 L T_{k-1} - T_{k-2}, computed in the buffer of T_{k-2}.
+        T_old *= -0.5
+        T_old += L.dot(T_cur)
+        T_old *= 2
+        T_old, T_cur = T_cur, T_old
+        r += np.dot(T_cur.reshape(-1, n_features_in), c[k], out=term)
+
+    return r.reshape(n_nodes, n_signals, n_features_out)
+
+
+def _cheby_filter_joint(G, c, s):
+    r"""
+    Apply Chebyshev polynomials of the Laplacian whose coefficients vary with
+    the columns of the signals.
 
-    twf_old = signal
-    twf_cur = (G.L.dot(signal) - a2 * signal) / a1
+    That is the graph part of a joint time-vertex filter, where each temporal
+    frequency (column) has its own graph filter. A single three-term
+    recurrence is run on all the columns and signals at once, and each order
+    contributes to each column with its own coefficients.
 
-    tmpN = np.arange(G.N, dtype=int)
-    for i in range(Nscales):
-        r[tmpN + G.N*i] = 0.5 * c[i, 0] * twf_old + c[i, 1] * twf_cur
+    Parameters
+    ----------
+    G : Graph
+    c : ndarray
+        Chebyshev coefficients, of shape ``(n_filters, n_columns, order +
+        1)``.
+    s : ndarray
+        Signals, of shape ``(G.N, n_columns, n_signals)``.
 
-    factor = 2/a1 * (G.L - a2 * sparse.eye(G.N))
-    for k in range(2, M):
-        twf_new = factor.dot(twf_cur) - twf_old
-        for i in range(Nscales):
-            r[tmpN + G.N*i] += c[i, k] * twf_new
+    Returns
+    -------
+    r : ndarray
+        Filtered signals, of shape ``(G.N, n_columns, n_signals,
+        n_filters)``.
 
-        twf_old = twf_cur
-        twf_cur = twf_new
+    """
+    n_nodes, n_columns, n_signals = s.shape
+
+    # One coefficient array of shape (n_columns, 1, n_filters) per order,
+    # broadcast over the nodes and signals.
+    c = np.transpose(c, (2, 1, 0))[:, :, np.newaxis, :]
+
+    L = G._scaled_laplacian()
+
+    # Coefficients in the precision of the computations, complex if the
+    # kernels are.
+    dtype = utils._signal_dtype(s, L.dtype)
+    precision = np.finfo(dtype).dtype
+    if np.iscomplexobj(c):
+        precision = np.result_type(precision, np.complex64)
+    c = c.astype(precision, copy=False)
+
+    def dot(T):
+        if (np.iscomplexobj(T) and
+                not np.issubdtype(L.dtype, np.complexfloating)):
+            # A real matrix multiplies the real and imaginary parts faster
+            # when they are seen as twice as many real columns.
+            T = L.dot(T.view(np.finfo(dtype).dtype))
+            return np.ascontiguousarray(T).view(dtype)
+        return L.dot(T)
+
+    T_old = np.array(s.reshape(n_nodes, -1), dtype=dtype)
+    T_cur = dot(T_old)
+
+    def term(T, c):
+        return T.reshape(s.shape)[..., np.newaxis] * c
+
+    r = term(T_old, c[0] / 2.)
+    r += term(T_cur, c[1])
+
+    for k in range(2, c.shape[0]):
+        T_old *= -0.5
+        T_old += dot(T_cur)
+        T_old *= 2
+        T_old, T_cur = T_cur, T_old
+        r += term(T_cur, c[k])
 
     return r
 
@@ -222,7 +389,7 @@ def compute_jackson_cheby_coeff(filter_bounds, delta_lambda, m):
     return ch, jch
 
 
-def lanczos_op(f, s, order=30):
+def lanczos_op(f, s, order=30, reorthogonalization='partial'):
     r"""
     Perform the lanczos approximation of the signal s.
 
@@ -233,6 +400,8 @@ def lanczos_op(f, s, order=30):
         Signal to approximate.
     order : int
         Degree of the lanczos approximation. (default = 30)
+    reorthogonalization : {'partial', 'full', None}
+        See :func:`_lanczos_filter`. (default = 'partial')
 
     Returns
     -------
@@ -241,38 +410,167 @@ def lanczos_op(f, s, order=30):
 
     """
     G = f.G
-    Nf = len(f.g)
 
-    # To have the right shape for the output array depending on the signal dim
-    try:
-        Nv = np.shape(s)[1]
-        is2d = True
-        c = np.zeros((G.N*Nf, Nv))
-    except IndexError:
-        Nv = 1
-        is2d = False
-        c = np.zeros((G.N*Nf))
-
-    tmpN = np.arange(G.N, dtype=int)
-    for j in range(Nv):
-        if is2d:
-            V, H, _ = lanczos(G.L.toarray(), order, s[:, j])
-        else:
-            V, H, _ = lanczos(G.L.toarray(), order, s)
+    s = np.asarray(s)
+    is1d = (s.ndim == 1)
+    if is1d:
+        s = s[:, np.newaxis]
 
-        Eh, Uh = np.linalg.eig(H)
+    c = _lanczos_filter(G, f, s[:, :, np.newaxis], order, reorthogonalization)
 
-        Eh[Eh < 0] = 0
-        fe = f.evaluate(Eh)
-        V = np.dot(V, Uh)
+    # Stack the filtered signals of each filter along the first dimension.
+    c = c.transpose(2, 0, 1).reshape(f.Nf * G.N, -1)
+    return c[:, 0] if is1d else c
 
-        for i in range(Nf):
-            if is2d:
-                c[tmpN + i*G.N, j] = np.dot(V, fe[:][i] * np.dot(V.T, s[:, j]))
-            else:
-                c[tmpN + i*G.N] = np.dot(V, fe[:][i] * np.dot(V.T, s))
 
-    return c
+def _lanczos_filter(G, f, s, order, reorthogonalization='partial'):
+    r"""
+    Apply a filter bank to a block of signals with the Lanczos method
+    (analysis or synthesis).
+
+    A Lanczos recurrence is run simultaneously on every column of the signal
+    block, such that each step costs a single sparse product of the Laplacian
+    with an ``(N, n_signals * n_features_in)`` matrix. The Laplacian is never
+    densified. The Krylov basis of each column is shared by all the kernels:
+    the tridiagonal matrices are diagonalized once (batched), and all the
+    kernels are evaluated at their Ritz values.
+
+    Parameters
+    ----------
+    G : Graph
+    f : Filter
+        Filter bank of ``n_filters`` kernels.
+    s : ndarray
+        Signals, of shape ``(G.N, n_signals, n_features_in)``, where
+        ``n_features_in`` is either 1 (analysis) or ``n_filters``
+        (synthesis).
+    order : int
+        Dimension of the Krylov subspaces, i.e. number of sparse products.
+    reorthogonalization : {'partial', 'full', None}
+        The Lanczos vectors lose their orthogonality in floating point
+        arithmetic. 'partial' monitors it with the recurrence of
+        :cite:`simon1984lanczos` and only reorthogonalizes when it is lost.
+        'full' reorthogonalizes at every step, and None never does.
+
+    Returns
+    -------
+    r : ndarray
+        Filtered signals, of shape ``(G.N, n_signals, n_features_out)``, where
+        ``n_features_out`` is either ``n_filters`` (analysis) or 1
+        (synthesis).
+
+    """
+    if reorthogonalization not in ['partial', 'full', None]:
+        raise ValueError('Unknown reorthogonalization '
+                         '{}.'.format(reorthogonalization))
+
+    if np.iscomplexobj(s):
+        # The Laplacian is real: filter the real and imaginary parts.
+        r = _lanczos_filter(G, f, s.real, order, reorthogonalization)
+        return r + 1j * _lanczos_filter(G, f, s.imag, order,
+                                        reorthogonalization)
+
+    n_nodes, n_signals, n_features_in = s.shape
+    order = min(order, n_nodes)
+    dtype = utils._signal_dtype(s, G.L.dtype)
+    eps = np.finfo(dtype).eps
+
+    X = s.reshape(n_nodes, -1).astype(dtype, copy=False)
+    n_columns = X.shape[1]
+
+    # Lanczos vectors, and diagonals of the tridiagonal matrices.
+    V = np.zeros((order, n_nodes, n_columns), dtype=dtype)
+    alpha = np.zeros((order, n_columns), dtype=dtype)
+    beta = np.zeros((order, n_columns), dtype=dtype)
+
+    norm = np.linalg.norm(X, axis=0)
+    valid = norm > 0
+    V[0][:, valid] = X[:, valid] / norm[valid]
+
+    # Estimated inner products of the current and previous Lanczos vectors
+    # with all the previous ones (partial reorthogonalization).
+    omega = np.zeros((order + 1, n_columns), dtype=dtype)
+    omega_old = np.zeros((order + 1, n_columns), dtype=dtype)
+    omega[0] = 1
+    force = False
+
+    for j in range(order):
+
+        w = G.L.dot(V[j])
+        if j > 0:
+            w -= beta[j-1] * V[j-1]
+        alpha[j] = np.sum(V[j] * w, axis=0)
+        w -= alpha[j] * V[j]
+
+        if j == order - 1:
+            break
+
+        if reorthogonalization == 'full':
+            reorthogonalize = True
+        elif reorthogonalization == 'partial':
+            # Propagate the loss of orthogonality to the new vector.
+            b = np.linalg.norm(w, axis=0)
+            b[b == 0] = 1
+            anorm = np.max(np.abs(alpha[:j+1]) + beta[:j+1])
+            omega_new = np.zeros_like(omega)
+            for k in range(j):
+                t = (beta[k] * omega[k+1] + (alpha[k] - alpha[j]) * omega[k] -
+                     beta[j-1] * omega_old[k])
+                if k > 0:
+                    t += beta[k-1] * omega[k-1]
+                omega_new[k] = (t + np.sign(t) * 2 * eps * anorm) / b
+            omega_new[j] = eps * n_nodes
+            omega_new[j+1] = 1
+            omega_old, omega = omega, omega_new
+            # Reorthogonalize two consecutive vectors when the threshold is
+            # exceeded, as the loss of orthogonality propagates.
+            exceeded = np.max(np.abs(omega[:j+1])) > np.sqrt(eps)
+            reorthogonalize = exceeded or force
+            force = exceeded
+        else:
+            reorthogonalize = False
+
+        if reorthogonalize:
+            h = np.einsum('knm,nm->km', V[:j+1], w)
+            w -= np.einsum('knm,km->nm', V[:j+1], h)
+            if reorthogonalization == 'partial':
+                omega[:j+1] = eps * n_nodes
+
+        beta[j] = np.linalg.norm(w, axis=0)
+        # An invariant subspace was found: the remaining vectors are zero.
+        valid = beta[j] > eps * np.max(np.abs(alpha[:j+1]) + beta[:j+1])
+        beta[j][~valid] = 0
+        V[j+1][:, valid] = w[:, valid] / beta[j][valid]
+
+    # Batched eigendecomposition of the tridiagonal matrices.
+    T = np.zeros((n_columns, order, order), dtype=dtype)
+    idx = np.arange(order)
+    T[:, idx, idx] = alpha.T
+    T[:, idx[:-1], idx[1:]] = beta[:-1].T
+    T[:, idx[1:], idx[:-1]] = beta[:-1].T
+    e, U = np.linalg.eigh(T)
+    e[e < 0] = 0
+
+    # Evaluate all the kernels at all the Ritz values.
+    y = f.evaluate(e.reshape(-1)).reshape(-1, n_columns, order)
+    n_filters = y.shape[0]
+
+    # g(T) e_1 scaled by the norm of the signal, expressed in the Krylov basis.
+    U0 = U[:, 0, :] * norm[:, np.newaxis]
+    if n_features_in == 1:
+        z = np.einsum('mkj,fmj,mj->fmk', U, y, U0)
+        r = np.einsum('knm,fmk->nmf', V, z)
+    else:
+        # Filter i is applied to feature i only, then features are summed.
+        y = y.reshape(n_filters, n_signals, n_features_in, order)
+        y = np.diagonal(y, axis1=0, axis2=2)
+        y = y.transpose(0, 2, 1).reshape(n_columns, order)
+        z = np.einsum('mkj,mj,mj->mk', U, y, U0)
+        r = np.einsum('knm,mk->nm', V, z)
+        r = r.reshape(n_nodes, n_signals, n_features_in).sum(axis=2)
+        r = r[:, :, np.newaxis]
+
+    return r
 
 
 def lanczos(A, order, x):
@@ -302,7 +600,7 @@ def lanczos(A, order, x):
     V[:, hiv] = q
 
     H = np.zeros((order + 1, M*order))
-    r = np.dot(A, q)
+    r = A.dot(q)
     H[0, hiv] = np.sum(q*r, axis=0)
     r -= np.kron(np.ones((N, 1)), H[0, hiv])*q
     H[1, hiv] = np.linalg.norm(r, axis=0)
@@ -323,7 +621,7 @@ def lanczos(A, order, x):
         q = r/np.tile(H[k - 1, k + hiv], (N, 1))
         V[:, k + hiv] = q
 
-        r = np.dot(A, q)
+        r = A.dot(q)
         r -= np.tile(H[k - 1, k + hiv], (N, 1))*v
         H[k, k + hiv] = np.sum(np.multiply(q, r), axis=0)
         r -= np.tile(H[k, k + hiv], (N, 1))*q
@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 
+from collections import OrderedDict
+
 import numpy as np
+from scipy.sparse import linalg
 
 from pygsp import utils
 # prevent circular import in Python < 3.5
@@ -9,6 +12,12 @@ from . import approximations
 
 _logger = utils.build_logger(__name__)
 
+# Number of sets of Chebyshev coefficients cached by each filter.
+_CHEBY_CACHE_SIZE = 8
+
+# Largest Chebyshev order considered by order='auto'.
+_CHEBY_MAX_ORDER = 500
+
 
 class Filter(object):
     r"""
@@ -63,6 +72,9 @@ class Filter(object):
         self.n_filters = self.n_features_in * self.n_features_out
         self.Nf = self.n_filters  # TODO: kept for backward compatibility only.
 
+        # Chebyshev coefficients, see _compute_cheby_coeff().
+        self._cheby_cache = OrderedDict()
+
     def _get_extra_repr(self):
         return dict()
 
@@ -85,7 +97,8 @@ class Filter(object):
         Returns
         -------
         y : ndarray
-            Frequency response of the filters. Shape ``(G.Nf, len(x))``.
+            Frequency response of the filters. Shape ``(G.Nf, len(x))``. Of
+            the floating point type of x, float64 otherwise.
 
         Examples
         --------
@@ -101,13 +114,15 @@ class Filter(object):
         [<matplotlib.lines.Line2D object at ...>]
 
         """
+        x = np.asanyarray(x)
+        dtype = x.dtype if x.dtype.kind == 'f' else np.float64
         # Avoid to copy data as with np.array([g(x) for g in self._kernels]).
-        y = np.empty((self.Nf, len(x)))
+        y = np.empty((self.Nf, len(x)), dtype=dtype)
         for i, kernel in enumerate(self._kernels):
             y[i] = kernel(x)
         return y
 
-    def filter(self, s, method='chebyshev', order=30):
+    def filter(self, s, method='chebyshev', order=30, tol=1e-6):
         r"""Filter signals (analysis or synthesis).
 
         A signal is defined as a rank-3 tensor of shape ``(N_NODES, N_SIGNALS,
@@ -148,12 +163,27 @@ class Filter(object):
             graph, ``N_SIGNALS`` the number of independent signals you want to
             filter, and ``N_FEATURES`` is either 1 (analysis) or the number of
             filters in the filter bank (synthesis).
-        method : {'exact', 'chebyshev'}
-            Whether to use the exact method (via the graph Fourier transform)
-            or the Chebyshev polynomial approximation. A Lanczos
-            approximation is coming.
-        order : int
-            Degree of the Chebyshev polynomials.
+        method : {'exact', 'chebyshev', 'lanczos'}
+            Whether to use the exact method (via the graph Fourier transform),
+            the Chebyshev polynomial approximation, or the Lanczos
+            approximation. The Lanczos method adapts to the spectrum of the
+            graph and to each signal, and does not need :attr:`G.lmax`. It
+            thus needs fewer sparse matrix products than the Chebyshev
+            approximation for kernels with sharp transitions. If only a part
+            of the Fourier basis has been computed (see
+            :meth:`pygsp.graphs.Graph.compute_fourier_basis`), the exact
+            method filters the band spanned by the computed eigenvectors.
+        order : int or 'auto'
+            Degree of the Chebyshev polynomials, or dimension of the Krylov
+            subspace for the Lanczos method. With 'auto', the degree of the
+            Chebyshev polynomial approximating each kernel is chosen as the
+            smallest one whose error is below ``tol``. Each filter of a bank
+            is truncated independently. Default is 30.
+        tol : float
+            Bound on the approximation error of each kernel on
+            :math:`[0, \lambda_{max}]`, used when ``order='auto'``. The
+            error of a filtered signal is bounded by ``tol`` times its norm.
+            Default is 1e-6.
 
         Returns
         -------
@@ -243,7 +273,6 @@ class Filter(object):
 
         if s.ndim < 3:
             s = np.expand_dims(s, 1)
-        n_signals = s.shape[1]
 
         if s.ndim > 3:
             raise ValueError('At most 3 dimensions: '
@@ -260,7 +289,7 @@ class Filter(object):
             axis = 1 if n_features_in == 1 else 2
             f = self.evaluate(self.G.e)
             f = np.expand_dims(f.T, axis)
-            assert f.shape == (self.G.N, n_features_in, n_features_out)
+            assert f.shape == (len(self.G.e), n_features_in, n_features_out)
 
             s = self.G.gft(s)
             s = np.matmul(s, f)
@@ -268,26 +297,17 @@ class Filter(object):
 
         elif method == 'chebyshev':
 
-            # TODO: update Chebyshev implementation (after 2D filter banks).
-            c = approximations.compute_cheby_coeff(self, m=order)
-
-            if n_features_in == 1:  # Analysis.
-                s = s.squeeze(axis=2)
-                s = approximations.cheby_op(self.G, c, s)
-                s = s.reshape((self.G.N, n_features_out, n_signals), order='F')
-                s = s.swapaxes(1, 2)
-
-            elif n_features_in == self.Nf:  # Synthesis.
-                s = s.swapaxes(1, 2)
-                s_in = s.reshape(
-                    (self.G.N * n_features_in, n_signals), order='F')
-                s = np.zeros((self.G.N, n_signals))
-                tmpN = np.arange(self.G.N, dtype=int)
-                for i in range(n_features_in):
-                    s += approximations.cheby_op(self.G,
-                                                 c[i],
-                                                 s_in[i * self.G.N + tmpN])
-                s = np.expand_dims(s, 2)
+            c = self._compute_cheby_coeff(order, tol)
+
+            # Analysis and synthesis share a single recurrence, run on all the
+            # input features at once.
+            s = approximations._cheby_filter(self.G, c, s)
+
+        elif method == 'lanczos':
+
+            if order == 'auto':
+                raise ValueError('The Lanczos method needs an integer order.')
+            s = approximations._lanczos_filter(self.G, self, s, order)
 
         else:
             raise ValueError('Unknown method {}.'.format(method))
@@ -295,14 +315,221 @@ class Filter(object):
         # Return a 1D signal if e.g. a 1D signal was filtered by one filter.
         return s.squeeze()
 
-    def analyze(self, s, method='chebyshev', order=30):
+    def filter_stream(self, signals, batch_size=1000, method='chebyshev',
+                      order=30, tol=1e-6, out=None):
+        r"""Filter a stream of signals by batches, with bounded memory.
+
+        The signals are gathered in batches of ``batch_size`` signals, which
+        are filtered one after the other as :meth:`filter` would. Only a
+        batch is held in memory at any time, such that datasets larger than
+        the memory can be filtered from and to disk, e.g., with
+        :class:`numpy.memmap`. The Chebyshev coefficients are computed once,
+        and the buffers of the recurrence are allocated for the first batch
+        and reused by the following ones.
+
+        Parameters
+        ----------
+        signals : ndarray or iterable of ndarray
+            Graph signals, either an array (e.g., a :class:`numpy.memmap`) of
+            shape ``(N_NODES, N_SIGNALS)`` or ``(N_NODES, N_SIGNALS,
+            N_FEATURES)`` which is read by slices of ``batch_size`` signals,
+            or an iterable of such arrays (chunks) of any number of signals.
+            A chunk of shape ``(N_NODES,)`` is a single signal. ``N_FEATURES``
+            is either 1 (analysis) or the number of filters (synthesis).
+        batch_size : int
+            Number of signals filtered at once. Default is 1000.
+        method : {'exact', 'chebyshev', 'lanczos'}
+            See :meth:`filter`. Default is 'chebyshev'.
+        order : int or 'auto'
+            See :meth:`filter`. Default is 30.
+        tol : float
+            See :meth:`filter`. Default is 1e-6.
+        out : ndarray, optional
+            Array (e.g., a :class:`numpy.memmap`) of shape ``(N_NODES,
+            N_SIGNALS)``, or ``(N_NODES, N_SIGNALS, Nf)`` for analysis with
+            :attr:`Nf` > 1, in which the filtered signals are written.
+
+        Yields
+        ------
+        s : ndarray
+            Filtered batches, of shape ``(N_NODES, n)``, or ``(N_NODES, n,
+            Nf)`` for analysis with :attr:`Nf` > 1, where ``n`` is
+            ``batch_size`` except for the last batch. Views of ``out`` if
+            given, new arrays otherwise.
+
+        See Also
+        --------
+        filter : filter signals held in memory
+
+        Examples
+        --------
+
+        Filter signals produced on the fly:
+
+        >>> G = graphs.Sensor(100, seed=42)
+        >>> G.estimate_lmax()
+        >>> g = filters.MexicanHat(G, Nf=4)
+        >>> rs = np.random.RandomState(42)
+        >>> chunks = (rs.normal(size=(G.N, 30)) for _ in range(10))
+        >>> for s in g.filter_stream(chunks, batch_size=128):
+        ...     print(s.shape)
+        (100, 128, 4)
+        (100, 128, 4)
+        (100, 44, 4)
+
+        Filter an array (e.g., a :class:`numpy.memmap`) into another:
+
+        >>> s = rs.normal(size=(G.N, 300))
+        >>> r = np.empty((G.N, 300, 4))
+        >>> for _ in g.filter_stream(s, batch_size=128, out=r):
+        ...     pass
+        >>> np.allclose(r, g.filter(s))
+        True
+
+        """
+        if batch_size < 1:
+            raise ValueError('The batch size should be positive, got '
+                             '{}.'.format(batch_size))
+        if method not in ['exact', 'chebyshev', 'lanczos']:
+            raise ValueError('Unknown method {}.'.format(method))
+
+        if isinstance(signals, np.ndarray):
+            array = signals
+            signals = (array[:, i:i + batch_size]
+                       for i in range(0, array.shape[1], batch_size))
+
+        if method == 'chebyshev':
+            c = self._compute_cheby_coeff(order, tol)
+            buffers = dict()
+
+        def filter_batch(s, start):
+            if method == 'chebyshev':
+                s = approximations._cheby_filter(self.G, c, s, buffers)
+            else:
+                n_signals = s.shape[1]
+                s = self.filter(s, method, order, tol)
+                s = s.reshape(self.G.N, n_signals, -1)
+            if s.shape[2] == 1:
+                s = s[:, :, 0]
+            if out is not None:
+                stop = start + s.shape[1]
+                if stop > out.shape[1]:
+                    raise ValueError('The output holds {} signals, got more.'
+                                     .format(out.shape[1]))
+                out[:, start:stop] = s
+                s = out[:, start:stop]
+            return s
+
+        batch = None
+        n_batch = 0  # Number of signals in the batch.
+        n_done = 0  # Number of signals filtered.
+        for chunk in signals:
+
+            chunk = np.asanyarray(chunk)
+            if chunk.shape[0] != self.G.N:
+                raise ValueError('First dimension should be the number of '
+                                 'nodes G.N = {}, got {}.'.format(
+                                     self.G.N, chunk.shape))
+            if chunk.ndim == 1:
+                chunk = chunk[:, np.newaxis]
+            if chunk.ndim == 2:
+                chunk = chunk[:, :, np.newaxis]
+            if chunk.ndim != 3 or chunk.shape[2] not in [1, self.Nf]:
+                raise ValueError('Chunks should be of shape (N_NODES, '
+                                 'N_SIGNALS, N_FEATURES) with N_FEATURES '
+                                 'either 1 or the number of filters Nf = {}, '
+                                 'got {}.'.format(self.Nf, chunk.shape))
+
+            if batch is None:
+                dtype = utils._signal_dtype(chunk, self.G.dtype)
+                batch = np.empty((self.G.N, batch_size, chunk.shape[2]),
+                                 dtype=dtype)
+            elif chunk.shape[2] != batch.shape[2]:
+                raise ValueError('All chunks should have the same number of '
+                                 'features {}, got {}.'.format(
+                                     batch.shape[2], chunk.shape))
+            elif not np.can_cast(chunk.dtype, batch.dtype, 'same_kind'):
+                raise ValueError('Chunks of type {} cannot follow chunks of '
+                                 'type {}.'.format(chunk.dtype, batch.dtype))
+
+            i = 0
+            while i < chunk.shape[1]:
+                n = min(batch_size - n_batch, chunk.shape[1] - i)
+                batch[:, n_batch:n_batch + n] = chunk[:, i:i + n]
+                n_batch += n
+                i += n
+                if n_batch == batch_size:
+                    yield filter_batch(batch, n_done)
+                    n_done += n_batch
+                    n_batch = 0
+
+        if n_batch > 0:
+            yield filter_batch(batch[:, :n_batch], n_done)
+
+    def _compute_cheby_coeff(self, order, tol=None):
+        r"""Compute the Chebyshev coefficients of all the filters (cached).
+
+        The coefficients of the whole filter bank are computed at once from a
+        single evaluation of the kernels at the Chebyshev nodes. They are
+        cached for the last few (order, lmax) pairs, such that repeatedly
+        filtering with the same filter does not recompute them. The cache is
+        invalidated when the kernels or :attr:`pygsp.graphs.Graph.lmax`
+        change, and the least recently used entries are evicted.
+
+        If order is 'auto', the coefficients are computed up to
+        ``_CHEBY_MAX_ORDER``, and those of each filter are truncated at the
+        smallest degree whose tail sum, an upper bound of the approximation
+        error, is below tol. Truncated coefficients are set to zero.
+
+        Returns
+        -------
+        c : ndarray
+            Read-only coefficients, of shape ``(Nf, order + 1)``. The order
+            is the largest degree of the filters if order is 'auto'.
+        """
+        if order == 'auto':
+            key = (order, tol, self.G.lmax, tuple(self._kernels))
+        else:
+            key = (order, self.G.lmax, tuple(self._kernels))
+        try:
+            c = self._cheby_cache.pop(key)
+        except KeyError:
+            m = _CHEBY_MAX_ORDER if order == 'auto' else order
+            x = approximations._cheby_nodes(self.G.lmax, m + 1)
+            c = approximations._cheby_coeff(self.evaluate(x), m)
+            if order == 'auto':
+                c = self._truncate_cheby_coeff(c, tol)
+            c.flags.writeable = False
+            if len(self._cheby_cache) >= _CHEBY_CACHE_SIZE:
+                self._cheby_cache.popitem(last=False)
+        # Most recently used entries are last.
+        self._cheby_cache[key] = c
+        return c
+
+    def _truncate_cheby_coeff(self, c, tol):
+        # Error bound of the truncation at degree m: sum_{k > m} |c_k|.
+        tail = np.cumsum(np.abs(c[:, :0:-1]), axis=1)[:, ::-1]
+        converged = tail < tol
+        degrees = np.where(converged.any(axis=1),
+                           np.argmax(converged, axis=1), c.shape[1] - 1)
+        if np.any(~converged[:, -1]):
+            _logger.warning('Chebyshev approximation did not reach a '
+                            'tolerance of {} with an order of {}.'.format(
+                                tol, c.shape[1] - 1))
+        # The recurrence needs at least the first two coefficients.
+        degrees = np.maximum(degrees, 1)
+        c = c[:, :np.max(degrees) + 1]
+        c[np.arange(c.shape[1]) > degrees[:, np.newaxis]] = 0
+        return c
+
+    def analyze(self, s, method='chebyshev', order=30, tol=1e-6):
         r"""Convenience alias to :meth:`filter`."""
         if s.ndim == 3 and s.shape[-1] != 1:
             raise ValueError('Last dimension (#features) should be '
                              '1, got {}.'.format(s.shape))
-        return self.filter(s, method, order)
+        return self.filter(s, method, order, tol)
 
-    def synthesize(self, s, method='chebyshev', order=30):
+    def synthesize(self, s, method='chebyshev', order=30, tol=1e-6):
         r"""Convenience wrapper around :meth:`filter`.
 
         Will be an alias to `adjoint().filter()` in the future.
@@ -311,7 +538,7 @@ class Filter(object):
             raise ValueError('Last dimension (#features) should be the number '
                              'of filters Nf = {}, got {}.'.format(self.Nf,
                                                                   s.shape))
-        return self.filter(s, method, order)
+        return self.filter(s, method, order, tol)
 
     def localize(self, i, **kwargs):
         r"""Localize the kernels at a node (to visualize them).
@@ -459,6 +686,7 @@ class Filter(object):
         See also
         --------
         filter: more efficient way to filter signals
+        as_linear_operator: matrix-free view of the frame
 
         Examples
         --------
@@ -488,6 +716,99 @@ class Filter(object):
         s = np.identity(self.G.N)
         return self.filter(s, **kwargs)
 
+    def as_linear_operator(self, kind='analysis', method='chebyshev',
+                           order=30):
+        r"""Return the filter bank as a matrix-free linear operator.
+
+        The operator applies the filter bank with :meth:`filter` without ever
+        forming the matrix returned by :meth:`compute_frame`. It can thus be
+        used by iterative solvers such as :func:`scipy.sparse.linalg.cg`,
+        :func:`scipy.sparse.linalg.lsqr`, or :func:`scipy.sparse.linalg.eigsh`
+        at a memory cost proportional to the number of edges.
+
+        Parameters
+        ----------
+        kind : {'analysis', 'synthesis', 'frame'}
+            The analysis operator :math:`D^*` maps a signal of size N to the
+            N x Nf coefficients given by :meth:`analyze`, flattened in
+            row-major order (the coefficients of node i are
+            ``c[i*Nf:(i+1)*Nf]``). The
+            synthesis operator :math:`D` is its adjoint and maps those
+            coefficients back to the vertex domain as :meth:`synthesize`. The
+            frame operator :math:`D D^*` of size N x N is the composition of
+            both.
+        method : {'exact', 'chebyshev'}
+            Method used to filter, see :meth:`filter`.
+        order : int
+            Degree of the Chebyshev polynomials, see :meth:`filter`.
+
+        Returns
+        -------
+        operator : :class:`scipy.sparse.linalg.LinearOperator`
+            Operator which supports ``matvec``, ``matmat``, and ``rmatvec``.
+            The adjoint is only exact for undirected graphs, whose Laplacian
+            is symmetric.
+
+        Examples
+        --------
+        >>> G = graphs.Sensor(100, seed=42)
+        >>> G.estimate_lmax()
+        >>> g = filters.MexicanHat(G, Nf=4)
+        >>> D = g.as_linear_operator('synthesis')
+        >>> D.shape
+        (100, 400)
+        >>> s = np.random.RandomState(42).uniform(size=G.N)
+        >>> c = g.analyze(s)
+        >>> np.allclose(D.dot(c.ravel()), g.synthesize(c))
+        True
+
+        Upper frame bound from the largest eigenvalue of the frame operator:
+
+        >>> from scipy.sparse.linalg import eigsh
+        >>> G.compute_fourier_basis()
+        >>> F = g.as_linear_operator('frame', method='exact')
+        >>> B = eigsh(F, k=1, return_eigenvectors=False)[0]
+        >>> B <= g.estimate_frame_bounds(use_eigenvalues=True)[1] + 1e-10
+        True
+
+        """
+        N, Nf = self.G.N, self.Nf
+
+        def analysis(x):
+            # (N, k) signals to (N * Nf, k) coefficients.
+            k = x.shape[1]
+            y = self.filter(x[:, :, np.newaxis], method, order)
+            y = y.reshape(N, k, Nf).transpose(0, 2, 1)
+            return y.reshape(N * Nf, k)
+
+        def synthesis(y):
+            # (N * Nf, k) coefficients to (N, k) signals.
+            k = y.shape[1]
+            y = y.reshape(N, Nf, k).transpose(0, 2, 1)
+            return self.filter(y, method, order).reshape(N, k)
+
+        def frame(x):
+            return synthesis(analysis(x))
+
+        if kind == 'analysis':
+            shape, matmat, rmatmat = (N * Nf, N), analysis, synthesis
+        elif kind == 'synthesis':
+            shape, matmat, rmatmat = (N, N * Nf), synthesis, analysis
+        elif kind == 'frame':
+            shape, matmat, rmatmat = (N, N), frame, frame
+        else:
+            raise ValueError('Unknown kind {}.'.format(kind))
+
+        def matvec(x):
+            return matmat(x.reshape(-1, 1)).reshape(-1)
+
+        def rmatvec(x):
+            return rmatmat(x.reshape(-1, 1)).reshape(-1)
+
+        return linalg.LinearOperator(shape, matvec=matvec, rmatvec=rmatvec,
+                                     matmat=matmat, rmatmat=rmatmat,
+                                     dtype=self.G.dtype)
+
     def can_dual(self):
         r"""Creates a dual graph form a given graph"""
 
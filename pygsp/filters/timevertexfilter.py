@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+
+from collections import OrderedDict
+
+import numpy as np
+from scipy import fft
+
+from . import approximations
+from .filter import _CHEBY_CACHE_SIZE
+
+
+class TimeVertexFilter(object):
+    r"""Joint time-vertex filter (bank) for time series of graph signals.
+
+    A time-vertex signal :math:`X` of shape ``(N, T)`` holds a graph signal
+    for each of the :math:`T` time steps. Its joint Fourier transform is the
+    graph Fourier transform along the nodes and the discrete Fourier transform
+    along time. A joint filter multiplies the coefficient at the graph
+    frequency :math:`\lambda` and temporal frequency :math:`\omega` by
+    :math:`h(\lambda, \omega)`, which couples both domains, e.g., to
+    attenuate waves that propagate at a given speed over the graph
+    :cite:`grassi2018timevertex`. Filtering each time step with a graph filter
+    :math:`g(\lambda)` is the special case :math:`h(\lambda, \omega) =
+    g(\lambda)`.
+
+    Parameters
+    ----------
+    G : graph
+        The graph to which the filter bank is tailored.
+    kernels : function or list of functions
+        A (list of) function(s) :math:`h(\lambda, \omega)` of a graph
+        frequency :math:`\lambda` in :math:`[0, \lambda_{max}]` and a
+        temporal frequency :math:`\omega` in :math:`[-\pi, \pi]` radians per
+        sample. They must broadcast their arguments as numpy's ufuncs. One
+        function per filter.
+
+    Attributes
+    ----------
+    G : Graph
+        The graph to which the filter bank was tailored.
+    Nf : int
+        Number of filters in the filter bank.
+
+    Examples
+    --------
+
+    Low-pass filter in both domains a time series of noisy signals:
+
+    >>> G = graphs.Sensor(50, seed=42)
+    >>> G.estimate_lmax()
+    >>> g = filters.TimeVertexFilter(G, lambda x, w: np.exp(-x - 5 * w**2))
+    >>> x = np.random.RandomState(42).normal(size=(G.N, 1000))
+    >>> y = g.filter(x, block_size=200, overlap=20)
+    >>> y.shape
+    (50, 1000)
+
+    """
+
+    def __init__(self, G, kernels):
+
+        self.G = G
+
+        try:
+            iter(kernels)
+        except TypeError:
+            kernels = [kernels]
+        self._kernels = kernels
+
+        self.Nf = len(kernels)
+
+        # Chebyshev coefficients, see _compute_cheby_coeff().
+        self._cheby_cache = OrderedDict()
+
+    def __repr__(self):
+        return '{}(Nf={})'.format(self.__class__.__name__, self.Nf)
+
+    def evaluate(self, x, omega):
+        r"""Evaluate the kernels at given graph and temporal frequencies.
+
+        Parameters
+        ----------
+        x : ndarray
+            Graph frequencies at which to evaluate the filter.
+        omega : ndarray
+            Temporal frequencies at which to evaluate the filter, in radians
+            per sample.
+
+        Returns
+        -------
+        y : ndarray
+            Frequency response of the filters. Shape ``(Nf, len(x),
+            len(omega))``.
+
+        Examples
+        --------
+        >>> G = graphs.Ring(10)
+        >>> g = filters.TimeVertexFilter(G, lambda x, w: x * np.cos(w))
+        >>> y = g.evaluate(np.linspace(0, 4, 5), np.linspace(0, np.pi, 3))
+        >>> y.shape
+        (1, 5, 3)
+
+        """
+        x = np.asarray(x)[:, np.newaxis]
+        omega = np.asarray(omega)[np.newaxis, :]
+        shape = (x.shape[0], omega.shape[1])
+        return np.stack([np.broadcast_to(kernel(x, omega), shape)
+                         for kernel in self._kernels])
+
+    def filter(self, s, method='chebyshev', order=30, block_size=None,
+               overlap=0):
+        r"""Filter time series of graph signals.
+
+        The time axis is transformed with the FFT, and each temporal
+        frequency :math:`\omega` is filtered on the graph with the kernel
+        :math:`h(\cdot, \omega)`. With the Chebyshev approximation, a single
+        recurrence filters all the temporal frequencies at once: filtering
+        costs ``order`` sparse matrix products with blocks of ``T`` columns,
+        whatever the kernels. Real signals are transformed with the real FFT:
+        only the non-negative temporal frequencies are evaluated, and the
+        kernels are assumed to satisfy :math:`h(\lambda, -\omega) =
+        \overline{h(\lambda, \omega)}`.
+
+        As the DFT, filtering is circular in time. Long series can be
+        filtered in blocks to bound the memory used by the transforms. Each
+        block of ``block_size`` time steps is then filtered with ``overlap``
+        neighboring time steps on each side (wrapping around the series), and
+        the overlapping parts of the output are discarded. The result is the
+        one of filtering the whole series if the temporal impulse response of
+        the kernels, i.e., their inverse DFT over :math:`\omega`, is shorter
+        than ``overlap`` time steps in each direction, and an approximation
+        otherwise.
+
+        Parameters
+        ----------
+        s : ndarray
+            Time-vertex signals, of shape ``(N_NODES, N_TIMES)`` or
+            ``(N_NODES, N_TIMES, N_SIGNALS)``.
+        method : {'chebyshev', 'exact'}
+            Whether to filter on the graph with the Chebyshev polynomial
+            approximation of the kernels at each temporal frequency, or with
+            the graph Fourier transform. Default is 'chebyshev'.
+        order : int
+            Degree of the Chebyshev polynomials. Default is 30.
+        block_size : int
+            Number of time steps filtered at once. By default, the whole
+            series is filtered at once.
+        overlap : int
+            Number of time steps added on each side of the blocks. Default is
+            0.
+
+        Returns
+        -------
+        s : ndarray
+            Filtered signals, of the shape of the input with an additional
+            last dimension of size :attr:`Nf` if :attr:`Nf` > 1.
+
+        Examples
+        --------
+
+        A kernel independent of the temporal frequency filters each time
+        step independently:
+
+        >>> G = graphs.Ring(30)
+        >>> G.estimate_lmax()
+        >>> g = filters.TimeVertexFilter(G, lambda x, w: np.exp(-x))
+        >>> s = np.random.RandomState(42).normal(size=(G.N, 100))
+        >>> s1 = g.filter(s)
+        >>> s2 = filters.Filter(G, lambda x: np.exp(-x)).filter(s)
+        >>> np.allclose(s1, s2)
+        True
+
+        """
+        s = np.asarray(s)
+        if s.shape[0] != self.G.N:
+            raise ValueError('First dimension should be the number of nodes '
+                             'G.N = {}, got {}.'.format(self.G.N, s.shape))
+        if s.ndim not in [2, 3]:
+            raise ValueError('Signals should be of shape (N_NODES, N_TIMES) '
+                             'or (N_NODES, N_TIMES, N_SIGNALS), got '
+                             '{}.'.format(s.shape))
+        if method not in ['chebyshev', 'exact']:
+            raise ValueError('Unknown method {}.'.format(method))
+        if overlap < 0:
+            raise ValueError('The overlap should be non-negative.')
+
+        squeeze = s.ndim == 2
+        if squeeze:
+            s = s[:, :, np.newaxis]
+        n_times = s.shape[1]
+        if block_size is None or block_size + 2 * overlap >= n_times:
+            block_size, overlap = n_times, 0
+
+        r = None
+        for start in range(0, n_times, block_size):
+            stop = min(start + block_size, n_times)
+            times = np.arange(start - overlap, start + block_size + overlap)
+            block = self._filter_block(s[:, times % n_times], method, order)
+            if r is None:
+                r = np.empty((s.shape[0], n_times) + block.shape[2:],
+                             dtype=block.dtype)
+            r[:, start:stop] = block[:, overlap:overlap + stop - start]
+
+        if squeeze:
+            r = r[:, :, 0]
+        if self.Nf == 1:
+            r = r[..., 0]
+        return r
+
+    def _filter_block(self, s, method, order):
+        r"""Filter signals of shape (N, T, n_signals) with the DFT in time."""
+        n_times = s.shape[1]
+        real = not np.iscomplexobj(s)
+        if real:
+            s = fft.rfft(s, axis=1)
+            omega = 2 * np.pi * fft.rfftfreq(n_times)
+        else:
+            s = fft.fft(s, axis=1)
+            omega = 2 * np.pi * fft.fftfreq(n_times)
+
+        if method == 'exact':
+            h = self.evaluate(self.G.e, omega)
+            h = np.transpose(h, (1, 2, 0))[:, :, np.newaxis, :]
+            s = self.G.gft(s)[..., np.newaxis] * h
+            s = self.G.igft(s)
+        else:
+            c = self._compute_cheby_coeff(order, omega)
+            s = approximations._cheby_filter_joint(self.G, c, s)
+
+        if real:
+            return fft.irfft(s, n=n_times, axis=1)
+        return fft.ifft(s, axis=1)
+
+    def _compute_cheby_coeff(self, order, omega):
+        r"""Chebyshev coefficients at each temporal frequency (cached).
+
+        Returns
+        -------
+        c : ndarray
+            Read-only coefficients, of shape ``(Nf, len(omega), order + 1)``.
+        """
+        key = (order, self.G.lmax, omega.tobytes(), tuple(self._kernels))
+        try:
+            c = self._cheby_cache.pop(key)
+        except KeyError:
+            x = approximations._cheby_nodes(self.G.lmax, order + 1)
+            y = np.swapaxes(self.evaluate(x, omega), 1, 2)
+            c = approximations._cheby_coeff(y, order)
+            c.flags.writeable = False
+            if len(self._cheby_cache) >= _CHEBY_CACHE_SIZE:
+                self._cheby_cache.popitem(last=False)
+        self._cheby_cache[key] = c
+        return c
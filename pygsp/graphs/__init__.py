@@ -30,6 +30,7 @@ Checks
     Graph.check_weights
     Graph.is_connected
     Graph.is_directed
+    Graph.connected_components
 
 Attributes computation
 ----------------------
@@ -39,7 +40,20 @@ Attributes computation
     Graph.compute_laplacian
     Graph.estimate_lmax
     Graph.compute_fourier_basis
+    Graph.save_fourier_basis
+    Graph.load_fourier_basis
     Graph.compute_differential_operator
+    Graph.solver
+
+Edition
+-------
+
+.. autosummary::
+
+    Graph.add_edges
+    Graph.remove_edges
+    Graph.update_weights
+    Graph.update_fourier_basis
 
 Differential operators
 ----------------------
@@ -82,6 +96,7 @@ Others
 
 .. autosummary::
 
+    Graph.from_csr
     Graph.get_edge_list
     Graph.set_coordinates
     Graph.subgraph
@@ -104,6 +119,7 @@ Graph models
     LowStretchTree
     Minnesota
     Path
+    ProductGraph
     RandomRegular
     RandomRing
     Ring
@@ -143,6 +159,7 @@ _GRAPHS = [
     'LowStretchTree',
     'Minnesota',
     'Path',
+    'ProductGraph',
     'RandomRegular',
     'RandomRing',
     'Ring',
@@ -4,6 +4,7 @@ import numpy as np
 from scipy import sparse
 
 from pygsp import utils
+from .lattice import Lattice
 
 
 logger = utils.build_logger(__name__)
@@ -36,7 +37,9 @@ class GraphDifference(object):
         Laplacian. It is used to compute the gradient and the divergence of a
         graph signal, see :meth:`grad` and :meth:`div`.
 
-        The result is cached and accessible by the :attr:`D` property.
+        The result is cached and accessible by the :attr:`D` property. It is
+        also persisted if a cache directory was set with
+        :func:`pygsp.utils.set_cache_dir`.
 
         See also
         --------
@@ -54,6 +57,13 @@ class GraphDifference(object):
 
         """
 
+        cached = utils._cache_load(self, 'D')
+        if cached is not None:
+            self._D = sparse.csc_matrix((cached['data'], cached['indices'],
+                                         cached['indptr']),
+                                        shape=tuple(cached['shape']))
+            return
+
         v_in, v_out, weights = self.get_edge_list()
 
         n = len(v_in)
@@ -61,7 +71,7 @@ class GraphDifference(object):
         Dc = np.empty(2*n)
         Dc[:n] = v_in
         Dc[n:] = v_out
-        Dv = np.empty(2*n)
+        Dv = np.empty(2*n, dtype=self.dtype)
 
         if self.lap_type == 'combinatorial':
             Dv[:n] = np.sqrt(weights)
@@ -73,6 +83,9 @@ class GraphDifference(object):
             raise ValueError('Unknown lap_type {}'.format(self.lap_type))
 
         self._D = sparse.csc_matrix((Dv, (Dr, Dc)), shape=(n, self.N))
+        utils._cache_save(self, 'D', data=self._D.data,
+                          indices=self._D.indices, indptr=self._D.indptr,
+                          shape=self._D.shape)
 
     def grad(self, s):
         r"""Compute the gradient of a graph signal.
@@ -81,7 +94,8 @@ class GraphDifference(object):
 
         .. math:: y = D s,
 
-        where :math:`D` is the differential operator :attr:`D`.
+        where :math:`D` is the differential operator :attr:`D`. It is
+        computed without :attr:`D` for lattice graphs.
 
         Parameters
         ----------
@@ -113,6 +127,8 @@ class GraphDifference(object):
         """
         if self.N != s.shape[0]:
             raise ValueError('Signal length should be the number of nodes.')
+        if isinstance(getattr(self, '_structure', None), Lattice):
+            return self._structure.grad(s, self.lap_type, self.dtype)
         return self.D.dot(s)
 
     def div(self, s):
@@ -122,7 +138,8 @@ class GraphDifference(object):
 
         .. math:: y = D^T s,
 
-        where :math:`D` is the differential operator :attr:`D`.
+        where :math:`D` is the differential operator :attr:`D`. It is
+        computed without :attr:`D` for lattice graphs.
 
         Parameters
         ----------
@@ -151,4 +168,6 @@ class GraphDifference(object):
         """
         if self.Ne != s.shape[0]:
             raise ValueError('Signal length should be the number of edges.')
+        if isinstance(getattr(self, '_structure', None), Lattice):
+            return self._structure.div(s, self.lap_type, self.dtype)
         return self.D.T.dot(s)
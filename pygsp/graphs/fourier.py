@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
 
+import os
+
 import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg
 
 from pygsp import utils
+from .solver import _amg
 
 
 logger = utils.build_logger(__name__)
@@ -11,21 +16,27 @@ logger = utils.build_logger(__name__)
 class GraphFourier(object):
 
     def _check_fourier_properties(self, name, desc):
-        if not hasattr(self, '_' + name):
+        if not hasattr(self, '_e'):
             self.logger.warning('The {} G.{} is not available, we need to '
                                 'compute the Fourier basis. Explicitly call '
                                 'G.compute_fourier_basis() once beforehand '
                                 'to suppress the warning.'.format(desc, name))
             self.compute_fourier_basis()
-        return getattr(self, '_' + name)
+        return getattr(self, '_' + name, None)
 
     @property
     def U(self):
         r"""Fourier basis (eigenvectors of the Laplacian).
 
-        Is computed by :func:`compute_fourier_basis`.
+        Is computed by :func:`compute_fourier_basis`. Closed-form bases are
+        only built on first access.
         """
-        return self._check_fourier_properties('U', 'Fourier basis')
+        U = self._check_fourier_properties('U', 'Fourier basis')
+        if U is None:
+            lap_type, index = self._fourier_closed_form
+            U = self._structure.basis(lap_type, index)
+            self._U = U = U.astype(self.dtype, copy=False)
+        return U
 
     @property
     def e(self):
@@ -39,20 +50,57 @@ class GraphFourier(object):
     def mu(self):
         r"""Coherence of the Fourier basis.
 
-        Is computed by :func:`compute_fourier_basis`.
+        Is computed by :func:`compute_fourier_basis`, or on first access for
+        closed-form bases.
         """
-        return self._check_fourier_properties('mu', 'Fourier basis coherence')
-
-    def compute_fourier_basis(self, recompute=False):
+        mu = self._check_fourier_properties('mu', 'Fourier basis coherence')
+        if mu is None:
+            lap_type, index = self._fourier_closed_form
+            self._mu = mu = self._structure.coherence(lap_type, index)
+        return mu
+
+    def compute_fourier_basis(self, recompute=False, n_eigenvectors=None,
+                              which='smallest', solver='lanczos',
+                              shift_invert=True):
         r"""Compute the Fourier basis of the graph (cached).
 
         The result is cached and accessible by the :attr:`U`, :attr:`e`,
-        :attr:`lmax`, and :attr:`mu` properties.
+        :attr:`lmax`, and :attr:`mu` properties. It is also persisted if a
+        cache directory was set with :func:`pygsp.utils.set_cache_dir`.
 
         Parameters
         ----------
         recompute: bool
             Force to recompute the Fourier basis if already existing.
+        n_eigenvectors : int
+            Number of eigenvectors to compute. By default, the full
+            eigendecomposition is computed. Computing a few eigenvectors is
+            much faster for large graphs, as it only needs sparse matrix
+            products with the Laplacian.
+        which : 'smallest', 'largest'
+            Whether to compute the eigenvectors associated with the smallest
+            (low frequencies) or the largest (high frequencies) eigenvalues,
+            if only a part of them is computed. Default is 'smallest'.
+        solver : 'lanczos', 'lobpcg', 'multilevel'
+            Iterative eigensolver used to compute a part of the eigenvectors:
+            the implicitly restarted Lanczos method (ARPACK), the locally
+            optimal block preconditioned conjugate gradient method (LOBPCG),
+            or a multilevel method. The latter computes the eigenvectors of a
+            coarsened graph (see :func:`pygsp.reduction.graph_coarsening`),
+            then prolongates and refines them level by level with a few
+            LOBPCG iterations, preconditioned by algebraic multigrid
+            :cite:`urschel2015cascadic`. It only computes the smallest
+            eigenvalues. It avoids the factorization of the Laplacian, and is
+            the fastest for many eigenvectors of large graphs which are not
+            nearly planar, e.g., 3D meshes or nearest-neighbor graphs in more
+            than two dimensions. LOBPCG is replaced by a dense
+            eigendecomposition for more than N / 5 eigenvectors. Default is
+            'lanczos'.
+        shift_invert : bool
+            Whether the Lanczos method should run on the shifted and inverted
+            Laplacian to compute the smallest eigenvalues. It converges in
+            much less iterations, at the cost of a sparse factorization of the
+            Laplacian. Default is True.
 
         Notes
         -----
@@ -68,7 +116,26 @@ class GraphFourier(object):
         eigenvalues. The largest eigenvalue is stored in *G.lmax*.
         The eigenvectors are stored as column vectors of *G.U* in the same
         order that the eigenvalues. Finally, the coherence of the
-        Fourier basis is found in *G.mu*.
+        Fourier basis is found in *G.mu*. Both *G.e* and *G.U* are of the
+        type :attr:`dtype` of the graph.
+
+        If only *n_eigenvectors* are computed, *G.e* and *G.U* are truncated
+        to those. The graph Fourier transform :meth:`gft` then projects
+        signals on that band of frequencies, and :meth:`igft` synthesizes
+        signals from it. *G.lmax* is only set if the largest eigenvalue has
+        been computed.
+
+        The eigendecompositions of the :class:`Path`, :class:`Ring`,
+        :class:`Grid2d`, and :class:`Torus` graphs are known in closed form:
+        their eigenvectors are the bases of the discrete cosine transform
+        (DCT) and of the discrete Hartley transform (a real variant of the
+        discrete Fourier transform), or Kronecker products of those. Their
+        eigenvalues are then computed in :math:`O(N \log N)` operations,
+        *G.U* and *G.mu* are only computed on first access, and :meth:`gft` and
+        :meth:`igft` are fast transforms. This holds for the combinatorial
+        Laplacian, and for the normalized Laplacian of paths, rings and tori.
+        The other arguments are then ignored. Likewise, the Fourier basis of
+        a :class:`ProductGraph` is derived from the ones of its factors.
 
         References
         ----------
@@ -87,35 +154,380 @@ class GraphFourier(object):
         >>> G.mu < 1
         True
 
+        Only compute the 10 lowest frequencies:
+
+        >>> G = graphs.Sensor(N=500, seed=42)
+        >>> G.compute_fourier_basis(n_eigenvectors=10)
+        >>> G.U.shape
+        (500, 10)
+        >>> G.e.shape
+        (10,)
+
+        Or with the multilevel solver:
+
+        >>> G = graphs.Sensor(N=2000, seed=42)
+        >>> G.compute_fourier_basis(n_eigenvectors=10, solver='multilevel')
+        >>> G.U.shape
+        (2000, 10)
+
         """
 
-        if hasattr(self, '_e') and hasattr(self, '_U') and not recompute:
-            return
+        if n_eigenvectors is None:
+            n_eigenvectors = self.N
+        if not 1 <= n_eigenvectors <= self.N:
+            raise ValueError('The number of eigenvectors should be in [1, '
+                             '{}], got {}.'.format(self.N, n_eigenvectors))
+        if which not in ['smallest', 'largest']:
+            raise ValueError('Unknown value which={}.'.format(which))
+
+        if (hasattr(self, '_e') and not recompute and
+                (hasattr(self, '_U') or
+                 hasattr(self, '_fourier_closed_form'))):
+            if len(self._e) == n_eigenvectors == self.N:
+                return
+            if (len(self._e) == n_eigenvectors and
+                    getattr(self, '_fourier_which', None) == which):
+                return
+
+        e = None
+        if hasattr(self, '_structure'):
+            e = self._structure.eigenvalues(self.lap_type)
+
+        if n_eigenvectors == self.N:
+            name = 'fourier'
+        else:
+            name = 'fourier-{}-{}'.format(n_eigenvectors, which)
+        cached = None
+        if e is None and not recompute:
+            cached = utils._cache_load(self, name)
+
+        if e is not None:
+
+            # Closed form: sort the eigenvalues, not the eigenvectors.
+            order = np.argsort(e, kind='stable')
+            if which == 'smallest':
+                index = order[:n_eigenvectors]
+            else:
+                index = order[self.N - n_eigenvectors:]
+            self._e = e[index].astype(self.dtype)
+            self._fourier_closed_form = (self.lap_type, index)
+            if hasattr(self, '_U'):
+                del self._U
 
-        assert self.L.shape == (self.N, self.N)
-        if self.N > 3000:
-            self.logger.warning('Computing the full eigendecomposition of a '
-                                'large matrix ({0} x {0}) may take some '
-                                'time.'.format(self.N))
+        elif cached is not None:
 
-        # TODO: handle non-symmetric Laplatians. Test lap_type?
+            self._e, self._U = cached['e'], cached['U']
 
-        self._e, self._U = np.linalg.eigh(self.L.toarray())
-        # Columns are eigenvectors. Sorted in ascending eigenvalue order.
+        elif n_eigenvectors == self.N:
 
-        # Smallest eigenvalue should be zero: correct numerical errors.
-        # Eigensolver might sometimes return small negative values, which
-        # filter's implementations may not anticipate. Better for plotting too.
-        assert -1e-12 < self._e[0] < 1e-12
-        self._e[0] = 0
+            if self.N > 3000:
+                self.logger.warning('Computing the full eigendecomposition of '
+                                    'a large matrix ({0} x {0}) may take some '
+                                    'time.'.format(self.N))
+
+            # TODO: handle non-symmetric Laplatians. Test lap_type?
+
+            self._e, self._U = np.linalg.eigh(self.L.toarray())
+            # Columns are eigenvectors. Sorted in ascending eigenvalue order.
+
+            # Smallest eigenvalue should be zero: correct numerical errors.
+            # Eigensolver might sometimes return small negative values, which
+            # filter's implementations may not anticipate. Better for plotting
+            # too.
+            eps = np.finfo(self._e.dtype).eps
+            assert abs(self._e[0]) < max(1e-12, 10 * eps * self._e[-1])
+            self._e[0] = 0
+
+        else:
+
+            self._e, self._U = self._compute_eigenvectors(
+                n_eigenvectors, which, solver, shift_invert)
+
+            # Iterative eigensolvers might return small negative values.
+            np.maximum(self._e, 0, out=self._e)
+
+        if e is None:
+            if hasattr(self, '_fourier_closed_form'):
+                del self._fourier_closed_form
+            if cached is None:
+                utils._cache_save(self, name, e=self._e, U=self._U)
 
         if self.lap_type == 'normalized':
             # Spectrum bounded by [0, 2].
-            assert self._e[-1] <= 2
+            assert self._e[-1] <= 2 + 10 * np.finfo(self._e.dtype).eps
 
         assert np.max(self._e) == self._e[-1]
-        self._lmax = self._e[-1]
+        if n_eigenvectors == self.N or which == 'largest':
+            self._lmax = self._e[-1]
+        if e is None:
+            self._mu = np.max(np.abs(self._U))
+        elif hasattr(self, '_mu'):
+            del self._mu  # Computed on first access.
+        self._fourier_which = which
+        if hasattr(self, '_fourier_stale'):
+            del self._fourier_stale
+
+    def _compute_eigenvectors(self, n_eigenvectors, which, solver,
+                              shift_invert):
+        r"""Compute a part of the eigendecomposition with sparse solvers."""
+
+        if solver == 'lanczos':
+
+            if which == 'smallest' and shift_invert:
+                # The Laplacian is singular: shift it slightly such that the
+                # factorized matrix L - sigma I is positive definite.
+                sigma = -1e-6 * max(1, np.max(np.abs(self.L.diagonal())))
+                e, U = linalg.eigsh(self.L, k=n_eigenvectors, sigma=sigma,
+                                    which='LM')
+            else:
+                which = 'SA' if which == 'smallest' else 'LA'
+                e, U = linalg.eigsh(self.L, k=n_eigenvectors, which=which)
+
+        elif solver == 'lobpcg' and 5 * n_eigenvectors > self.N:
+
+            # LOBPCG rejects blocks larger than a fifth of the matrix. The
+            # dense solver is not much more expensive for that many vectors.
+            e, U = np.linalg.eigh(self.L.toarray())
+            if which == 'smallest':
+                e, U = e[:n_eigenvectors], U[:, :n_eigenvectors]
+            else:
+                e, U = e[-n_eigenvectors:], U[:, -n_eigenvectors:]
+
+        elif solver == 'lobpcg':
+
+            # Jacobi (diagonal) preconditioner.
+            d = self.L.diagonal()
+            d[d == 0] = 1
+            M = sparse.diags(1. / d)
+
+            # Seeded, such that the basis is reproducible.
+            rs = np.random.RandomState(42)
+            X = rs.normal(size=(self.N, n_eigenvectors))
+            X = X.astype(self.dtype)
+            e, U = linalg.lobpcg(self.L, X, M=M, tol=1e-8, maxiter=1000,
+                                 largest=(which == 'largest'))
+
+        elif solver == 'multilevel':
+
+            if which != 'smallest':
+                raise ValueError('The multilevel solver only computes the '
+                                 'smallest eigenvalues.')
+            e, U = _multilevel_eigenvectors(self.L.astype(np.float64),
+                                            n_eigenvectors)
+            e, U = e.astype(self.dtype), U.astype(self.dtype)
+
+        else:
+            raise ValueError('Unknown solver {}.'.format(solver))
+
+        # Sort in ascending eigenvalue order.
+        order = np.argsort(e)
+        return e[order], U[:, order]
+
+    def update_fourier_basis(self, tol=None, maxiter=100):
+        r"""Update the Fourier basis after the edges have been edited.
+
+        After :meth:`add_edges`, :meth:`remove_edges`, or
+        :meth:`update_weights`, the Laplacian differs by a low-rank matrix
+        :math:`\Delta L` from the one the Fourier basis was computed for.
+        Instead of a new eigendecomposition, the outdated basis is updated:
+
+        * A full basis goes through one rank-one update per non-zero
+          eigenvalue of :math:`\Delta L`. The eigenvalues are the roots of
+          the secular equation and the eigenvectors are computed from them
+          as proposed by :cite:`gu1994rankone`, such that they stay
+          orthogonal. Each update costs :math:`O(N^2)` operations plus a
+          product with the Fourier basis. As that product is about half as
+          expensive as an eigendecomposition, the basis is recomputed
+          instead if the rank of :math:`\Delta L` is larger than two (e.g.,
+          if more than two edges were edited).
+        * A partial basis (see :meth:`compute_fourier_basis`) is refined by
+          a locally optimal block iteration (as LOBPCG), warm-started from
+          the outdated eigenvectors. It typically converges in a few
+          iterations.
+
+        The accuracy of the result is estimated by the largest residual
+        :math:`\|L u - \lambda u\|_2`, relative to a bound of
+        :math:`\|L\|_2`. The Fourier basis is recomputed from scratch if
+        that error is larger than `tol`.
+
+        Parameters
+        ----------
+        tol : float
+            Largest acceptable relative residual of the eigenpairs. Default
+            is 1e-6, or 100 times the machine epsilon of :attr:`dtype` if
+            larger (i.e., for float32 graphs).
+        maxiter : int
+            Maximum number of iterations to update a partial basis.
+
+        Returns
+        -------
+        error : float
+            Relative residual of the updated (or recomputed) basis.
+
+        Examples
+        --------
+        >>> G = graphs.Path(100)
+        >>> G.compute_fourier_basis()
+        >>> G.add_edges(0, 99)
+        >>> error = G.update_fourier_basis()
+        >>> error < 1e-6
+        True
+        >>> G2 = graphs.Ring(100)
+        >>> G2.compute_fourier_basis()
+        >>> np.allclose(G.e, G2.e)
+        True
+
+        """
+
+        if not hasattr(self, '_fourier_stale'):
+            # Nothing to update: the basis is current or does not exist.
+            if not hasattr(self, '_e'):
+                self.compute_fourier_basis()
+            return self._fourier_residual()
+
+        e, U, which, L, lap_type = self._fourier_stale
+        # Only keep the outdated basis updated in place.
+        del self._fourier_stale
+        n_eigenvectors = len(e)
+        if tol is None:
+            tol = max(1e-6, 100 * np.finfo(self.dtype).eps)
+
+        if lap_type != self.lap_type:
+            self.compute_fourier_basis(n_eigenvectors=n_eigenvectors,
+                                       which=which)
+            return self._fourier_residual()
+
+        # The updates are computed in double precision.
+        e = e.astype(np.float64)
+        if n_eigenvectors == self.N:
+            dL = self.L.astype(np.float64) - L.astype(np.float64)
+            # In place of the outdated basis, unless memory-mapped.
+            U = np.require(U, np.float64, ['O', 'W'])
+            update = _update_eigendecomposition(e, U, dL, max_rank=2)
+            del U
+            if update is None:
+                self.compute_fourier_basis(recompute=True)
+                return self._fourier_residual()
+            e, U = update
+        else:
+            U = U.astype(np.float64)
+            e, U = _refine_eigenvectors(self.L.astype(np.float64), U, which,
+                                        tol, maxiter)
+        np.maximum(e, 0, out=e)
+
+        self._e = e.astype(self.dtype, copy=False)
+        self._U = U.astype(self.dtype, copy=False)
+        error = self._fourier_residual()
+
+        if error > tol:
+            self.logger.warning('The updated Fourier basis is not accurate '
+                                'enough (relative residual of {:.1e}), we '
+                                'need to recompute it.'.format(error))
+            self.compute_fourier_basis(recompute=True,
+                                       n_eigenvectors=n_eigenvectors,
+                                       which=which)
+            return self._fourier_residual()
+
+        if n_eigenvectors == self.N:
+            name = 'fourier'
+        else:
+            name = 'fourier-{}-{}'.format(n_eigenvectors, which)
+        utils._cache_save(self, name, e=self._e, U=self._U)
+
+        if n_eigenvectors == self.N or which == 'largest':
+            self._lmax = self._e[-1]
         self._mu = np.max(np.abs(self._U))
+        self._fourier_which = which
+        return error
+
+    def _fourier_residual(self):
+        r"""Largest residual of the eigenpairs, relative to a bound of |L|."""
+        R = self.L.dot(self.U) - self.U * self._e
+        scale = linalg.norm(self.L, 1)
+        return np.max(np.linalg.norm(R, axis=0)) / max(scale, 1e-300)
+
+    def save_fourier_basis(self, path):
+        r"""Save the Fourier basis to disk.
+
+        The eigenvectors :attr:`U` are stored in ``path/U.npy``, such that
+        they can be memory-mapped by :meth:`load_fourier_basis`. The
+        eigenvalues :attr:`e`, the coherence :attr:`mu`, and a hash of the
+        weight matrix and Laplacian type are stored in ``path/spectrum.npz``.
+
+        Parameters
+        ----------
+        path : string
+            Directory where to save the Fourier basis. It is created if it
+            does not exist.
+
+        See also
+        --------
+        load_fourier_basis
+
+        Examples
+        --------
+        >>> import shutil
+        >>> import tempfile
+        >>> path = tempfile.mkdtemp()
+        >>> G = graphs.Logo()
+        >>> G.compute_fourier_basis()
+        >>> G.save_fourier_basis(path)
+        >>> G = graphs.Logo()
+        >>> G.load_fourier_basis(path)
+        >>> G.U.shape
+        (1130, 1130)
+        >>> del G  # Close the memory-mapped basis.
+        >>> shutil.rmtree(path)
+
+        """
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        np.save(os.path.join(path, 'U.npy'), self.U)
+        np.savez(os.path.join(path, 'spectrum.npz'), e=self.e, mu=self.mu,
+                 which=getattr(self, '_fourier_which', 'smallest'),
+                 hash=self._hash())
+
+    def load_fourier_basis(self, path, mmap=True):
+        r"""Load a Fourier basis saved by :meth:`save_fourier_basis`.
+
+        The result is accessible by the :attr:`U`, :attr:`e`, :attr:`lmax`
+        (if the largest eigenvalue was saved), and :attr:`mu` properties, as
+        if :meth:`compute_fourier_basis` was called.
+
+        Parameters
+        ----------
+        path : string
+            Directory where the Fourier basis was saved.
+        mmap : bool
+            Whether to memory-map the eigenvectors instead of reading them in
+            memory. The memory-mapped :attr:`U` is read-only and shared by the
+            processes which load the same basis. Default is True.
+
+        Raises
+        ------
+        ValueError
+            If the basis was computed for another weight matrix, Laplacian
+            type, or dtype.
+
+        """
+        with np.load(os.path.join(path, 'spectrum.npz')) as data:
+            if str(data['hash']) != self._hash():
+                raise ValueError('The Fourier basis in {} was computed for '
+                                 'another graph, Laplacian, or '
+                                 'dtype.'.format(path))
+            e = data['e']
+            mu = float(data['mu'])
+            which = str(data['which'])
+        U = np.load(os.path.join(path, 'U.npy'),
+                    mmap_mode='r' if mmap else None)
+
+        self._e, self._U, self._mu = e, U, mu
+        self._fourier_which = which
+        for name in ['_fourier_stale', '_fourier_closed_form']:
+            if hasattr(self, name):
+                delattr(self, name)
+        if len(e) == self.N or which == 'largest':
+            self._lmax = e[-1]
 
     def gft(self, s):
         r"""Compute the graph Fourier transform.
@@ -127,6 +539,10 @@ class GraphFourier(object):
         where :math:`U` is the Fourier basis attr:`U` and :math:`U^*` denotes
         the conjugate transpose or Hermitian transpose of :math:`U`.
 
+        It costs :math:`O(N \log N)` operations if the Fourier basis has a
+        closed form (see :meth:`compute_fourier_basis`), and :math:`O(N^2)`
+        otherwise.
+
         Parameters
         ----------
         s : ndarray
@@ -151,7 +567,13 @@ class GraphFourier(object):
         if s.shape[0] != self.N:
             raise ValueError('First dimension should be the number of nodes '
                              'G.N = {}, got {}.'.format(self.N, s.shape))
+        self._check_fourier_properties('U', 'Fourier basis')
+        if hasattr(self, '_fourier_closed_form'):
+            lap_type, index = self._fourier_closed_form
+            s = s.astype(utils._signal_dtype(s, self.dtype), copy=False)
+            return self._structure.gft(s, lap_type)[index]
         U = np.conjugate(self.U)  # True Hermitian. (Although U is often real.)
+        s = s.astype(utils._signal_dtype(s, U.dtype), copy=False)
         return np.tensordot(U, s, ([0], [0]))
 
     def igft(self, s_hat):
@@ -162,7 +584,8 @@ class GraphFourier(object):
 
         .. math:: s = U \hat{s},
 
-        where :math:`U` is the Fourier basis :attr:`U`.
+        where :math:`U` is the Fourier basis :attr:`U`. Like :meth:`gft`, it
+        is a fast transform if the Fourier basis has a closed form.
 
         Parameters
         ----------
@@ -185,9 +608,18 @@ class GraphFourier(object):
         True
 
         """
-        if s_hat.shape[0] != self.N:
-            raise ValueError('First dimension should be the number of nodes '
-                             'G.N = {}, got {}.'.format(self.N, s_hat.shape))
+        self._check_fourier_properties('U', 'Fourier basis')
+        if s_hat.shape[0] != len(self._e):
+            raise ValueError('First dimension should be the number of '
+                             'eigenvectors {}, got {}.'.format(len(self._e),
+                                                               s_hat.shape))
+        s_hat = s_hat.astype(utils._signal_dtype(s_hat, self.dtype),
+                             copy=False)
+        if hasattr(self, '_fourier_closed_form'):
+            lap_type, index = self._fourier_closed_form
+            s = np.zeros((self.N,) + s_hat.shape[1:], dtype=s_hat.dtype)
+            s[index] = s_hat
+            return self._structure.gft(s, lap_type, inverse=True)
         return np.tensordot(self.U, s_hat, ([1], [0]))
 
     def translate(self, f, i):
@@ -367,3 +799,336 @@ class GraphFourier(object):
             F /= np.kron((np.ones(N), np.sqrt(np.sum(np.power(np.abs(F), 2), axis=0))))
 
         return F
+
+
+def _update_eigendecomposition(e, U, dL, max_rank=None):
+    r"""Eigendecomposition of :math:`U diag(e) U^T + dL`, with dL low-rank.
+
+    U is updated in place. Returns None if the rank of dL is larger than
+    max_rank.
+    """
+
+    # Decompose the perturbation in rank-one updates. It is only supported
+    # on the rows and columns of the nodes whose edges changed.
+    dL = sparse.csr_matrix(dL)
+    dL.eliminate_zeros()
+    nodes = np.unique(dL.nonzero()[0])
+    if nodes.size == 0:
+        return e.copy(), U
+    s, V = np.linalg.eigh(dL[nodes][:, nodes].toarray())
+    keep = np.abs(s) > 1e-12 * np.max(np.abs(s))
+    if max_rank is not None and np.sum(keep) > max_rank:
+        return None
+
+    for rho, v in zip(s[keep], V[:, keep].T):
+        z = U[nodes].T.dot(v)
+        e = _rank_one_update(e, U, z, rho)
+
+    order = np.argsort(e)
+    return e[order], U[:, order]
+
+
+def _orthonormalize(S, rtol=1e-7):
+    r"""Orthonormal basis of the span of the columns of S.
+
+    The columns are normalized, and the directions whose singular value is
+    smaller than rtol times the largest are dropped. The basis is computed
+    from the eigendecomposition of the Gram matrix, which is much cheaper
+    than an SVD or a QR decomposition of a tall matrix, twice such that it is
+    orthonormal to machine precision (as CholeskyQR2).
+    """
+    norms = np.linalg.norm(S, axis=0)
+    S = S[:, norms > 0] / norms[norms > 0]
+    for _ in range(2):
+        w, V = np.linalg.eigh(S.T.dot(S))
+        keep = w > w[-1] * rtol**2
+        S = S.dot(V[:, keep] / np.sqrt(w[keep]))
+    return S
+
+
+def _refine_eigenvectors(L, X, which, tol, maxiter, precondition=None,
+                         n_wanted=None):
+    r"""Refine approximate eigenvectors of L with a locally optimal iteration.
+
+    The Rayleigh-Ritz procedure is applied to the span of the current
+    eigenvectors X, their preconditioned residuals R, and their last
+    updates P, as in LOBPCG. Contrary to :func:`scipy.sparse.linalg.lobpcg`,
+    the subspace is orthonormalized by a procedure which drops dependent
+    directions: the residuals of a low-rank perturbation are low-rank. The
+    residuals are preconditioned by the inverse diagonal of L by default.
+    Converged eigenvectors are soft-locked: they stay in the subspace, but
+    their residuals and updates do not. Only the first (or last, for the
+    largest) ``n_wanted`` eigenpairs must converge, the others are guards.
+    """
+
+    k = X.shape[1]
+    if n_wanted is None:
+        n_wanted = k
+    if which == 'smallest':
+        wanted = slice(0, n_wanted)
+    else:
+        wanted = slice(k - n_wanted, k)
+    scale = linalg.norm(L, 1)
+    if precondition is None:
+        d = L.diagonal()
+        d[d == 0] = 1
+        d = d[:, np.newaxis]
+
+        def precondition(R):
+            return R / d
+
+    def rayleigh_ritz(S):
+        e, V = np.linalg.eigh(S.T.dot(L.dot(S)))
+        V = V[:, :k] if which == 'smallest' else V[:, -k:]
+        e = e[:k] if which == 'smallest' else e[-k:]
+        return e, S.dot(V)
+
+    e, X = rayleigh_ritz(_orthonormalize(X))
+    P = None
+    for _ in range(maxiter):
+        R = L.dot(X) - X * e
+        active = np.linalg.norm(R, axis=0) > tol * scale
+        if not np.any(active[wanted]):
+            break
+        S = [X, precondition(R[:, active])]
+        if P is not None:
+            S.append(P[:, active])
+        e, Xnew = rayleigh_ritz(_orthonormalize(np.hstack(S)))
+        P = Xnew - X.dot(X.T.dot(Xnew))
+        X = Xnew
+
+    return e, X
+
+
+def _multilevel_eigenvectors(L, n_eigenvectors, tol=1e-8, maxiter=1000,
+                             n_sweeps=5, coarse_size=None):
+    r"""Compute the smallest eigenpairs of L from a coarsening hierarchy.
+
+    The graph is coarsened (see :func:`pygsp.reduction.graph_coarsening`)
+    until it has less than ``coarse_size`` nodes. The eigenvectors of the
+    coarsest Laplacian are computed by a dense eigendecomposition, then
+    prolongated to each finer level and refined by a few sweeps of a locally
+    optimal block iteration (see :func:`_refine_eigenvectors`). The finest
+    level is refined to the tolerance. As the coarse eigenvectors are smooth,
+    the refinements mostly have to correct their high frequencies. The
+    residuals are preconditioned by a multigrid V-cycle of the Laplacian
+    shifted to the wanted eigenvalues, such that the number of iterations
+    barely grows with the size of the graph. Guard vectors, i.e., a few more
+    eigenvectors than wanted, speed up the convergence of the last ones.
+
+    The coarse Laplacians are the Galerkin operators :math:`P^\top L P`
+    of the piecewise constant prolongations :math:`P`. The coarse
+    eigenproblems are thus the restrictions of the original one to the
+    span of :math:`P`, i.e., :math:`P^\top L P y = \lambda P^\top P y`,
+    where :math:`M = P^\top P` holds the size of the aggregates. They are
+    symmetrized as :math:`M^{-1/2} P^\top L P M^{-1/2}`.
+    """
+    from pygsp import reduction
+
+    k = n_eigenvectors
+    if coarse_size is None:
+        coarse_size = max(1000, 10 * k)
+    # Guard vectors speed up the convergence of the last wanted ones.
+    n_guards = min(max(5, k // 10), L.shape[0] - k)
+
+    Ls, Ps, sizes = [sparse.csr_matrix(L)], [], [np.ones(L.shape[0])]
+    while Ls[-1].shape[0] > coarse_size:
+        Lc, P, _ = reduction.graph_coarsening(Ls[-1], seed=len(Ps))
+        # Stop if the coarsening stalls, e.g., on isolated nodes.
+        if Lc.shape[0] > 0.9 * Ls[-1].shape[0] or Lc.shape[0] < 2 * k:
+            break
+        Ls.append(Lc)
+        Ps.append(P)
+        sizes.append(P.T.dot(sizes[-1]))
+
+    def symmetrize(L, size):
+        scale = sparse.diags(1 / np.sqrt(size), 0)
+        return scale.dot(L).dot(scale).tocsr()
+
+    e, X = np.linalg.eigh(symmetrize(Ls[-1], sizes[-1]).toarray())
+    e = e[:k + n_guards]
+    X = X[:, :k + n_guards] / np.sqrt(sizes[-1])[:, np.newaxis]
+
+    for level in reversed(range(len(Ps))):
+        X = Ps[level].dot(X)
+        sqrt_size = np.sqrt(sizes[level])[:, np.newaxis]
+        L = symmetrize(Ls[level], sizes[level])
+        # Multigrid V-cycle of L shifted to the wanted eigenvalues.
+        precondition = _amg(L + e[-1] * sparse.identity(L.shape[0]))
+        e, X = _refine_eigenvectors(L, X * sqrt_size, 'smallest', tol,
+                                    n_sweeps if level > 0 else maxiter,
+                                    precondition, n_wanted=k)
+        X /= sqrt_size
+
+    e, X = e[:k], X[:, :k]
+    residual = np.max(np.linalg.norm(L.dot(X) - X * e, axis=0))
+    residual /= linalg.norm(L, 1)
+    if residual > tol:
+        logger.warning('The multilevel eigensolver did not converge in {} '
+                       'iterations (relative residual of {:.1e} instead of '
+                       '{:.1e}).'.format(maxiter, residual, tol))
+
+    return e, X
+
+
+def _rank_one_update(e, U, z, rho):
+    r"""Eigendecomposition of :math:`U (diag(e) + rho z z^T) U^T`.
+
+    The eigenvalues are the roots of the secular equation
+    :math:`1 + \rho \sum_i z_i^2 / (e_i - \lambda) = 0`. Components of z
+    which are too small and close eigenvalues are deflated beforehand. The
+    eigenvectors are computed with the method of Gu and Eisenstat. U is
+    updated in place, and the returned eigenvalues are not sorted.
+    """
+
+    # Work with a positive rho and eigenvalues sorted in ascending order.
+    # The columns of U are indexed through the permutation, not moved.
+    sign = 1 if rho > 0 else -1
+    order = np.argsort(sign * e, kind='mergesort')
+    d, z = sign * e[order], z[order]
+    rho = abs(rho)
+
+    eps = np.finfo(float).eps
+    tol = 8 * eps * max(np.max(np.abs(d)), rho * z.dot(z))
+
+    # Deflation of small components: the eigenpair is unchanged.
+    active = rho * np.abs(z) > tol
+
+    # Deflation of close eigenvalues: a Givens rotation of the eigenvectors
+    # zeroes one of the components.
+    prev = None
+    for i in np.flatnonzero(active):
+        if prev is not None:
+            r = np.hypot(z[prev], z[i])
+            c, s = z[i] / r, z[prev] / r
+            if abs((d[i] - d[prev]) * c * s) <= tol:
+                Up, Ui = U[:, order[prev]], U[:, order[i]]
+                Up, Ui = c * Up - s * Ui, s * Up + c * Ui
+                U[:, order[prev]], U[:, order[i]] = Up, Ui
+                dp, di = d[prev], d[i]
+                d[prev] = c**2 * dp + s**2 * di
+                d[i] = s**2 * dp + c**2 * di
+                z[prev], z[i] = 0, r
+                active[prev] = False
+        prev = i
+
+    idx = np.flatnonzero(active)
+    if idx.size > 0:
+        lam, Q = _secular_solve(d[idx], z[idx], rho)
+        d[idx] = lam
+        # By chunks of rows, to bound the temporaries.
+        columns = order[idx]
+        step = max(1, 2**20 // len(columns))
+        for start in range(0, U.shape[0], step):
+            rows = slice(start, start + step)
+            U[rows, columns] = U[rows, columns].dot(Q)
+
+    e = np.empty_like(d)
+    e[order] = sign * d
+    return e
+
+
+def _secular_solve(d, z, rho, maxiter=100, chunk_size=2**20):
+    r"""Solve the secular equation of :math:`diag(d) + rho z z^T`.
+
+    The entries of d must be sorted and distinct, those of z non-zero, and rho
+    positive. Returns the eigenvalues and the eigenvectors. Besides the
+    eigenvectors, memory is bounded by temporaries of about ``chunk_size``
+    entries, as the roots are processed by chunks.
+    """
+
+    n = len(d)
+    eps = np.finfo(float).eps
+    z2 = z**2
+    chunks = max(1, chunk_size // n)
+
+    def by_chunks(rows):
+        return [rows[i:i + chunks] for i in range(0, len(rows), chunks)]
+
+    # The k-th root lies in (d[k], d[k+1]), the last in (d[-1], d[-1] + rho
+    # |z|^2). Roots are computed as an offset tau from the closest pole for
+    # accuracy. They are found by fitting the secular function with two poles
+    # at d[k] and d[k+1] (one for the last root), which converges cubically
+    # (see LAPACK's dlaed4), safeguarded by bisection.
+    upper = np.append(d[1:], d[-1] + rho * z.dot(z))
+    mid = (d + upper) / 2
+    f = np.concatenate([
+        1 + rho * np.sum(z2 / (d[np.newaxis, :] - mid[rows, np.newaxis]), 1)
+        for rows in by_chunks(np.arange(n))])
+    origin = np.arange(n)
+    right = (f < 0) & (origin < n - 1)
+    origin[right] += 1
+    lo = np.where(right, mid - upper, 0)
+    hi = np.where(right, 0, mid - d)
+    # The last root has no pole on its right.
+    if f[-1] < 0:
+        lo[-1], hi[-1] = mid[-1] - d[-1], upper[-1] - d[-1]
+
+    def iterate(rows):
+        r"""One iteration on the given roots. Returns the converged ones."""
+        t, lo_t, hi_t = tau[rows], lo[rows], hi[rows]
+        diff = d[np.newaxis, :] - d[origin[rows], np.newaxis]
+        diff -= t[:, np.newaxis]
+        terms = rho * z2 / diff
+        f = 1 + np.sum(terms, 1)
+        # The secular function is evaluated to about eps times the sum of
+        # the magnitudes of its terms.
+        small = np.abs(f) <= 8 * eps * (1 + np.sum(np.abs(terms), 1))
+        terms /= diff
+        below = np.arange(n)[np.newaxis, :] <= rows[:, np.newaxis]
+        dpsi = np.sum(terms, 1, where=below)
+        dphi = np.sum(terms, 1, where=~below)
+        # The secular function increases between its poles.
+        hi_t = np.where(f > 0, t, hi_t)
+        lo_t = np.where(f <= 0, t, lo_t)
+        # Model c + A / (a - t') + B / (b - t'), with the same value and
+        # derivatives from both sides, and solve for the offset t' - t.
+        last = rows == n - 1
+        a = diff[np.arange(len(rows)), rows]
+        b = diff[np.arange(len(rows)), np.minimum(rows + 1, n - 1)]
+        c = f - dpsi * a - np.where(last, 0, dphi * b)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            beta = c * (a + b) + dpsi * a**2 + dphi * b**2
+            gamma = a * b * f
+            root = np.sqrt(np.maximum(beta**2 - 4 * c * gamma, 0))
+            step = 2 * gamma / (beta + np.copysign(root, beta))
+            step = np.where(last, a + dpsi * a**2 / c, step)
+            new = t + step
+        inside = (new > lo_t) & (new < hi_t)
+        new = np.where(inside, new, (lo_t + hi_t) / 2)
+        new = np.where(small, t, new)
+        spacing = eps * np.maximum(np.abs(lo_t), np.abs(hi_t))
+        converged = small | (new == t) | (hi_t - lo_t <= 2 * spacing)
+        tau[rows], lo[rows], hi[rows] = new, lo_t, hi_t
+        return converged
+
+    # Only the roots which have not converged are iterated on, such that an
+    # iteration costs O(n) per remaining root.
+    tau = (lo + hi) / 2
+    todo = np.arange(n)
+    for _ in range(maxiter):
+        converged = np.concatenate([iterate(rows)
+                                    for rows in by_chunks(todo)])
+        todo = todo[~converged]
+        if todo.size == 0:
+            break
+
+    lam = d[origin] + tau
+
+    # Gu and Eisenstat: recompute z from the eigenvalues such that they are
+    # exact for the computed eigenvectors, which are then orthogonal. The
+    # differences lam[k] - d[i] are computed from the offsets.
+    Q = np.empty((n, n))
+    for rows in by_chunks(np.arange(n)):
+        num = d[origin][np.newaxis, :] - d[rows, np.newaxis]
+        num += tau[np.newaxis, :]
+        den = d[np.newaxis, :] - d[rows, np.newaxis]
+        below = np.arange(n - 1)[np.newaxis, :] < rows[:, np.newaxis]
+        den = np.where(below, den[:, :-1], den[:, 1:])
+        with np.errstate(divide='ignore'):
+            logz = (np.log(num[:, -1] / rho) +
+                    np.sum(np.log(num[:, :-1] / den), 1))
+        zhat = np.copysign(np.exp(logz / 2), z[rows])
+        Q[rows] = zhat[:, np.newaxis] / -num
+    Q /= np.sqrt(np.einsum('ij,ij->j', Q, Q))
+    return lam, Q
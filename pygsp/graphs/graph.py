@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
 
+import hashlib
 from collections import Counter
 
 import numpy as np
 from scipy import sparse
+from scipy.sparse import csgraph
 
 from pygsp import utils
 from . import fourier, difference  # prevent circular import in Python < 3.5
+from .solver import LaplacianSolver
 
 
 class Graph(fourier.GraphFourier, difference.GraphDifference):
@@ -27,6 +30,11 @@ class Graph(fourier.GraphFourier, difference.GraphDifference):
         Vertices coordinates (default is None).
     plotting : dict
         Plotting parameters.
+    dtype : data-type
+        Floating point type of the weight matrix, which propagates to the
+        Laplacian, the Fourier basis, and the filtered signals. Either
+        ``np.float32`` or ``np.float64``. Default is given by
+        :func:`pygsp.utils.get_default_dtype`, float64 unless changed.
 
     Attributes
     ----------
@@ -37,7 +45,7 @@ class Graph(fourier.GraphFourier, difference.GraphDifference):
         nodes.
     W : sparse matrix
         the weight matrix which contains the weights of the connections.
-        It is represented as an N-by-N matrix of floats.
+        It is represented as an N-by-N matrix of floats of type :attr:`dtype`.
         :math:`W_{i,j} = 0` means that there is no direct connection from
         i to j.
     L : sparse matrix
@@ -55,48 +63,154 @@ class Graph(fourier.GraphFourier, difference.GraphDifference):
     >>> W = np.arange(4).reshape(2, 2)
     >>> G = graphs.Graph(W)
 
+    Single precision graph:
+
+    >>> G = graphs.Graph(W, dtype=np.float32)
+    >>> G.L.dtype
+    dtype('float32')
+
     """
 
-    def __init__(self, W, lap_type='combinatorial', coords=None, plotting={}):
+    logger = utils.build_logger(__name__)
 
-        self.logger = utils.build_logger(__name__)
+    def __init__(self, W, lap_type='combinatorial', coords=None, plotting={},
+                 dtype=None):
 
-        if len(W.shape) != 2 or W.shape[0] != W.shape[1]:
-            raise ValueError('W has incorrect shape {}'.format(W.shape))
+        if dtype is None:
+            dtype = utils.get_default_dtype()
+        dtype = utils._check_dtype(dtype)
+
+        if W is None and hasattr(self, '_structure'):
+            # Structured graphs (products) whose weight matrix is only built
+            # on first access.
+            self._dtype = dtype
+            self.n_nodes = self._structure.n_nodes
+            self._directed = False
 
-        # CSR sparse matrices are the most efficient for matrix multiplication.
-        # They are the sole sparse matrix type to support eliminate_zeros().
-        if sparse.isspmatrix_csr(W):
-            self.W = W
         else:
-            self.W = sparse.csr_matrix(W)
 
-        # Don't keep edges of 0 weight. Otherwise Ne will not correspond to the
-        # real number of edges. Problematic when e.g. plotting.
-        self.W.eliminate_zeros()
+            if len(W.shape) != 2 or W.shape[0] != W.shape[1]:
+                raise ValueError('W has incorrect shape {}'.format(W.shape))
 
-        self.n_nodes = W.shape[0]
+            # CSR sparse matrices are the most efficient for matrix
+            # multiplication. They are the sole sparse matrix type to support
+            # eliminate_zeros().
+            if sparse.isspmatrix_csr(W):
+                self.W = W.astype(dtype, copy=False)
+            else:
+                self.W = sparse.csr_matrix(W, dtype=dtype)
 
-        # TODO: why would we ever want this?
-        # For large matrices it slows the graph construction by a factor 100.
-        # self.W = sparse.lil_matrix(self.W)
+            # Don't keep edges of 0 weight. Otherwise Ne will not correspond to
+            # the real number of edges. Problematic when e.g. plotting.
+            self.W.eliminate_zeros()
 
-        # Don't count edges two times if undirected.
-        # Be consistent with the size of the differential operator.
-        if self.is_directed():
-            self.n_edges = self.W.nnz
-        else:
-            diagonal = np.count_nonzero(self.W.diagonal())
-            off_diagonal = self.W.nnz - diagonal
-            self.n_edges = off_diagonal // 2 + diagonal
+            self.n_nodes = W.shape[0]
 
-        self.check_weights()
+            # TODO: why would we ever want this?
+            # For large matrices it slows the graph construction by a factor
+            # 100.
+            # self.W = sparse.lil_matrix(self.W)
 
-        self.compute_laplacian(lap_type)
+            self.check_weights()
+
+        if hasattr(self, '_structure'):
+            # Structured graphs (lattices and products) filter without the
+            # Laplacian: build it on demand.
+            if lap_type not in ['combinatorial', 'normalized']:
+                raise ValueError('Unknown Laplacian type {}'.format(lap_type))
+            self.lap_type = lap_type
+        else:
+            self.compute_laplacian(lap_type)
 
         if coords is not None:
             self.coords = coords
 
+        self._init_plotting(plotting)
+
+        # TODO: kept for backward compatibility.
+        self.N = self.n_nodes
+
+    @classmethod
+    def from_csr(cls, W, lap_type='combinatorial', symmetric=None,
+                 validated=False, coords=None, plotting={}, dtype=None):
+        r"""Create a graph from a CSR weight matrix with minimal overhead.
+
+        Contrary to the constructor, nothing is computed eagerly: the
+        Laplacian :attr:`L`, the degrees, and the adjacency matrix are built
+        on first access. Properties of the weight matrix known by the caller
+        can be provided such that they are not checked. Constructing a graph
+        then costs no more than wrapping the weight matrix.
+
+        Parameters
+        ----------
+        W : sparse matrix
+            The weight matrix, in the CSR format. It is not copied if it is
+            already of the requested dtype.
+        lap_type : 'combinatorial', 'normalized'
+            The type of Laplacian to be computed by :func:`compute_laplacian`
+            (default is 'combinatorial').
+        symmetric : bool or None
+            Whether the weight matrix is symmetric, i.e. the graph is
+            undirected. It is checked on first need if None (the default).
+        validated : bool
+            Whether the weight matrix is known to be without explicit zeros
+            and without infinite or NaN values. Otherwise, explicit zeros are
+            removed and :meth:`check_weights` is run (the default).
+        coords : ndarray
+            Vertices coordinates (default is None).
+        plotting : dict
+            Plotting parameters.
+        dtype : data-type
+            The dtype of the weight matrix, float32 or float64. By default,
+            the dtype of W if it is one of those, and
+            :func:`pygsp.utils.get_default_dtype` otherwise.
+
+        Returns
+        -------
+        G : Graph
+            The graph.
+
+        Examples
+        --------
+        >>> from scipy import sparse
+        >>> W = sparse.random(100, 100, density=0.05, format='csr',
+        ...                   random_state=42)
+        >>> W = W + W.T
+        >>> G = graphs.Graph.from_csr(W, symmetric=True, validated=True)
+        >>> G.is_directed()
+        False
+        >>> G.L.shape
+        (100, 100)
+
+        """
+        if not sparse.isspmatrix_csr(W):
+            raise TypeError('W should be a CSR sparse matrix.')
+        if W.shape[0] != W.shape[1]:
+            raise ValueError('W has incorrect shape {}'.format(W.shape))
+        if lap_type not in ['combinatorial', 'normalized']:
+            raise ValueError('Unknown Laplacian type {}'.format(lap_type))
+
+        if dtype is None:
+            dtype = W.dtype
+            if dtype not in [np.float32, np.float64]:
+                dtype = utils.get_default_dtype()
+        W = W.astype(utils._check_dtype(dtype), copy=False)
+
+        G = cls.__new__(cls)
+        G.W = W
+        G.n_nodes = G.N = W.shape[0]
+        G.lap_type = lap_type
+        if symmetric is not None:
+            G._directed = not symmetric
+        if not validated:
+            W.eliminate_zeros()
+            G.check_weights()
+        if coords is not None:
+            G.coords = coords
+        G._init_plotting(plotting)
+        return G
+
+    def _init_plotting(self, plotting):
         self.plotting = {'vertex_size': 100,
                          'vertex_color': (0.12, 0.47, 0.71, 1),
                          'edge_color': (0.5, 0.5, 0.5, 1),
@@ -104,9 +218,49 @@ class Graph(fourier.GraphFourier, difference.GraphDifference):
                          'edge_style': '-'}
         self.plotting.update(plotting)
 
-        # TODO: kept for backward compatibility.
-        self.Ne = self.n_edges
-        self.N = self.n_nodes
+    @property
+    def W(self):
+        r"""Weight matrix, in the CSR format.
+
+        Product graphs only build it on first access.
+        """
+        if not hasattr(self, '_W'):
+            self._W = self._structure.weight_matrix(self._dtype)
+        return self._W
+
+    @W.setter
+    def W(self, W):
+        self._W = W
+
+    @property
+    def dtype(self):
+        r"""Floating point type of the weight matrix and derived operators."""
+        if not hasattr(self, '_W'):
+            return self._dtype
+        return self._W.dtype
+
+    @property
+    def n_edges(self):
+        r"""Number of edges (cached).
+
+        Edges of undirected graphs are not counted two times, consistently
+        with the size of the differential operator.
+        """
+        if not hasattr(self, '_n_edges'):
+            if not hasattr(self, '_W'):
+                self._n_edges = self._structure.n_edges()
+            elif self.is_directed():
+                self._n_edges = self.W.nnz
+            else:
+                diagonal = np.count_nonzero(self.W.diagonal())
+                off_diagonal = self.W.nnz - diagonal
+                self._n_edges = off_diagonal // 2 + diagonal
+        return self._n_edges
+
+    @property
+    def Ne(self):
+        r"""Alias to :attr:`n_edges`, kept for backward compatibility."""
+        return self.n_edges
 
     def _get_extra_repr(self):
         return dict()
@@ -293,18 +447,14 @@ class Graph(fourier.GraphFourier, difference.GraphDifference):
         # N = len(ind) # Assigned but never used
 
         sub_W = self.W.tocsr()[ind, :].tocsc()[:, ind]
-        return Graph(sub_W)
+        return Graph(sub_W, dtype=self.dtype)
 
     def is_connected(self, recompute=False):
         r"""Check the strong connectivity of the graph (cached).
 
-        It uses DFS travelling on graph to ensure that each node is visited.
-        For undirected graphs, starting at any vertex and trying to access all
-        others is enough.
-        For directed graphs, one needs to check that a random vertex is
-        accessible by all others
-        and can access all others. Thus, we can transpose the adjacency matrix
-        and compute again with the same starting point in both phases.
+        A graph is strongly connected if every node can be reached from every
+        other node. For undirected graphs, that is the same as being (weakly)
+        connected. See :meth:`connected_components`.
 
         Parameters
         ----------
@@ -327,32 +477,73 @@ class Graph(fourier.GraphFourier, difference.GraphDifference):
         if hasattr(self, '_connected') and not recompute:
             return self._connected
 
-        if self.is_directed(recompute=recompute):
-            adj_matrices = [self.A, self.A.T]
+        if recompute:
+            cached = None
         else:
-            adj_matrices = [self.A]
+            cached = utils._cache_load(self, 'connected', laplacian=False)
+        if cached is not None:
+            self._connected = bool(cached['connected'])
+            return self._connected
 
-        for adj_matrix in adj_matrices:
-            visited = np.zeros(self.A.shape[0], dtype=bool)
-            stack = set([0])
+        labels = self.connected_components('strong', recompute=recompute)
+        self._connected = bool(np.all(labels == 0))
+        utils._cache_save(self, 'connected', laplacian=False,
+                          connected=self._connected)
+        return self._connected
 
-            while len(stack):
-                v = stack.pop()
-                if not visited[v]:
-                    visited[v] = True
+    def connected_components(self, connection='strong', recompute=False):
+        r"""Label the nodes by connected component (cached).
 
-                    # Add indices of nodes not visited yet and accessible from
-                    # v
-                    stack.update(set([idx
-                                      for idx in adj_matrix[v, :].nonzero()[1]
-                                      if not visited[idx]]))
+        Parameters
+        ----------
+        connection : 'strong', 'weak'
+            In a strongly connected component, every node can be reached from
+            every other node by following directed edges. In a weakly
+            connected component, the direction of edges is ignored. Both are
+            the same for undirected graphs. Default is 'strong'.
+        recompute: bool
+            Force to recompute the components if already known.
 
-            if not visited.all():
-                self._connected = False
-                return self._connected
+        Returns
+        -------
+        labels : ndarray
+            Read-only component index of each node, from 0 to the number of
+            components minus one.
 
-        self._connected = True
-        return self._connected
+        Examples
+        --------
+        >>> W = np.array([[0, 1, 0, 0], [1, 0, 0, 0],
+        ...               [0, 0, 0, 1], [0, 0, 0, 0]])
+        >>> G = graphs.Graph(W)
+        >>> labels = G.connected_components('weak')
+        >>> labels.max() + 1  # Number of components.
+        2
+        >>> labels = G.connected_components('strong')
+        >>> labels.max() + 1
+        3
+        >>> labels[0] == labels[1]
+        True
+
+        """
+        if connection not in ['strong', 'weak']:
+            raise ValueError('Unknown connection {}.'.format(connection))
+
+        if recompute or not hasattr(self, '_components'):
+            self._components = dict()
+
+        directed = self.is_directed(recompute=recompute)
+        if not directed:
+            # Strong and weak components are the same.
+            connection = 'weak'
+
+        if connection not in self._components:
+            _, labels = csgraph.connected_components(
+                sparse.csr_matrix(self.W) > 0, directed=directed,
+                connection=connection)
+            labels.flags.writeable = False
+            self._components[connection] = labels
+
+        return self._components[connection]
 
     def is_directed(self, recompute=False):
         r"""Check if the graph has directed edges (cached).
@@ -388,19 +579,28 @@ class Graph(fourier.GraphFourier, difference.GraphDifference):
         self._directed = np.abs(self.W - self.W.T).sum() != 0
         return self._directed
 
-    def extract_components(self):
+    def extract_components(self, connection='weak'):
         r"""Split the graph into connected components.
 
-        See :func:`is_connected` for the method used to determine
-        connectedness.
+        See :meth:`connected_components` for the definition of components.
+        The subgraphs of all the components are sliced from a single
+        permutation of the weight matrix.
+
+        Parameters
+        ----------
+        connection : 'weak', 'strong'
+            Kind of connected components to extract. The edges between
+            strongly connected components are dropped. Default is 'weak'.
 
         Returns
         -------
         graphs : list
             A list of graph structures. Each having its own node list and
-            weight matrix. If the graph is directed, add into the info
-            parameter the information about the source nodes and the sink
-            nodes.
+            weight matrix. The index of its nodes in the original graph are
+            in the 'orig_idx' entry of the info attribute. If the graph is
+            directed, the info attribute also contains the source nodes
+            (without incoming edges) and the sink nodes (without outgoing
+            edges) of the component.
 
         Examples
         --------
@@ -413,39 +613,28 @@ class Graph(fourier.GraphFourier, difference.GraphDifference):
         >>> sinks_0 = components[0].info['sink'] if has_sinks else []
 
         """
-        if self.A.shape[0] != self.A.shape[1]:
-            self.logger.error('Inconsistent shape to extract components. '
-                              'Square matrix required.')
-            return None
+        labels = self.connected_components(connection)
+        directed = self.is_directed()
 
-        if self.is_directed():
-            raise NotImplementedError('Directed graphs not supported yet.')
+        # Group the nodes of each component.
+        order = np.argsort(labels, kind='mergesort')
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(labels))))
+        W = self.W.tocsr()[order, :].tocsc()[:, order].tocsr()
 
         graphs = []
-
-        visited = np.zeros(self.A.shape[0], dtype=bool)
-        # indices = [] # Assigned but never used
-
-        while not visited.all():
-            stack = set(np.nonzero(~visited)[0])
-            comp = []
-
-            while len(stack):
-                v = stack.pop()
-                if not visited[v]:
-                    comp.append(v)
-                    visited[v] = True
-
-                    # Add indices of nodes not visited yet and accessible from
-                    # v
-                    stack.update(set([idx for idx in self.A[v, :].nonzero()[1]
-                                      if not visited[idx]]))
-
-            comp = sorted(comp)
-            self.logger.info(('Constructing subgraph for component of '
-                              'size {}.').format(len(comp)))
-            G = self.subgraph(comp)
-            G.info = {'orig_idx': comp}
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            sub_W = W[start:end, start:end]
+            orig_idx = order[start:end]
+            coords = self.coords[orig_idx] if hasattr(self, 'coords') else None
+            G = Graph.from_csr(sub_W, lap_type=self.lap_type,
+                               symmetric=None if directed else True,
+                               validated=True, coords=coords,
+                               dtype=self.dtype)
+            G.info = {'orig_idx': orig_idx}
+            if directed:
+                A = sub_W > 0
+                G.info['source'] = np.flatnonzero(A.getnnz(axis=0) == 0)
+                G.info['sink'] = np.flatnonzero(A.getnnz(axis=1) == 0)
             graphs.append(G)
 
         return graphs
@@ -453,7 +642,7 @@ class Graph(fourier.GraphFourier, difference.GraphDifference):
     def compute_laplacian(self, lap_type='combinatorial'):
         r"""Compute a graph Laplacian.
 
-        The result is accessible by the L attribute.
+        The result is accessible by the :attr:`L` property.
 
         Parameters
         ----------
@@ -495,12 +684,17 @@ class Graph(fourier.GraphFourier, difference.GraphDifference):
             raise ValueError('Unknown Laplacian type {}'.format(lap_type))
         self.lap_type = lap_type
 
+        if hasattr(self, '_L_scaled'):
+            del self._L_scaled
+        if hasattr(self, '_solvers'):
+            del self._solvers
+
         if self.is_directed():
 
             if lap_type == 'combinatorial':
                 D1 = sparse.diags(np.ravel(self.W.sum(0)), 0)
                 D2 = sparse.diags(np.ravel(self.W.sum(1)), 0)
-                self.L = 0.5 * (D1 + D2 - self.W - self.W.T).tocsc()
+                self._L = 0.5 * (D1 + D2 - self.W - self.W.T).tocsc()
 
             elif lap_type == 'normalized':
                 raise NotImplementedError('Directed graphs with normalized '
@@ -510,12 +704,23 @@ class Graph(fourier.GraphFourier, difference.GraphDifference):
 
             if lap_type == 'combinatorial':
                 D = sparse.diags(np.ravel(self.W.sum(1)), 0)
-                self.L = (D - self.W).tocsc()
+                self._L = (D - self.W).tocsc()
 
             elif lap_type == 'normalized':
                 d = np.power(self.dw, -0.5)
                 D = sparse.diags(np.ravel(d), 0).tocsc()
-                self.L = sparse.identity(self.n_nodes) - D * self.W * D
+                self._L = (sparse.identity(self.n_nodes, dtype=self.dtype) -
+                           D * self.W * D)
+
+    @property
+    def L(self):
+        r"""Graph Laplacian, of type :attr:`lap_type`.
+
+        Is computed by :func:`compute_laplacian`, on first access if needed.
+        """
+        if not hasattr(self, '_L'):
+            self.compute_laplacian(self.lap_type)
+        return self._L
 
 
     @property
@@ -541,7 +746,10 @@ class Graph(fourier.GraphFourier, difference.GraphDifference):
     def dw(self):
         r"""The weighted degree (the sum of weighted edges) of each node."""
         if not hasattr(self, '_dw'):
-            self._dw = np.asarray(self.W.sum(axis=1)).squeeze()
+            if not hasattr(self, '_W'):
+                self._dw = self._structure.degrees().astype(self.dtype)
+            else:
+                self._dw = np.asarray(self.W.sum(axis=1)).squeeze()
         return self._dw
 
     @property
@@ -563,7 +771,9 @@ class Graph(fourier.GraphFourier, difference.GraphDifference):
     def estimate_lmax(self, recompute=False):
         r"""Estimate the Laplacian's largest eigenvalue (cached).
 
-        The result is cached and accessible by the :attr:`lmax` property.
+        The result is cached and accessible by the :attr:`lmax` property. It
+        is also persisted if a cache directory was set with
+        :func:`pygsp.utils.set_cache_dir`.
 
         Exact value given by the eigendecomposition of the Laplacian, see
         :func:`compute_fourier_basis`. That estimation is much faster than the
@@ -585,6 +795,12 @@ class Graph(fourier.GraphFourier, difference.GraphDifference):
         As this is a very mild effect, it is not necessary to obtain very tight
         bounds on the spectrum of L.
 
+        The largest eigenvalue of lattice graphs (:class:`Path`,
+        :class:`Ring`, :class:`Grid2d`, and :class:`Torus`) is given exactly
+        by a closed form, and the one of a :class:`ProductGraph` by the ones
+        of its factors if possible. Otherwise, the Lanczos method runs on
+        their matrix-free Laplacian.
+
         Examples
         --------
         >>> G = graphs.Logo()
@@ -600,8 +816,25 @@ class Graph(fourier.GraphFourier, difference.GraphDifference):
         if hasattr(self, '_lmax') and not recompute:
             return
 
+        if hasattr(self, '_structure'):
+            lmax = self._structure.lmax(self.lap_type)
+            if lmax is not None:
+                self._lmax = lmax
+                return
+
+        cached = None if recompute else utils._cache_load(self, 'lmax')
+        if cached is not None:
+            self._lmax = float(cached['lmax'])
+            return
+
+        L = None
+        if hasattr(self, '_structure'):
+            L = self._structure.laplacian(self.lap_type, self.dtype)
+        if L is None:
+            L = self.L
+
         try:
-            lmax = sparse.linalg.eigsh(self.L, k=1, tol=5e-3,
+            lmax = sparse.linalg.eigsh(L, k=1, tol=5e-3,
                                        ncv=min(self.N, 10),
                                        return_eigenvectors=False)
             lmax = lmax[0]
@@ -619,6 +852,323 @@ class Graph(fourier.GraphFourier, difference.GraphDifference):
                                  '{}'.format(self.lap_type))
 
         self._lmax = lmax
+        utils._cache_save(self, 'lmax', lmax=lmax)
+
+    def solver(self, shift=0, method='direct', preconditioner='jacobi'):
+        r"""Solver of linear systems in the (shifted) Laplacian (cached).
+
+        The returned solver's ``solve(b)`` method solves :math:`(L + \epsilon
+        I) x = b` for one or many right-hand sides :math:`b` at once, of
+        shape ``(N,)`` or ``(N, N_SIGNALS)``. It applies the filter
+        :math:`1 / (\epsilon + \lambda)` exactly, e.g., the Green kernel used
+        for interpolation. The solvers are cached per parameters until the
+        Laplacian changes. The factorization (or the preconditioner) is thus
+        computed once, and later solves only cost a pair of triangular
+        solves (or the iterations of the conjugate gradient).
+
+        If the shift is 0, the Laplacian is singular: it is grounded at a
+        node of each connected component, and the solver returns the
+        minimum-norm least-squares solution :math:`x = L^+ b`.
+
+        Parameters
+        ----------
+        shift : float
+            Shift :math:`\epsilon` of the spectrum. Default is 0.
+        method : {'direct', 'cg'}
+            Whether to factorize the matrix, or to solve with the
+            preconditioned conjugate gradient, which scales to larger graphs.
+            Default is 'direct'.
+        preconditioner : {'jacobi', 'ilu', 'amg'}
+            Preconditioner of the conjugate gradient. See
+            :class:`pygsp.graphs.solver.LaplacianSolver`. Default is 'jacobi'.
+
+        Returns
+        -------
+        solver : :class:`pygsp.graphs.solver.LaplacianSolver`
+
+        Examples
+        --------
+        >>> G = graphs.Sensor(100, seed=42)
+        >>> solver = G.solver(shift=0.1)
+        >>> b = np.random.RandomState(42).normal(size=(G.N, 3))
+        >>> x = solver.solve(b)
+        >>> np.allclose(G.L.dot(x) + 0.1 * x, b)
+        True
+        >>> G.solver(shift=0.1) is solver
+        True
+
+        The pseudo-inverse of the Laplacian is applied if there is no shift:
+
+        >>> x = G.solver(method='cg', preconditioner='ilu').solve(b, tol=1e-10)
+        >>> np.allclose(x, np.linalg.pinv(G.L.toarray()).dot(b))
+        True
+
+        """
+        # A lazily computed Laplacian resets the cache.
+        L = self.L
+        key = (shift, method, preconditioner if method == 'cg' else None)
+        if not hasattr(self, '_solvers'):
+            self._solvers = dict()
+        if key not in self._solvers:
+            kernel = None
+            if shift == 0 and self.lap_type == 'combinatorial':
+                kernel = np.ones(self.n_nodes)
+            elif shift == 0:
+                kernel = np.sqrt(self.dw)
+            self._solvers[key] = LaplacianSolver(L, shift, method,
+                                                 preconditioner, kernel)
+        return self._solvers[key]
+
+    def _scaled_laplacian(self):
+        r"""Laplacian with its spectrum mapped from [0, lmax] to [-1, 1].
+
+        That is the operator :math:`\frac{2}{\lambda_{max}} L - I` on which the
+        Chebyshev recurrence is run. It is cached until :attr:`lmax` or
+        :attr:`L` change. Lattice and product graphs return a matrix-free
+        operator.
+        """
+        lmax = self.lmax
+        if not hasattr(self, '_L_scaled') or self._L_scaled[0] != lmax:
+            L = None
+            if hasattr(self, '_structure'):
+                L = self._structure.laplacian(self.lap_type, self.dtype,
+                                              scale=2. / lmax, shift=-1)
+            if L is None:
+                L = self.L.tocsr() * self.dtype.type(2. / lmax)
+                L = L - sparse.identity(self.N, format='csr',
+                                        dtype=self.dtype)
+            self._L_scaled = (lmax, L)
+        return self._L_scaled[1]
+
+    def _hash(self, laplacian=True):
+        r"""Content hash of the weight matrix and the Laplacian type.
+
+        It identifies the graph in persisted data, e.g. a saved Fourier basis.
+        Two graphs with the same weighted edges and Laplacian type share the
+        same hash, whatever the order in which their edges were stored. The
+        Laplacian type, and the dtype if it is not float64, are left out if
+        ``laplacian`` is False.
+        """
+        W = self.W.tocsr(copy=True)
+        W.sum_duplicates()  # Also sorts the indices.
+        h = hashlib.sha1()
+        h.update(np.asarray(W.shape, dtype=np.int64).tobytes())
+        h.update(np.asarray(W.indptr, dtype=np.int64).tobytes())
+        h.update(np.asarray(W.indices, dtype=np.int64).tobytes())
+        h.update(np.asarray(W.data, dtype=np.float64).tobytes())
+        if laplacian:
+            h.update(self.lap_type.encode('ascii'))
+            if self.dtype != np.float64:
+                # Keep the hashes of float64 graphs stable.
+                h.update(self.dtype.str.encode('ascii'))
+        return h.hexdigest()
+
+    def add_edges(self, i, j, w=1.):
+        r"""Add edges to the graph, in place.
+
+        The weight matrix, the Laplacian, and the degrees are patched instead
+        of being recomputed, and only the quantities which cannot be patched
+        are dropped. The Fourier basis can be updated with
+        :meth:`update_fourier_basis`. An upper bound of :attr:`lmax`
+        is maintained, such that Chebyshev filtering keeps working without a
+        new estimation. For undirected graphs, the reverse edges are added too
+        such that the graph stays undirected.
+
+        Parameters
+        ----------
+        i : int or array_like
+            Source nodes of the edges.
+        j : int or array_like
+            Target nodes of the edges.
+        w : float or array_like
+            Positive weights of the edges (default is 1).
+
+        See also
+        --------
+        remove_edges, update_weights, update_fourier_basis
+
+        Examples
+        --------
+        >>> G = graphs.Path(5)
+        >>> G.estimate_lmax()
+        >>> G.Ne
+        4
+        >>> G.add_edges([0, 1], [4, 3], [1, 0.5])
+        >>> G.Ne
+        6
+        >>> G.W[4, 0], G.W[3, 1]
+        (1.0, 0.5)
+        >>> G.remove_edges(0, 4)
+        >>> G.Ne
+        5
+
+        """
+        self._edit_edges(i, j, w, 'add')
+
+    def remove_edges(self, i, j):
+        r"""Remove edges from the graph, in place.
+
+        See :meth:`add_edges` for the maintenance of cached quantities.
+
+        Parameters
+        ----------
+        i : int or array_like
+            Source nodes of the edges.
+        j : int or array_like
+            Target nodes of the edges.
+
+        """
+        self._edit_edges(i, j, 0, 'remove')
+
+    def update_weights(self, i, j, w):
+        r"""Change the weights of existing edges, in place.
+
+        See :meth:`add_edges` for the maintenance of cached quantities.
+
+        Parameters
+        ----------
+        i : int or array_like
+            Source nodes of the edges.
+        j : int or array_like
+            Target nodes of the edges.
+        w : float or array_like
+            New positive weights of the edges.
+
+        """
+        self._edit_edges(i, j, w, 'update')
+
+    def _edit_edges(self, i, j, w, kind):
+
+        i = np.asarray(i, dtype=np.intp).reshape(-1)
+        j = np.asarray(j, dtype=np.intp).reshape(-1)
+        if i.shape != j.shape:
+            raise ValueError('There should be as many source nodes as target '
+                             'nodes, got {} and {}.'.format(i.size, j.size))
+        if (np.any(i < 0) or np.any(j < 0) or
+                np.any(i >= self.N) or np.any(j >= self.N)):
+            raise ValueError('Node indices should be in [0, {}].'.format(
+                self.N - 1))
+        w = np.array(np.broadcast_to(np.asarray(w, dtype=float), i.shape))
+        if kind != 'remove' and np.any(w <= 0):
+            raise ValueError('Edge weights should be positive. Use '
+                             'remove_edges() to remove edges.')
+
+        directed = self.is_directed()
+        if not directed:
+            # Edit the reverse edges too (self-loops only once).
+            reverse = i != j
+            i, j = (np.concatenate((i, j[reverse])),
+                    np.concatenate((j, i[reverse])))
+            w = np.concatenate((w, w[reverse]))
+
+        # Locate the edges in the CSR structure through their global
+        # (row-major) position, which is sorted if the indices are. The
+        # weight matrix may be shared with the user or other graphs: edit a
+        # copy.
+        W = self.W.tocsr(copy=True)
+        if W.dtype.kind != 'f':
+            W = W.astype(utils.get_default_dtype())
+        W.sort_indices()
+        N = np.int64(self.N)
+        rows = np.repeat(np.arange(N), np.diff(W.indptr))
+        keys = rows * N + W.indices
+        query = i * N + j
+        if np.unique(query).size != query.size:
+            raise ValueError('Duplicate edges.')
+        pos = np.searchsorted(keys, query)
+        exists = pos < keys.size
+        exists[exists] = keys[pos[exists]] == query[exists]
+
+        if kind == 'add':
+            if np.any(exists):
+                raise ValueError('Some edges already exist. Use '
+                                 'update_weights() to change their weight.')
+            delta = w.astype(W.dtype)
+            W = W + sparse.csr_matrix((w, (i, j)), shape=W.shape,
+                                      dtype=W.dtype)
+        else:
+            if not np.all(exists):
+                raise ValueError('Some edges do not exist.')
+            delta = (w - W.data[pos]).astype(W.dtype)
+            W.data[pos] = w
+            if kind == 'remove':
+                W.eliminate_zeros()
+        self.W = W
+
+        self._patch_edges(i, j, delta, kind, directed)
+
+    def _patch_edges(self, i, j, delta, kind, directed):
+        r"""Update the cached quantities after a change of edge weights."""
+
+        if (hasattr(self, '_U') and hasattr(self, '_L') and
+                not hasattr(self, '_fourier_stale')):
+            # Keep the outdated basis for update_fourier_basis(), with the
+            # Laplacian it was computed for.
+            self._fourier_stale = (self._e, self._U,
+                                   getattr(self, '_fourier_which', 'smallest'),
+                                   self._L, self.lap_type)
+
+        dW = sparse.csr_matrix((delta, (i, j)), shape=self.W.shape,
+                               dtype=self.dtype)
+        if directed:
+            # The Laplacian of a directed graph is the one of (W + W^T) / 2.
+            dW = (dW + dW.T) / 2.
+
+        if hasattr(self, '_dw'):
+            dw = np.bincount(i, delta, minlength=self.N)
+            self._dw = self._dw + dw.astype(self._dw.dtype)
+
+        if hasattr(self, '_n_edges'):
+            if directed:
+                # The graph may have become undirected: count again.
+                del self._n_edges
+            elif kind != 'update':
+                n_edges = np.sum(i <= j)
+                self._n_edges += n_edges if kind == 'add' else -n_edges
+
+        if hasattr(self, '_L'):
+            if self.lap_type == 'combinatorial':
+                dL = sparse.diags(np.ravel(dW.sum(axis=1)), 0) - dW
+                self._L = (self._L + dL).tocsc()
+            else:
+                del self._L
+
+        if hasattr(self, '_lmax'):
+            if self.lap_type == 'normalized':
+                # Spectrum is bounded by [0, 2].
+                self._lmax = 2.
+            else:
+                # Removing edges or decreasing weights subtracts a positive
+                # semi-definite matrix: the largest eigenvalue can only
+                # decrease. Increases are bounded by the norm of the
+                # perturbation, itself bounded by its largest row sum.
+                dW = dW.multiply(dW > 0)
+                bound = self._lmax
+                if dW.nnz > 0:
+                    bound += 2 * np.max(np.abs(dW).sum(axis=1))
+                if directed:
+                    dw = (np.ravel(self.W.sum(axis=0)) +
+                          np.ravel(self.W.sum(axis=1))) / 2.
+                else:
+                    dw = self.dw
+                # Bound from the degrees: lmax <= 2 max(dw).
+                self._lmax = min(bound, 2 * np.max(dw))
+
+        if hasattr(self, '_connected'):
+            # Adding edges does not disconnect the graph and removing edges
+            # does not connect it.
+            if ((kind == 'remove' and self._connected) or
+                    (kind == 'add' and not self._connected)):
+                del self._connected
+
+        stale = ['_A', '_d', '_D', '_U', '_e', '_mu', '_fourier_which',
+                 '_components', '_L_scaled', '_structure',
+                 '_fourier_closed_form', '_solvers']
+        if directed:
+            stale.append('_directed')
+        for name in stale:
+            if hasattr(self, name):
+                delattr(self, name)
 
     def get_edge_list(self):
         r"""Return an edge list, an alternative representation of the graph.
@@ -5,6 +5,7 @@ from scipy import sparse
 
 from pygsp import utils
 from . import Graph  # prevent circular import in Python < 3.5
+from .lattice import Lattice
 
 
 class Grid2d(Graph):
@@ -57,6 +58,8 @@ class Grid2d(Graph):
         plotting = {"limits": np.array([-1. / N2, 1 + 1. / N2,
                                         1. / N1, 1 + 1. / N1])}
 
+        self._structure = Lattice((N1, N2), (False, False), (1, 1))
+
         super(Grid2d, self).__init__(W=W, coords=coords,
                                      plotting=plotting, **kwargs)
 
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+
+from functools import reduce
+
+import numpy as np
+from scipy import fft
+from scipy.sparse import linalg
+
+from pygsp import utils
+
+
+def _take(axis, start=None, stop=None):
+    r"""Index a range along one axis of an array."""
+    return (slice(None),) * axis + (slice(start, stop),)
+
+
+def _dht(x, axis):
+    r"""Orthonormal discrete Hartley transform, which is its own inverse."""
+    X = fft.fft(x, axis=axis, norm='ortho')
+    if not np.iscomplexobj(x):
+        return X.real - X.imag
+    # The transform is (X[m] + X[-m]) / 2 + i (X[m] - X[-m]) / 2.
+    Y = np.roll(np.flip(X, axis), 1, axis)
+    return ((1 + 1j) * X + (1 - 1j) * Y) / 2
+
+
+def _transform(x, kind, axis, inverse=False):
+    r"""Orthonormal DCT-I, DCT-II, or discrete Hartley transform."""
+    if kind == 'dht':
+        return _dht(x, axis)
+    dct = fft.idct if inverse else fft.dct
+    return dct(x, type=1 if kind == 'dct1' else 2, norm='ortho', axis=axis)
+
+
+class Lattice(object):
+    r"""Matrix-free operators of a lattice graph with unit weights.
+
+    The nodes are the points of a regular grid, numbered in row-major (C)
+    order, and each node is connected to its ``k`` nearest neighbors in both
+    directions along each axis. Axes can be periodic (rings) or not (paths).
+    The Laplacian, the gradient, and the divergence are computed by slicing
+    the signals reshaped to the grid, without any sparse matrix nor index
+    array. The largest eigenvalue of the Laplacian has a closed form.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        Number of nodes along each axis.
+    periodic : tuple of bool
+        Whether each axis wraps around.
+    k : tuple of int
+        Number of neighbors in each direction along each axis. Non-periodic
+        axes only support ``k = 1``, and periodic ones need more than ``2 k``
+        nodes such that all the neighbors are distinct.
+
+    """
+
+    def __init__(self, shape, periodic, k):
+        self.shape = tuple(shape)
+        self.periodic = tuple(periodic)
+        self.k = tuple(k)
+        for n, periodic, k in zip(self.shape, self.periodic, self.k):
+            if periodic and n <= 2 * k:
+                raise ValueError('A periodic axis needs more than 2k nodes.')
+            if not periodic and k != 1:
+                raise ValueError('A non-periodic axis needs k = 1.')
+        self.n_nodes = int(np.prod(self.shape))
+
+    def _axes(self):
+        return enumerate(zip(self.shape, self.periodic, self.k))
+
+    def adjacency_dot(self, x, out=None):
+        r"""Product :math:`W x` of the weight matrix with signals.
+
+        The product is added to ``out`` if given.
+        """
+        X = x.reshape(self.shape + x.shape[1:])
+        if out is None:
+            out = np.zeros_like(x)
+        Y = out.reshape(X.shape)
+        for axis, (n, periodic, k) in self._axes():
+            for o in range(1, k + 1):
+                Y[_take(axis, o)] += X[_take(axis, None, -o)]
+                Y[_take(axis, None, -o)] += X[_take(axis, o)]
+                if periodic:
+                    Y[_take(axis, None, o)] += X[_take(axis, n - o)]
+                    Y[_take(axis, n - o)] += X[_take(axis, None, o)]
+        return out
+
+    def degrees(self, dtype=np.float64):
+        r"""Weighted degree of each node."""
+        return self.adjacency_dot(np.ones(self.n_nodes, dtype=dtype))
+
+    def laplacian(self, lap_type, dtype, scale=1, shift=0):
+        r"""Operator :math:`a L + b I`, with scale a and shift b.
+
+        The returned :class:`scipy.sparse.linalg.LinearOperator` computes in
+        the type of the signals if they are more precise than dtype.
+        """
+        dtype = np.dtype(dtype)
+        dw = self.degrees(dtype)
+
+        # Factor a out to accumulate W x in place: a L + b I is
+        # -a (W - dw - b / a) for the combinatorial Laplacian, and
+        # -a d (W d - (1 + b / a) / d) for the normalized one, where
+        # d = dw^{-1/2}.
+        if lap_type == 'combinatorial':
+            d = None
+            diag = -(dw + shift / scale)
+            outer = dtype.type(-scale)
+        else:
+            dw[dw == 0] = 1
+            d = np.power(dw, -0.5)
+            diag = -(1 + shift / scale) / d
+            outer = -scale * d
+        diag = diag.astype(dtype, copy=False)
+
+        def matmat(x):
+            x = np.asarray(x)
+            x = x.astype(utils._signal_dtype(x, dtype), copy=False)
+            column = (-1,) + (1,) * (x.ndim - 1)
+            y = diag.reshape(column) * x
+            if d is None:
+                self.adjacency_dot(x, out=y)
+                y *= outer
+            else:
+                self.adjacency_dot(d.reshape(column) * x, out=y)
+                y *= outer.reshape(column)
+            return y
+
+        return linalg.LinearOperator((self.n_nodes, self.n_nodes),
+                                     matvec=matmat, rmatvec=matmat,
+                                     matmat=matmat, dtype=dtype)
+
+    def lmax(self, lap_type):
+        r"""Largest eigenvalue of the Laplacian, or None if not known.
+
+        The spectrum of a Cartesian product of graphs is the sum of their
+        spectra. Paths have eigenvalues :math:`2 - 2 \cos(\pi m / n)` and
+        rings :math:`2 k - 2 \sum_{o=1}^k \cos(2 \pi o m / n)`.
+        """
+        if lap_type == 'combinatorial':
+            lmax = 0
+            for axis, (n, periodic, k) in self._axes():
+                if periodic:
+                    m = np.arange(n)[:, np.newaxis]
+                    o = np.arange(1, k + 1)
+                    e = 2 * k - 2 * np.cos(2 * np.pi * o * m / n).sum(axis=1)
+                    lmax += np.max(e)
+                elif n > 1:
+                    lmax += 2 - 2 * np.cos(np.pi * (n - 1) / n)
+            return lmax
+        if all(self.periodic):
+            # Regular graph: the normalized Laplacian is L / degree.
+            return self.lmax('combinatorial') / (2 * sum(self.k))
+        if all(k == 1 for k in self.k) and all(
+                n % 2 == 0 for n, p in zip(self.shape, self.periodic) if p):
+            # Connected bipartite graph.
+            return 2.
+        return None
+
+    def _spectra(self, lap_type):
+        r"""Eigendecomposition of the Laplacian along each axis.
+
+        Returns (transform, eigenvalues) pairs, where the transform is one of
+        'dht', 'dct1' or 'dct2' (see :func:`_transform`), or None if the
+        eigendecomposition is not known.
+        """
+        if lap_type == 'normalized':
+            if all(self.periodic):
+                # Regular graph: the normalized Laplacian is L / degree.
+                degree = 2 * sum(self.k)
+            elif len(self.shape) == 1 and self.shape[0] > 1:
+                # The eigenvectors of the normalized Laplacian of a path are
+                # D^{1/2} times the ones of the random walk, i.e. the DCT-I
+                # basis. Normalized, they are the orthonormal DCT-I basis.
+                n = self.shape[0]
+                return [('dct1', 1 - np.cos(np.pi * np.arange(n) / (n - 1)))]
+            else:
+                return None
+        else:
+            degree = 1
+
+        spectra = []
+        for axis, (n, periodic, k) in self._axes():
+            if periodic:
+                # Circulant: the Hartley basis is a real Fourier basis.
+                m = np.arange(n)[:, np.newaxis]
+                o = np.arange(1, k + 1)
+                e = 2 * k - 2 * np.cos(2 * np.pi * o * m / n).sum(axis=1)
+                spectra.append(('dht', e / degree))
+            else:
+                e = 2 - 2 * np.cos(np.pi * np.arange(n) / n)
+                spectra.append(('dct2', e))
+        return spectra
+
+    def eigenvalues(self, lap_type):
+        r"""Eigenvalues of the Laplacian, or None if not known.
+
+        The eigenvalues are in the order of the coefficients returned by
+        :meth:`gft`. The spectrum of a Cartesian product of graphs is the sum
+        of their spectra.
+        """
+        spectra = self._spectra(lap_type)
+        if spectra is None:
+            return None
+        return reduce(np.add.outer, [e for _, e in spectra]).ravel()
+
+    def gft(self, x, lap_type, inverse=False):
+        r"""Graph Fourier transform of signals, with fast 1D transforms.
+
+        Each axis is transformed in :math:`O(n \log n)` operations by an
+        orthonormal DCT or discrete Hartley transform.
+        """
+        X = x.reshape(self.shape + x.shape[1:])
+        for axis, (kind, _) in enumerate(self._spectra(lap_type)):
+            X = _transform(X, kind, axis, inverse)
+        return X.reshape(x.shape)
+
+    def _bases(self, lap_type):
+        r"""Fourier basis of each axis, as dense matrices."""
+        return [_transform(np.identity(len(e)), kind, 0, inverse=True)
+                for kind, e in self._spectra(lap_type)]
+
+    def basis(self, lap_type, index):
+        r"""Fourier basis, restricted to the eigenvectors at index."""
+        return reduce(np.kron, self._bases(lap_type))[:, index]
+
+    def coherence(self, lap_type, index):
+        r"""Largest absolute entry of the Fourier basis :meth:`basis`.
+
+        The basis is the Kronecker product of the 1D bases, such that the
+        largest entry of each of its columns is a product of the largest
+        entries of the columns of the 1D bases.
+        """
+        mu = [np.max(np.abs(U), axis=0) for U in self._bases(lap_type)]
+        return np.max(reduce(np.multiply.outer, mu).ravel()[index])
+
+    def _edge_slots(self):
+        r"""Ways for a node to be the largest endpoint of an edge.
+
+        A node at position p along an axis is the largest endpoint of the
+        edge to position p - o if p >= o, and of the edge which wraps around
+        to position p + o - n if p >= n - o. The neighbors of the nodes at
+        positions [start, n) are thus at positions [0, n - start). Slots are
+        sorted by the index offset to the neighbor, i.e. in the order of the
+        edges given by :meth:`Graph.get_edge_list`. Returns (offset, axis,
+        start) tuples.
+        """
+        strides = np.cumprod((1,) + self.shape[:0:-1])[::-1]
+        slots = []
+        for axis, (n, periodic, k) in self._axes():
+            for o in range(1, k + 1):
+                slots.append((-o * strides[axis], axis, o))
+                if periodic:
+                    slots.append(((o - n) * strides[axis], axis, n - o))
+        return sorted(slots)
+
+    def _edge_mask(self):
+        r"""Which slots are edges, of shape (N, n_slots)."""
+        slots = self._edge_slots()
+        mask = np.zeros(self.shape + (len(slots),), dtype=bool)
+        for i, (_, axis, start) in enumerate(slots):
+            mask[_take(axis, start) + (Ellipsis, i)] = True
+        return mask.reshape(self.n_nodes, len(slots))
+
+    def grad(self, x, lap_type, dtype):
+        r"""Gradient :math:`D x`, in the edge order of the graph."""
+        x = np.asarray(x)
+        x = x.astype(utils._signal_dtype(x, dtype), copy=False)
+        if lap_type == 'normalized':
+            d = np.power(self.degrees(dtype), -0.5)
+            x = d.reshape((-1,) + (1,) * (x.ndim - 1)) * x
+        X = x.reshape(self.shape + x.shape[1:])
+        slots = self._edge_slots()
+        Y = np.zeros(self.shape + (len(slots),) + x.shape[1:], dtype=x.dtype)
+        for i, (_, axis, start) in enumerate(slots):
+            n = self.shape[axis]
+            slot = _take(axis, start) + (Ellipsis, i) + (slice(None),) * (
+                x.ndim - 1)
+            Y[slot] = X[_take(axis, start)] - X[_take(axis, None, n - start)]
+        Y = Y.reshape((self.n_nodes, len(slots)) + x.shape[1:])
+        return Y[self._edge_mask()]
+
+    def div(self, y, lap_type, dtype):
+        r"""Divergence :math:`D^T y` of edge signals in the graph order."""
+        y = np.asarray(y)
+        y = y.astype(utils._signal_dtype(y, dtype), copy=False)
+        slots = self._edge_slots()
+        mask = self._edge_mask()
+        Y = np.zeros(mask.shape + y.shape[1:], dtype=y.dtype)
+        Y[mask] = y
+        Y = Y.reshape(self.shape + (len(slots),) + y.shape[1:])
+        # The largest endpoints receive +y, the smallest ones -y.
+        X = Y.sum(axis=len(self.shape))
+        for i, (_, axis, start) in enumerate(slots):
+            n = self.shape[axis]
+            slot = _take(axis, start) + (Ellipsis, i) + (slice(None),) * (
+                y.ndim - 1)
+            X[_take(axis, None, n - start)] -= Y[slot]
+        x = X.reshape((self.n_nodes,) + y.shape[1:])
+        if lap_type == 'normalized':
+            d = np.power(self.degrees(dtype), -0.5)
+            x *= d.reshape((-1,) + (1,) * (x.ndim - 1))
+        return x
@@ -90,11 +90,11 @@ class NNGraph(Graph):
         self.order = order
 
         N, d = np.shape(self.Xin)
-        Xout = self.Xin
+        # A single copy, which is then centered and rescaled in place.
+        Xout = np.array(self.Xin, dtype=float)
 
         if self.center:
-            Xout = self.Xin - np.kron(np.ones((N, 1)),
-                                      np.mean(self.Xin, axis=0))
+            Xout -= np.mean(Xout, axis=0)
 
         if self.rescale:
             bounding_radius = 0.5 * np.linalg.norm(np.amax(Xout, axis=0) -
@@ -110,9 +110,6 @@ class NNGraph(Graph):
                             }
 
         if self.NNtype == 'knn':
-            spi = np.zeros((N * k))
-            spj = np.zeros((N * k))
-            spv = np.zeros((N * k))
 
             if self.use_flann:
                 pfl = _import_pfl()
@@ -126,37 +123,28 @@ class NNGraph(Graph):
                                  algorithm='kdtree')
 
             else:
-                kdt = spatial.KDTree(Xout)
+                kdt = spatial.cKDTree(Xout)
                 D, NN = kdt.query(Xout, k=(k + 1),
-                                  p=dist_translation[dist_type])
+                                  p=dist_translation[dist_type], workers=-1)
 
-            for i in range(N):
-                spi[i * k:(i + 1) * k] = np.kron(np.ones((k)), i)
-                spj[i * k:(i + 1) * k] = NN[i, 1:]
-                spv[i * k:(i + 1) * k] = np.exp(-np.power(D[i, 1:], 2) /
-                                                float(self.sigma))
+            # The first neighbor of each node is itself.
+            spi = np.repeat(np.arange(N), k)
+            spj = NN[:, 1:].reshape(-1)
+            spv = np.exp(-np.power(D[:, 1:].reshape(-1), 2) /
+                         float(self.sigma))
 
         elif self.NNtype == 'radius':
 
-            kdt = spatial.KDTree(Xout)
-            D, NN = kdt.query(Xout, k=None, distance_upper_bound=epsilon,
-                              p=dist_translation[dist_type])
-            count = 0
-            for i in range(N):
-                count = count + len(NN[i])
-
-            spi = np.zeros((count))
-            spj = np.zeros((count))
-            spv = np.zeros((count))
-
-            start = 0
-            for i in range(N):
-                leng = len(NN[i]) - 1
-                spi[start:start + leng] = np.kron(np.ones((leng)), i)
-                spj[start:start + leng] = NN[i][1:]
-                spv[start:start + leng] = np.exp(-np.power(D[i][1:], 2) /
-                                                 float(self.sigma))
-                start = start + leng
+            kdt = spatial.cKDTree(Xout)
+            # Pairs i < j, without self-loops, as an array.
+            pairs = kdt.query_pairs(epsilon, p=dist_translation[dist_type],
+                                    output_type='ndarray')
+            spi = np.concatenate([pairs[:, 0], pairs[:, 1]])
+            spj = np.concatenate([pairs[:, 1], pairs[:, 0]])
+
+            D = np.linalg.norm(Xout[spi] - Xout[spj],
+                               ord=dist_translation[dist_type], axis=1)
+            spv = np.exp(-np.power(D, 2) / float(self.sigma))
 
         else:
             raise ValueError('Unknown NNtype {}'.format(self.NNtype))
@@ -4,6 +4,7 @@ import numpy as np
 from scipy import sparse
 
 from . import Graph  # prevent circular import in Python < 3.5
+from .lattice import Lattice
 
 
 class Path(Graph):
@@ -36,6 +37,8 @@ class Path(Graph):
         W = sparse.csc_matrix((weights, (inds_i, inds_j)), shape=(N, N))
         plotting = {"limits": np.array([-1, N, -1, 1])}
 
+        self._structure = Lattice((N,), (False,), (1,))
+
         super(Path, self).__init__(W=W, plotting=plotting, **kwargs)
 
         self.set_coordinates('line2D')
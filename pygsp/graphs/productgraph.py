@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg
+
+from pygsp import utils
+from . import Graph  # prevent circular import in Python < 3.5
+
+
+class ProductGraph(Graph):
+    r"""Cartesian, Kronecker, or strong product of two graphs.
+
+    The node :math:`(i, j)`, made of the node :math:`i` of ``G1`` and the node
+    :math:`j` of ``G2``, has index ``i * G2.N + j``. A signal on the product
+    graph reshaped to ``(G1.N, G2.N)`` is thus a signal on ``G1`` along the
+    first axis and a signal on ``G2`` along the second.
+
+    Parameters
+    ----------
+    G1 : Graph
+        First factor.
+    G2 : Graph
+        Second factor.
+    kind : 'cartesian', 'kronecker', 'strong'
+        The Cartesian product :math:`G_1 \square G_2` has weight matrix
+        :math:`W = W_1 \otimes I + I \otimes W_2`. Two nodes are connected if
+        they are neighbors in one factor and equal in the other, e.g., a
+        spatial graph repeated over time. The Kronecker (or tensor) product
+        :math:`G_1 \times G_2` has weight matrix :math:`W = W_1 \otimes W_2`.
+        Two nodes are connected if they are neighbors in both factors. The
+        strong product :math:`G_1 \boxtimes G_2` has the edges of both.
+        Default is 'cartesian'.
+
+    Notes
+    -----
+    The weight matrix :attr:`W` and the Laplacian :attr:`L` are only
+    assembled if accessed (of undirected factors). Filtering,
+    :meth:`estimate_lmax`, and the other matrix-free operations apply it to
+    the signals reshaped as matrices :math:`X`, e.g.,
+    :math:`(W_1 \otimes W_2) x = W_1 X W_2^\top`.
+
+    The eigendecomposition of the product is derived from the ones of the
+    factors in two cases:
+
+    * The combinatorial Laplacian of a Cartesian product is
+      :math:`L = L_1 \otimes I + I \otimes L_2`, with eigenvalues
+      :math:`\lambda_i + \mu_j`.
+    * The normalized Laplacian of a Kronecker product is
+      :math:`L = I - (I - L_1) \otimes (I - L_2)`, with eigenvalues
+      :math:`1 - (1 - \lambda_i) (1 - \mu_j)`.
+
+    In both cases, if the factors have the same Laplacian type as the
+    product, the Fourier basis is :math:`U = U_1 \otimes U_2`, and
+    :meth:`compute_fourier_basis` only computes the Fourier bases of the
+    factors. The :meth:`gft` and :meth:`igft` then apply the transforms of
+    the factors along each axis, in :math:`O(N (N_1 + N_2))` operations
+    instead of :math:`O(N^2)`, or faster if the factors have closed-form
+    bases. :attr:`U` is then only built on first access. Otherwise, the
+    eigendecomposition of the assembled Laplacian is computed.
+
+    The factors should not be edited after the product has been built.
+
+    Examples
+    --------
+    >>> import matplotlib.pyplot as plt
+    >>> G = graphs.ProductGraph(graphs.Path(10), graphs.Ring(16))
+    >>> G.N, G.Ne
+    (160, 304)
+    >>> G.compute_fourier_basis()
+    >>> s = np.random.normal(size=G.N)
+    >>> np.allclose(G.gft(s), G.U.T.dot(s))
+    True
+    >>> fig = plt.figure()
+    >>> ax = fig.add_subplot(111, projection='3d')
+    >>> G.plot_signal(G.U[:, 2], ax=ax)
+
+    """
+
+    def __init__(self, G1, G2, kind='cartesian', **kwargs):
+
+        if kind not in ['cartesian', 'kronecker', 'strong']:
+            raise ValueError('Unknown kind of product {}.'.format(kind))
+
+        self.G1 = G1
+        self.G2 = G2
+        self.kind = kind
+
+        coords = None
+        if hasattr(G1, 'coords') and hasattr(G2, 'coords'):
+            # Constant dimensions, e.g. of Path, are useless in the product.
+            c1, c2 = [np.reshape(G.coords, (G.N, -1)) for G in [G1, G2]]
+            c1 = c1[:, np.ptp(c1, axis=0) > 0]
+            c2 = c2[:, np.ptp(c2, axis=0) > 0]
+            if 2 <= c1.shape[1] + c2.shape[1] <= 3:
+                coords = np.concatenate([np.repeat(c1, G2.N, axis=0),
+                                         np.tile(c2, (G1.N, 1))], axis=1)
+
+        if not G1.is_directed() and not G2.is_directed():
+            # The weight matrix is built on first access.
+            self._structure = _Product(G1, G2, kind)
+            W = None
+        else:
+            W = _Product(G1, G2, kind).weight_matrix(None)
+
+        super(ProductGraph, self).__init__(W=W, coords=coords, **kwargs)
+
+    def _get_extra_repr(self):
+        return dict(kind=self.kind, N1=self.G1.N, N2=self.G2.N)
+
+
+class _Product(object):
+    r"""Matrix-free operators of the product of two undirected graphs."""
+
+    def __init__(self, G1, G2, kind):
+        self.G1 = G1
+        self.G2 = G2
+        self.kind = kind
+        self.n_nodes = G1.N * G2.N
+
+    def _kron_dot(self, A, B, x):
+        r"""Product :math:`(A \otimes B) x`, where None is the identity."""
+        X = x.reshape((self.G1.N, self.G2.N, -1))
+        if A is not None:
+            X = A.dot(X.reshape(self.G1.N, -1)).reshape(X.shape)
+        if B is not None:
+            X = np.swapaxes(X, 0, 1)
+            X = B.dot(X.reshape(self.G2.N, -1)).reshape(X.shape)
+            X = np.swapaxes(X, 0, 1)
+        return X.reshape(x.shape)
+
+    def weight_matrix(self, dtype):
+        r"""Assemble the weight matrix, in the CSR format."""
+        W1, W2 = self.G1.W, self.G2.W
+        I1 = sparse.identity(self.G1.N, format='csr')
+        I2 = sparse.identity(self.G2.N, format='csr')
+        if self.kind == 'cartesian':
+            W = sparse.kron(W1, I2) + sparse.kron(I1, W2)
+        elif self.kind == 'kronecker':
+            W = sparse.kron(W1, W2)
+        else:
+            W = (sparse.kron(W1, I2) + sparse.kron(I1, W2) +
+                 sparse.kron(W1, W2))
+        W = sparse.csr_matrix(W, dtype=dtype)
+        W.eliminate_zeros()
+        return W
+
+    def n_edges(self):
+        r"""Number of edges, from the ones of the factors."""
+        N1, N2 = self.G1.N, self.G2.N
+        nnz1, nnz2 = self.G1.W.nnz, self.G2.W.nnz
+        a1 = np.count_nonzero(self.G1.W.diagonal())
+        a2 = np.count_nonzero(self.G2.W.diagonal())
+        # Non-zeros of W, and of its diagonal (self-loops).
+        if self.kind == 'kronecker':
+            nnz, diagonal = nnz1 * nnz2, a1 * a2
+        else:
+            diagonal = N1 * N2 - (N1 - a1) * (N2 - a2)
+            if self.kind == 'cartesian':
+                nnz = nnz1 * N2 + N1 * nnz2 - a1 * a2
+            else:
+                # (W1 + I) (x) (W2 + I) - I.
+                nnz = ((nnz1 + N1 - a1) * (nnz2 + N2 - a2) -
+                       (N1 - a1) * (N2 - a2))
+        return (nnz - diagonal) // 2 + diagonal
+
+    def adjacency_dot(self, x, dtype):
+        r"""Product :math:`W x` of the weight matrix with signals."""
+        W1 = self.G1.W.astype(dtype, copy=False)
+        W2 = self.G2.W.astype(dtype, copy=False)
+        if self.kind == 'cartesian':
+            return self._kron_dot(W1, None, x) + self._kron_dot(None, W2, x)
+        elif self.kind == 'kronecker':
+            return self._kron_dot(W1, W2, x)
+        else:
+            # (W1 + I) (x) (W2 + I) - I.
+            I1 = sparse.identity(self.G1.N, dtype=dtype)
+            I2 = sparse.identity(self.G2.N, dtype=dtype)
+            return self._kron_dot(W1 + I1, W2 + I2, x) - x
+
+    def degrees(self):
+        r"""Weighted degree of each node."""
+        d1, d2 = self.G1.dw, self.G2.dw
+        if self.kind == 'cartesian':
+            d = np.add.outer(d1, d2)
+        elif self.kind == 'kronecker':
+            d = np.multiply.outer(d1, d2)
+        else:
+            d = np.multiply.outer(d1 + 1, d2 + 1) - 1
+        return d.ravel()
+
+    def laplacian(self, lap_type, dtype, scale=1, shift=0):
+        r"""Operator :math:`a L + b I`, with scale a and shift b."""
+        dtype = np.dtype(dtype)
+        d = self.degrees()
+        if lap_type == 'combinatorial':
+            s = None
+            diag = (scale * d + shift).astype(dtype)
+        else:
+            d[d == 0] = 1
+            s = np.power(d, -0.5).astype(dtype)
+            diag = np.full(self.n_nodes, scale + shift, dtype=dtype)
+
+        def matmat(x):
+            x = np.asarray(x)
+            x = x.astype(utils._signal_dtype(x, dtype), copy=False)
+            column = (-1,) + (1,) * (x.ndim - 1)
+            y = x if s is None else s.reshape(column) * x
+            y = self.adjacency_dot(y, dtype)
+            if s is not None:
+                y *= s.reshape(column)
+            y *= dtype.type(-scale)
+            y += diag.reshape(column) * x
+            return y
+
+        return linalg.LinearOperator((self.n_nodes, self.n_nodes),
+                                     matvec=matmat, rmatvec=matmat,
+                                     matmat=matmat, dtype=dtype)
+
+    def _factorized(self, lap_type):
+        r"""Whether the Fourier basis is the product of the factors' ones."""
+        if self.G1.lap_type != lap_type or self.G2.lap_type != lap_type:
+            return False
+        return (self.kind, lap_type) in [('cartesian', 'combinatorial'),
+                                         ('kronecker', 'normalized')]
+
+    def lmax(self, lap_type):
+        r"""Largest eigenvalue of the Laplacian, or None if not known.
+
+        It is exact if the ones of the factors are.
+        """
+        if not self._factorized(lap_type):
+            return None
+        for G in [self.G1, self.G2]:
+            G.estimate_lmax()
+        l1, l2 = self.G1.lmax, self.G2.lmax
+        if self.kind == 'cartesian':
+            return l1 + l2
+        # A bilinear function is extremal at the corners of [0, l1] x [0, l2].
+        return max(l1, l2, 1 - (1 - l1) * (1 - l2))
+
+    def _bases(self):
+        r"""Factors, whose full Fourier bases are computed if needed."""
+        for G in [self.G1, self.G2]:
+            G.compute_fourier_basis()
+        return self.G1, self.G2
+
+    def eigenvalues(self, lap_type):
+        r"""Eigenvalues of the Laplacian, or None if not known.
+
+        The eigenvalues are in the order of the coefficients returned by
+        :meth:`gft`.
+        """
+        if not self._factorized(lap_type):
+            return None
+        G1, G2 = self._bases()
+        if self.kind == 'cartesian':
+            e = np.add.outer(G1.e, G2.e)
+        else:
+            e = 1 - np.multiply.outer(1 - G1.e, 1 - G2.e)
+        return np.maximum(e.ravel(), 0)
+
+    def gft(self, x, lap_type, inverse=False):
+        r"""Graph Fourier transform of signals, with the factors' ones."""
+        G1, G2 = self._bases()
+        X = x.reshape((G1.N, G2.N) + x.shape[1:])
+        X = G1.igft(X) if inverse else G1.gft(X)
+        X = np.swapaxes(X, 0, 1)
+        X = G2.igft(X) if inverse else G2.gft(X)
+        X = np.swapaxes(X, 0, 1)
+        return X.reshape(x.shape).astype(x.dtype, copy=False)
+
+    def basis(self, lap_type, index):
+        r"""Fourier basis, restricted to the eigenvectors at index."""
+        G1, G2 = self._bases()
+        return np.kron(G1.U, G2.U)[:, index]
+
+    def coherence(self, lap_type, index):
+        r"""Largest absolute entry of the Fourier basis :meth:`basis`."""
+        G1, G2 = self._bases()
+        mu = [np.max(np.abs(G.U), axis=0) for G in [G1, G2]]
+        return np.max(np.multiply.outer(*mu).ravel()[index])
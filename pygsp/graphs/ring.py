@@ -4,6 +4,7 @@ import numpy as np
 from scipy import sparse
 
 from . import Graph  # prevent circular import in Python < 3.5
+from .lattice import Lattice
 
 
 class Ring(Graph):
@@ -57,6 +58,9 @@ class Ring(Graph):
 
         plotting = {'limits': np.array([-1, 1, -1, 1])}
 
+        if N > 2*k:
+            self._structure = Lattice((N,), (True,), (k,))
+
         super(Ring, self).__init__(W=W, plotting=plotting, **kwargs)
 
         self.set_coordinates('ring2D')
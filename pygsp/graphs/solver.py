@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph, linalg
+
+from pygsp import utils
+
+
+class LaplacianSolver(object):
+    r"""Solver of linear systems in a (shifted) Laplacian.
+
+    It solves :math:`(L + \epsilon I) x = b` for any number of right-hand
+    sides :math:`b`. The matrix is factorized, or the preconditioner is
+    built, once at construction. Use :meth:`pygsp.graphs.Graph.solver` to
+    get the solver of a graph, which is cached.
+
+    Parameters
+    ----------
+    L : sparse matrix
+        Symmetric positive semi-definite matrix, e.g., a graph Laplacian.
+    shift : float
+        Shift :math:`\epsilon` of the spectrum. Default is 0.
+    method : {'direct', 'cg'}
+        Whether to factorize the matrix (with a sparse LU factorization and
+        a symmetric fill-reducing ordering), such that each solve is a pair
+        of triangular solves, or to solve with the preconditioned conjugate
+        gradient, which only needs sparse matrix products and scales to
+        larger graphs. Default is 'direct'.
+    preconditioner : {'jacobi', 'ilu', 'amg'}
+        Preconditioner of the conjugate gradient: the diagonal of the matrix,
+        a symmetric incomplete factorization :math:`L D L^\top`, or an
+        algebraic multigrid V-cycle (by smoothed aggregation of the nodes).
+        All are symmetric positive definite, as the conjugate gradient
+        requires. The incomplete factorization, whose fill grows with the
+        size, suits moderately sized graphs. Multigrid, whose memory and
+        number of iterations barely grow with the size, suits large graphs.
+        Default is 'jacobi'.
+    kernel : ndarray, optional
+        A vector spanning the null space of L on each of its connected
+        components, e.g., a constant for the combinatorial Laplacian. If
+        given and the shift is 0, the singular system is grounded: a node of
+        each component is removed to factorize or precondition an invertible
+        matrix. :meth:`solve` then returns the minimum-norm least-squares
+        solution :math:`x = L^+ b`. By default, the matrix is assumed to be
+        invertible.
+
+    Attributes
+    ----------
+    shift : float
+    method : str
+    preconditioner : str
+        None if ``method`` is 'direct'.
+
+    """
+
+    def __init__(self, L, shift=0, method='direct', preconditioner='jacobi',
+                 kernel=None):
+
+        if method not in ['direct', 'cg']:
+            raise ValueError('Unknown method {}.'.format(method))
+        if method == 'cg' and preconditioner not in ['jacobi', 'ilu', 'amg']:
+            raise ValueError('Unknown preconditioner {}.'.format(
+                preconditioner))
+
+        self.shift = shift
+        self.method = method
+        self.preconditioner = preconditioner if method == 'cg' else None
+
+        # Solutions have the dtype of the matrix, but the factorizations and
+        # iterations are computed in double precision.
+        L = sparse.csr_matrix(L)
+        self._dtype = L.dtype if L.dtype.kind == 'f' else np.float64
+        L = L.astype(np.float64)
+        self._free = None
+        self._null = None
+
+        if shift == 0 and kernel is not None:
+            n_nodes = L.shape[0]
+            kernel = np.asarray(kernel, dtype=np.float64)
+            _, labels = csgraph.connected_components(L, directed=False)
+            # Components on which the kernel vanishes are invertible.
+            norms = np.sqrt(np.bincount(labels, weights=kernel**2))
+            singular = norms > 0
+            # Ground the node of largest kernel entry of each component.
+            order = np.lexsort((-np.abs(kernel), labels))
+            first = order[np.unique(labels[order], return_index=True)[1]]
+            self._free = np.ones(n_nodes, dtype=bool)
+            self._free[first[singular]] = False
+            # Orthonormal basis of the null space, one column per component.
+            nodes = np.flatnonzero(singular[labels])
+            columns = np.cumsum(singular) - 1
+            self._null = sparse.csr_matrix(
+                (kernel[nodes] / norms[labels[nodes]],
+                 (nodes, columns[labels[nodes]])),
+                shape=(n_nodes, np.sum(singular)))
+            A = L[self._free][:, self._free]
+        elif shift != 0:
+            A = L + sparse.identity(L.shape[0], dtype=L.dtype,
+                                    format='csr') * shift
+        else:
+            A = L
+
+        self._A = A.tocsr()
+        self._n_unknowns = A.shape[0]
+        if self._n_unknowns == 0:
+            return
+
+        if method == 'direct':
+            self._lu = _factorize(A)
+        elif preconditioner == 'jacobi':
+            diagonal = A.diagonal()
+            diagonal[diagonal == 0] = 1
+            diagonal = diagonal[:, np.newaxis]
+            self._precondition = lambda r: r / diagonal
+        elif preconditioner == 'ilu':
+            self._precondition = _ildl(self._A)
+        else:
+            self._precondition = _amg(self._A)
+
+    def __repr__(self):
+        attrs = dict(shift=self.shift, method=self.method)
+        if self.preconditioner is not None:
+            attrs['preconditioner'] = self.preconditioner
+        attrs = ', '.join('{}={}'.format(k, v) for k, v in attrs.items())
+        return '{}({})'.format(self.__class__.__name__, attrs)
+
+    def _project(self, x):
+        r"""Remove the component of x in the null space, in place."""
+        if self._null is not None:
+            x -= self._null.dot(self._null.T.dot(x))
+        return x
+
+    def solve(self, b, tol=1e-6, maxiter=None):
+        r"""Solve the system for one or many right-hand sides.
+
+        Parameters
+        ----------
+        b : ndarray
+            Right-hand sides, of shape ``(N,)`` or ``(N, ...)``. They are
+            solved together, as a block.
+        tol : float
+            Relative residual at which the conjugate gradient stops. Unused
+            by the direct method. Default is 1e-6.
+        maxiter : int
+            Maximum number of iterations of the conjugate gradient. Default
+            is 10 N.
+
+        Returns
+        -------
+        x : ndarray
+            Solutions, of the shape of b.
+        """
+        b = np.asanyarray(b)
+        shape = b.shape
+        dtype = utils._signal_dtype(b, self._dtype)
+        b = np.array(b.reshape(shape[0], -1),
+                     dtype=np.result_type(dtype, np.float64))
+        b = self._project(b)
+
+        x = np.zeros_like(b)
+        free = slice(None) if self._free is None else self._free
+        if self._n_unknowns == 0:
+            pass
+        elif self.method == 'direct':
+            x[free] = _lu_solve(self._lu, b[free])
+        else:
+            x[free] = _pcg(self._A, b[free], self._precondition, tol,
+                           maxiter)
+
+        x = self._project(x).reshape(shape)
+        return x.astype(dtype, copy=False)
+
+
+def _factorize(A):
+    r"""Sparse LU factorization, in double precision."""
+    A = sparse.csc_matrix(A, dtype=np.float64)
+    return linalg.splu(A, permc_spec='MMD_AT_PLUS_A')
+
+
+def _lu_solve(lu, b, trans='N'):
+    r"""Solve with a real factorization, for real or complex b."""
+    if np.iscomplexobj(b):
+        return (lu.solve(np.ascontiguousarray(b.real), trans) +
+                1j * lu.solve(np.ascontiguousarray(b.imag), trans))
+    return lu.solve(b, trans)
+
+
+def _pcg(A, b, precondition, tol=1e-6, maxiter=None):
+    r"""Solve :math:`A x = b` for all the columns of b at once.
+
+    The preconditioned conjugate gradient is run on all the columns
+    together, such that each iteration costs a single sparse matrix product
+    and a single application of the preconditioner. A singular system, e.g.,
+    with a Laplacian, is solved if b is in the range of A.
+    """
+    b = b.reshape(b.shape[0], -1)
+    if maxiter is None:
+        maxiter = 10 * b.shape[0]
+
+    def dot(x, y):
+        return np.einsum('ij,ij->j', x, y)
+
+    x = np.zeros_like(b)
+    r = b.copy()
+    z = precondition(r)
+    p = z.copy()
+    rz = dot(r, z)
+    threshold = tol**2 * dot(b, b)
+
+    for _ in range(maxiter):
+        if np.all(dot(r, r) <= threshold):
+            break
+        Ap = A.dot(p)
+        pAp = dot(p, Ap)
+        # Converged columns have a null direction.
+        alpha = np.divide(rz, pAp, out=np.zeros_like(rz), where=pAp != 0)
+        x += alpha * p
+        Ap *= alpha
+        r -= Ap
+        z = precondition(r)
+        rz, rz_old = dot(r, z), rz
+        beta = np.divide(rz, rz_old, out=np.zeros_like(rz), where=rz_old != 0)
+        p *= beta
+        p += z
+
+    return x
+
+
+def _ildl(A, drop_tol=1e-4, fill_factor=10):
+    r"""Build a symmetric incomplete factorization, as a preconditioner.
+
+    An incomplete LU factorization is computed with a symmetric fill-reducing
+    ordering and without pivoting. Its unit lower factor :math:`L` and the
+    magnitude of the diagonal :math:`D` of its upper factor define :math:`M =
+    L |D| L^\top`, which is symmetric positive definite by construction. The
+    preconditioner applies :math:`M^{-1}` by a pair of triangular solves.
+    """
+    ilu = linalg.spilu(sparse.csc_matrix(A), drop_tol=drop_tol,
+                       fill_factor=fill_factor, diag_pivot_thresh=0,
+                       permc_spec='MMD_AT_PLUS_A',
+                       options=dict(SymmetricMode=True))
+    perm = ilu.perm_c
+    diagonal = np.abs(ilu.U.diagonal())
+    diagonal[diagonal == 0] = 1
+    diagonal = diagonal[:, np.newaxis]
+    # A triangular matrix is factorized without fill in its natural order.
+    lower = linalg.splu(sparse.csc_matrix(ilu.L), permc_spec='NATURAL',
+                        diag_pivot_thresh=0, options=dict(SymmetricMode=True))
+
+    def precondition(r):
+        y = np.empty_like(r)
+        y[perm] = r
+        y = _lu_solve(lower, y) / diagonal
+        return _lu_solve(lower, y, trans='T')[perm]
+
+    return precondition
+
+
+def _amg(A, coarse_size=500, omega=2./3):
+    r"""Build an algebraic multigrid V-cycle, to be used as a preconditioner.
+
+    The hierarchy is built by smoothed aggregation. The aggregates are made
+    of about four nodes, by two heavy-edge matchings (see
+    :func:`pygsp.reduction.graph_coarsening`), and their piecewise constant
+    prolongation is smoothed by a damped Jacobi step. The coarse matrices are
+    the Galerkin products :math:`P^\top A P`, and the coarsest is factorized.
+    The cycle smoothes with two damped Jacobi steps before and after the
+    coarse correction, such that it is a symmetric operator.
+    """
+    from pygsp import reduction
+
+    def inverse_diagonal(A):
+        diagonal = A.diagonal()
+        diagonal[diagonal == 0] = 1
+        return 1. / diagonal[:, np.newaxis]
+
+    levels = []
+    while A.shape[0] > coarse_size:
+        Ac, P, _ = reduction.graph_coarsening(A, seed=0)
+        _, P2, _ = reduction.graph_coarsening(Ac, seed=0)
+        P = P.dot(P2)
+        # Stop if the coarsening stalls, e.g., on isolated nodes.
+        if P.shape[1] > 0.9 * A.shape[0]:
+            break
+        dinv = inverse_diagonal(A)
+        P = (P - sparse.diags(omega * dinv[:, 0], 0).dot(A.dot(P))).tocsr()
+        levels.append((A, P, dinv))
+        A = sparse.csr_matrix(P.T.dot(A).dot(P))
+    lu = _factorize(A)
+
+    def smooth(A, dinv, x, b):
+        x += omega * dinv * (b - A.dot(x))
+        x += omega * dinv * (b - A.dot(x))
+        return x
+
+    def cycle(b, level=0):
+        if level == len(levels):
+            return _lu_solve(lu, b)
+        A, P, dinv = levels[level]
+        x = smooth(A, dinv, np.zeros_like(b), b)
+        x += P.dot(cycle(P.T.dot(b - A.dot(x)), level + 1))
+        return smooth(A, dinv, x, b)
+
+    return cycle
@@ -4,6 +4,7 @@ import numpy as np
 from scipy import sparse
 
 from . import Graph  # prevent circular import in Python < 3.5
+from .lattice import Lattice
 
 
 class Torus(Graph):
@@ -92,6 +93,9 @@ class Torus(Graph):
             'limits': np.array([-2.5, 2.5, -2.5, 2.5, -2.5, 2.5])
         }
 
+        if Nv > 2 and Mv > 2:
+            self._structure = Lattice((Mv, Nv), (True, True), (1, 1))
+
         super(Torus, self).__init__(W=W, coords=coords,
                                     plotting=plotting, **kwargs)
 
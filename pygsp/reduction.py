@@ -13,14 +13,18 @@ of graphs' vertex set while keeping the graph structure.
     pyramid_synthesis
     interpolate
     graph_sparsify
+    graph_coarsening
 
 """
 
+import warnings
+
 import numpy as np
-from scipy import sparse, stats
+from scipy import sparse
 from scipy.sparse import linalg
 
 from pygsp import graphs, filters, utils
+from pygsp.graphs.solver import LaplacianSolver
 
 
 logger = utils.build_logger(__name__)
@@ -34,15 +38,25 @@ def _analysis(g, s, **kwargs):
     return s.swapaxes(1, 2).reshape(-1, s.shape[1], order='F')
 
 
-def graph_sparsify(M, epsilon, maxiter=10):
+def graph_sparsify(M, epsilon, maxiter=10, seed=None):
     r"""Sparsify a graph (with Spielman-Srivastava).
 
+    Edges are sampled with probabilities proportional to their weights times
+    their effective resistances. The resistances of the edges are estimated
+    with random projections and Laplacian solves :cite:`spielman2011graph`,
+    in about :math:`O(N_e \log N)` operations per conjugate gradient
+    iteration and :math:`O(N_e + N)` memory.
+
     Parameters
     ----------
     M : Graph or sparse matrix
         Graph structure or a Laplacian matrix
     epsilon : int
         Sparsification parameter
+    maxiter : int
+        Number of attempts to get a connected graph.
+    seed : int
+        Seed for the random number generator (for reproducible graphs).
 
     Returns
     -------
@@ -79,14 +93,11 @@ def graph_sparsify(M, epsilon, maxiter=10):
     if not 1./np.sqrt(N) <= epsilon < 1:
         raise ValueError('GRAPH_SPARSIFY: Epsilon out of required range')
 
-    # Not sparse
-    resistance_distances = utils.resistance_distance(L).toarray()
     # Get the Weight matrix
     if isinstance(M, graphs.Graph):
         W = M.W
     else:
-        W = np.diag(L.diagonal()) - L.toarray()
-        W[W < 1e-10] = 0
+        W = sparse.diags(L.diagonal(), 0) - L
 
     W = sparse.coo_matrix(W)
     W.data[W.data < 1e-10] = 0
@@ -95,9 +106,13 @@ def graph_sparsify(M, epsilon, maxiter=10):
 
     start_nodes, end_nodes, weights = sparse.find(sparse.tril(W))
 
+    rs = np.random.RandomState(seed)
+
     # Calculate the new weights.
     weights = np.maximum(0, weights)
-    Re = np.maximum(0, resistance_distances[start_nodes, end_nodes])
+    Re = utils._estimate_resistances(L, start_nodes, end_nodes, tol=1e-2,
+                                     seed=rs.randint(2**31))
+    Re = np.maximum(0, Re)
     Pe = weights * Re
     Pe = Pe / np.sum(Pe)
 
@@ -109,12 +124,8 @@ def graph_sparsify(M, epsilon, maxiter=10):
         C = 4 * C0
         q = round(N * np.log(N) * 9 * C**2 / (epsilon**2))
 
-        results = stats.rv_discrete(values=(np.arange(np.shape(Pe)[0]), Pe)).rvs(size=int(q))
-        spin_counts = stats.itemfreq(results).astype(int)
+        counts = rs.multinomial(int(q), Pe)
         per_spin_weights = weights / (q * Pe)
-
-        counts = np.zeros(np.shape(weights)[0])
-        counts[spin_counts[:, 0]] = spin_counts[:, 1]
         new_weights = counts * per_spin_weights
 
         sparserW = sparse.csc_matrix((new_weights, (start_nodes, end_nodes)),
@@ -142,9 +153,19 @@ def graph_sparsify(M, epsilon, maxiter=10):
     return Mnew
 
 
-def interpolate(G, f_subsampled, keep_inds, order=100, reg_eps=0.005, **kwargs):
+def interpolate(G, f_subsampled, keep_inds, order=None, reg_eps=0.005,
+                **kwargs):
     r"""Interpolate a graph signal.
 
+    The interpolated signal minimizes the regularized Dirichlet energy
+    :math:`x^\top (L + \epsilon I) x` among the signals that take the given
+    values on the sampled nodes. Its values on the other nodes are obtained
+    by a sparse solve in the block of :math:`L + \epsilon I` indexed by
+    them. That is equivalent to the Green kernel :math:`(L + \epsilon
+    I)^{-1}` applied to the Kron reduction of the signal, without forming
+    the dense Kron reduction. The factorization is cached in ``G.mr`` (if
+    it exists) for the given ``reg_eps`` and ``keep_inds``.
+
     Parameters
     ----------
     G : Graph
@@ -153,11 +174,11 @@ def interpolate(G, f_subsampled, keep_inds, order=100, reg_eps=0.005, **kwargs):
     keep_inds : ndarray
         List of indices on which the signal is sampled.
     order : int
-        Degree of the Chebyshev approximation (default = 100).
+        Deprecated and unused. The Green kernel used to be approximated by
+        Chebyshev polynomials of that degree.
     reg_eps : float
         The regularized graph Laplacian is $\bar{L}=L+\epsilon I$.
-        A smaller epsilon may lead to better regularization,
-        but will also require a higher order Chebyshev approximation.
+        A smaller epsilon may lead to better regularization.
 
     Returns
     -------
@@ -168,30 +189,50 @@ def interpolate(G, f_subsampled, keep_inds, order=100, reg_eps=0.005, **kwargs):
     ----------
     See :cite:`pesenson2009variational`
 
+    Examples
+    --------
+    >>> from pygsp import reduction
+    >>> G = graphs.Sensor(100, seed=42)
+    >>> keep = np.arange(0, G.N, 2)
+    >>> s = np.random.RandomState(42).normal(size=(G.N, 3))
+    >>> s2 = reduction.interpolate(G, s[keep], keep)
+    >>> s2.shape
+    (100, 3)
+    >>> np.allclose(s2[keep], s[keep])
+    True
+
     """
-    L_reg = G.L + reg_eps * sparse.eye(G.N)
-    K_reg = getattr(G.mr, 'K_reg', kron_reduction(L_reg, keep_inds))
-    green_kernel = getattr(G.mr, 'green_kernel',
-                           filters.Filter(G, lambda x: 1. / (reg_eps + x)))
+    if order is not None or kwargs:
+        warnings.warn('The order and filtering arguments of interpolate() '
+                      'are unused and deprecated.', DeprecationWarning,
+                      stacklevel=2)
 
-    alpha = K_reg.dot(f_subsampled)
+    keep_inds = np.asarray(keep_inds)
+    f_interpolated = np.zeros((G.N,) + np.shape(f_subsampled)[1:])
+    f_interpolated[keep_inds] = f_subsampled
 
-    try:
-        Nv = np.shape(f_subsampled)[1]
-        f_interpolated = np.zeros((G.N, Nv))
-    except IndexError:
-        f_interpolated = np.zeros((G.N))
+    mr = getattr(G, 'mr', dict())
+    key = (reg_eps, keep_inds.tobytes())
+    if mr.get('interpolation', (None,))[0] != key:
+        L_reg = (G.L + reg_eps * sparse.eye(G.N)).tocsr()
+        elim_inds = np.setdiff1d(np.arange(G.N), keep_inds)
+        L_out_in = L_reg[elim_inds][:, keep_inds]
+        solver = LaplacianSolver(L_reg[elim_inds][:, elim_inds])
+        mr['interpolation'] = (key, elim_inds, L_out_in, solver)
+    _, elim_inds, L_out_in, solver = mr['interpolation']
 
-    f_interpolated[keep_inds] = alpha
+    if len(elim_inds) > 0:
+        f_out = L_out_in.dot(f_interpolated[keep_inds])
+        f_interpolated[elim_inds] = -solver.solve(f_out)
 
-    return _analysis(green_kernel, f_interpolated, order=order, **kwargs)
+    return f_interpolated
 
 
 def graph_multiresolution(G, levels, sparsify=True, sparsify_eps=None,
                           downsampling_method='largest_eigenvector',
                           reduction_method='kron', compute_full_eigen=False,
                           reg_eps=0.005):
-    r"""Compute a pyramid of graphs (by Kron reduction).
+    r"""Compute a pyramid of graphs (by Kron reduction or coarsening).
 
     'graph_multiresolution(G,levels)' computes a multiresolution of
     graph by repeatedly downsampling and performing graph reduction. The
@@ -201,6 +242,13 @@ def graph_multiresolution(G, levels, sparsify=True, sparsify_eps=None,
     is Kron reduction followed by a graph sparsification step.
     *param* is a structure of optional parameters.
 
+    Alternatively, the graphs can be coarsened by aggregating the nodes with
+    :func:`graph_coarsening`, in near-linear time and without fill-in. The
+    aggregates then define the downsampling: the node of largest degree of
+    each aggregate is kept. The prolongation and restriction from a level to
+    the previous one are stored in the ``mr`` dictionary of the coarse graph,
+    as ``P`` and ``R``.
+
     Parameters
     ----------
     G : Graph structure
@@ -212,21 +260,23 @@ def graph_multiresolution(G, levels, sparsify=True, sparsify_eps=None,
         algorithm some stability (default = 0.025). [UNUSED?!]
     sparsify : bool
         To perform a spectral sparsification step immediately after
-        the graph reduction (default is True).
+        the Kron reduction (default is True). Coarsened graphs are not
+        sparsified.
     sparsify_eps : float
         Parameter epsilon used in the spectral sparsification
         (default is min(10/sqrt(G.N),.3)).
     downsampling_method: string
         The graph downsampling method (default is 'largest_eigenvector').
-    reduction_method : string
-        The graph reduction method (default is 'kron')
+        Unused by coarsening.
+    reduction_method : {'kron', 'heavy_edge', 'algebraic_distance'}
+        The graph reduction method: Kron reduction, or coarsening along the
+        given affinity (see :func:`graph_coarsening`). Default is 'kron'.
     compute_full_eigen : bool
         To also compute the graph Laplacian eigenvalues and eigenvectors
         for every graph in the multiresolution sequence (default is False).
     reg_eps : float
-        The regularized graph Laplacian is :math:`\bar{L}=L+\epsilon I`.
-        A smaller epsilon may lead to better regularization, but will also
-        require a higher order Chebyshev approximation. (default is 0.005)
+        Unused. The regularization of the interpolation is given to
+        :func:`interpolate` or the pyramids instead.
 
     Returns
     -------
@@ -244,6 +294,15 @@ def graph_multiresolution(G, levels, sparsify=True, sparsify_eps=None,
     ...     Gs[idx].plotting['plot_name'] = 'Reduction level: {}'.format(idx)
     ...     Gs[idx].plot()
 
+    Coarsening:
+
+    >>> Gs = reduction.graph_multiresolution(G, levels,
+    ...                                      reduction_method='heavy_edge')
+    >>> all(Gs[idx + 1].N < Gs[idx].N for idx in range(levels))
+    True
+    >>> Gs[1].mr['P'].shape == (Gs[0].N, Gs[1].N)
+    True
+
     """
     if sparsify_eps is None:
         sparsify_eps = min(10. / np.sqrt(G.N), 0.3)
@@ -256,9 +315,21 @@ def graph_multiresolution(G, levels, sparsify=True, sparsify_eps=None,
     Gs = [G]
     Gs[0].mr = {'idx': np.arange(G.N), 'orig_idx': np.arange(G.N)}
 
+    coarsen = reduction_method in ['heavy_edge', 'algebraic_distance']
+
     for i in range(levels):
-        if downsampling_method == 'largest_eigenvector':
-            if hasattr(Gs[i], '_U'):
+        if coarsen:
+            Gnew, P, R = graph_coarsening(Gs[i], reduction_method)
+            # Keep the node of largest degree of each aggregate.
+            labels = P.indices
+            order = np.lexsort((-Gs[i].dw, labels))
+            ind = order[np.unique(labels[order], return_index=True)[1]]
+
+        elif downsampling_method == 'largest_eigenvector':
+            # A truncated Fourier basis may miss the largest eigenvector.
+            if hasattr(Gs[i], '_U') and (
+                    Gs[i]._U.shape[1] == Gs[i].N or
+                    getattr(Gs[i], '_fourier_which', None) == 'largest'):
                 V = Gs[i].U[:, -1]
             else:
                 V = linalg.eigs(Gs[i].L, 1)[1][:, 0]
@@ -269,13 +340,16 @@ def graph_multiresolution(G, levels, sparsify=True, sparsify_eps=None,
         else:
             raise NotImplementedError('Unknown graph downsampling method.')
 
-        if reduction_method == 'kron':
+        if coarsen:
+            Gs.append(Gnew)
+
+        elif reduction_method == 'kron':
             Gs.append(kron_reduction(Gs[i], ind))
 
         else:
             raise NotImplementedError('Unknown graph reduction method.')
 
-        if sparsify and Gs[i+1].N > 2:
+        if sparsify and not coarsen and Gs[i+1].N > 2:
             Gs[i+1] = graph_sparsify(Gs[i+1], min(max(sparsify_eps, 2. / np.sqrt(Gs[i+1].N)), 1.))
             # TODO : Make in place modifications instead!
 
@@ -285,10 +359,8 @@ def graph_multiresolution(G, levels, sparsify=True, sparsify_eps=None,
             Gs[i+1].estimate_lmax()
 
         Gs[i+1].mr = {'idx': ind, 'orig_idx': Gs[i].mr['orig_idx'][ind], 'level': i}
-
-        L_reg = Gs[i].L + reg_eps * sparse.eye(Gs[i].N)
-        Gs[i].mr['K_reg'] = kron_reduction(L_reg, ind)
-        Gs[i].mr['green_kernel'] = filters.Filter(Gs[i], lambda x: 1./(reg_eps + x))
+        if coarsen:
+            Gs[i+1].mr.update(P=P, R=R)
 
     return Gs
 
@@ -339,12 +411,16 @@ def kron_reduction(G, ind):
     N = np.shape(L)[0]
     ind_comp = np.setdiff1d(np.arange(N, dtype=int), ind)
 
-    L_red = L[np.ix_(ind, ind)]
-    L_in_out = L[np.ix_(ind, ind_comp)]
-    L_out_in = L[np.ix_(ind_comp, ind)].tocsc()
-    L_comp = L[np.ix_(ind_comp, ind_comp)].tocsc()
+    L = sparse.csr_matrix(L)
+    L_red = L[ind][:, ind]
+    L_in_out = L[ind][:, ind_comp]
+    L_out_in = L[ind_comp][:, ind]
+    L_comp = L[ind_comp][:, ind_comp]
 
-    Lnew = L_red - L_in_out.dot(linalg.spsolve(L_comp, L_out_in))
+    # Schur complement, with a single factorization of L_comp.
+    solver = LaplacianSolver(L_comp)
+    Lnew = L_red - L_in_out.dot(solver.solve(L_out_in.toarray()))
+    Lnew = sparse.csc_matrix(Lnew)
 
     # Make the laplacian symmetric if it is almost symmetric!
     if np.abs(Lnew - Lnew.T).sum() < np.spacing(1) * np.abs(Lnew).sum():
@@ -369,6 +445,194 @@ def kron_reduction(G, ind):
     return Gnew
 
 
+def _match(rows, cols, affinity, n_nodes, rs, n_rounds=10):
+    r"""Match the nodes by pairs along their heaviest edges.
+
+    At each round, every unmatched node points to its unmatched neighbor of
+    largest affinity, and mutual pairs are matched. Ties are broken by a
+    random, symmetric, key per edge, such that the heaviest remaining edge is
+    always matched. The edges must be sorted by rows. Each round is a few
+    linear scans of the remaining edges. Nodes left unmatched, e.g., the
+    leaves of a hub, then join the aggregate of their matched neighbor of
+    largest affinity, such that only isolated nodes are left alone.
+
+    Returns
+    -------
+    labels : ndarray
+        Aggregate of each node, from 0 to the number of aggregates.
+    """
+    match = np.full(n_nodes, -1)
+    key = rs.uniform(size=n_nodes)
+    key = key[rows] + key[cols]
+
+    def heaviest(rows, cols, affinity, key):
+        r"""Neighbor of largest affinity of each node (-1 if none)."""
+        starts = np.flatnonzero(np.diff(rows, prepend=-1))
+        counts = np.diff(np.append(starts, len(rows)))
+
+        def row_max(x):
+            return np.repeat(np.maximum.reduceat(x, starts), counts)
+
+        tie = np.where(affinity == row_max(affinity), key, -1)
+        edges = np.flatnonzero(tie == row_max(tie))
+        best = np.full(n_nodes, -1)
+        best[rows[edges]] = cols[edges]
+        return best
+
+    edges = rows, cols, affinity, key
+    for _ in range(n_rounds):
+        keep = (match[rows] < 0) & (match[cols] < 0)
+        rows, cols = rows[keep], cols[keep]
+        affinity, key = affinity[keep], key[keep]
+        if len(rows) == 0:
+            break
+        best = heaviest(rows, cols, affinity, key)
+        nodes = np.flatnonzero(best >= 0)
+        mutual = nodes[best[best[nodes]] == nodes]
+        match[mutual] = best[mutual]
+
+    nodes = np.arange(n_nodes)
+    labels = np.where(match < 0, nodes, np.minimum(nodes, match))
+
+    # Attach the unmatched nodes to a matched neighbor.
+    rows, cols, affinity, key = edges
+    keep = (match[rows] < 0) & (match[cols] >= 0)
+    best = heaviest(rows[keep], cols[keep], affinity[keep], key[keep])
+    nodes = np.flatnonzero(best >= 0)
+    labels[nodes] = labels[best[nodes]]
+
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def _aggregate(W, degrees, method='heavy_edge', seed=None, n_vectors=10,
+               n_sweeps=20):
+    r"""Aggregate the nodes of a graph and return the prolongation."""
+    W = sparse.csr_matrix(W).tocoo()
+    keep = (W.row != W.col) & (W.data > 0)
+    rows, cols, weights = W.row[keep], W.col[keep], W.data[keep]
+    n_nodes = W.shape[0]
+    rs = np.random.RandomState(seed)
+
+    if method == 'heavy_edge':
+        affinity = weights / np.maximum(degrees[rows], degrees[cols])
+    elif method == 'algebraic_distance':
+        # Test vectors smoothed by Jacobi over-relaxation. Nodes strongly
+        # connected by many paths end up with similar values.
+        W = sparse.csr_matrix((weights, (rows, cols)), shape=W.shape)
+        degrees = np.asarray(W.sum(axis=1)).squeeze()
+        degrees[degrees == 0] = 1
+        W = sparse.diags(0.5 / degrees, 0).dot(W).tocsr()
+        X = rs.uniform(-0.5, 0.5, size=(n_nodes, n_vectors))
+        for _ in range(n_sweeps):
+            X *= 0.5
+            X += W.dot(X)
+        X -= X.mean(axis=0)
+        X /= np.maximum(np.abs(X).max(axis=0), np.finfo(float).tiny)
+        distance = np.zeros(len(rows))
+        for x in X.T:
+            np.maximum(distance, np.abs(x[rows] - x[cols]), out=distance)
+        affinity = weights / np.maximum(distance, 1e-12)
+    else:
+        raise ValueError('Unknown coarsening method {}.'.format(method))
+
+    labels = _match(rows, cols, affinity, n_nodes, rs)
+    return sparse.csr_matrix((np.ones(n_nodes), (np.arange(n_nodes), labels)),
+                             shape=(n_nodes, labels.max() + 1))
+
+
+def graph_coarsening(M, method='heavy_edge', seed=None):
+    r"""Coarsen a graph by aggregating its nodes.
+
+    The nodes are matched by pairs along heavy edges, in a few rounds of
+    linear scans of the edges, i.e., in :math:`O(N_e)` operations. Nodes
+    whose neighbors all got matched, e.g., the leaves of a hub, join the
+    aggregate of one of them. The affinity of an edge is either its weight
+    normalized by
+    the largest degree of its ends (heavy-edge matching
+    :cite:`loukas2019coarsening`), or its weight divided by the algebraic
+    distance of its ends, estimated from test vectors smoothed by a few
+    Jacobi relaxations :cite:`ron2011relaxation`. The latter better follows
+    the global structure of the graph.
+
+    Each aggregate becomes a node of the coarse graph, and the weight between
+    two aggregates is the sum of the weights of the edges between them. With
+    the piecewise constant prolongation :math:`P`, of size :math:`N \times
+    N_c`, the coarse combinatorial Laplacian is thus the Galerkin operator
+    :math:`L_c = P^\top L P`, as is the returned matrix if a Laplacian is
+    given. That does not hold for a graph with a normalized Laplacian,
+    which is computed from the coarse weights. Unlike Kron reduction, the
+    coarse graph is as sparse as the original one, and needs no
+    sparsification. A single coarsening about halves the number of nodes, or
+    more (isolated nodes are kept as they are). Call it repeatedly, or use
+    :func:`graph_multiresolution`, for a hierarchy.
+
+    Parameters
+    ----------
+    M : Graph or sparse matrix
+        Graph structure or a Laplacian matrix. Any symmetric positive
+        (semi-)definite matrix with non-positive off-diagonal entries is
+        accepted.
+    method : {'heavy_edge', 'algebraic_distance'}
+        The affinity along which nodes are matched. Default is 'heavy_edge'.
+    seed : int
+        Seed for the random number generator (which breaks ties and draws
+        test vectors).
+
+    Returns
+    -------
+    Mnew : Graph or sparse matrix
+        Coarse graph structure, whose coordinates are the centroids of the
+        aggregates, or coarse Laplacian.
+    P : sparse matrix
+        Prolongation, of shape ``(N, N_c)``, which maps a coarse signal to a
+        piecewise constant signal on the graph. :math:`P^\top` restricts a
+        signal by summing it over each aggregate.
+    R : sparse matrix
+        Restriction, of shape ``(N_c, N)``, which averages a signal over each
+        aggregate. It is the left inverse of P, i.e., :math:`R P = I`.
+
+    Examples
+    --------
+    >>> from pygsp import reduction
+    >>> G = graphs.Sensor(100, seed=42)
+    >>> Gc, P, R = reduction.graph_coarsening(G, seed=42)
+    >>> Gc.N < G.N
+    True
+    >>> np.allclose((P.T.dot(G.L).dot(P)).toarray(), Gc.L.toarray())
+    True
+    >>> np.allclose((R.dot(P)).toarray(), np.identity(Gc.N))
+    True
+
+    """
+    if isinstance(M, graphs.Graph):
+        if M.is_directed():
+            msg = 'This method only work for undirected graphs.'
+            raise NotImplementedError(msg)
+        P = _aggregate(M.W, M.dw, method, seed)
+    else:
+        L = sparse.csr_matrix(M)
+        P = _aggregate(-L, L.diagonal(), method, seed)
+
+    sizes = np.ravel(P.sum(axis=0))
+    R = sparse.diags(1. / sizes, 0).dot(P.T).tocsr()
+
+    if isinstance(M, graphs.Graph):
+        Wnew = sparse.csr_matrix(P.T.dot(M.W).dot(P))
+        Wnew = Wnew - sparse.diags(Wnew.diagonal(), 0)
+        # Sums in a different order may break the symmetry.
+        Wnew = (Wnew + Wnew.T) / 2.
+        Wnew.eliminate_zeros()
+        coords = getattr(M, 'coords', None)
+        if coords is not None:
+            coords = R.dot(coords)
+        Mnew = graphs.Graph(W=Wnew, coords=coords, lap_type=M.lap_type,
+                            plotting=M.plotting)
+    else:
+        Mnew = sparse.csr_matrix(P.T.dot(L).dot(P))
+
+    return Mnew, P, R
+
+
 def pyramid_analysis(Gs, f, **kwargs):
     r"""Compute the graph pyramid transform coefficients.
 
@@ -424,11 +688,11 @@ def pyramid_analysis(Gs, f, **kwargs):
 
     for i in range(levels):
         # Low pass the signal
-        s_low = _analysis(filters.Filter(Gs[i], h_filters[i]), ca[i], **kwargs)
+        s_low = filters.Filter(Gs[i], h_filters[i]).filter(ca[i], **kwargs)
         # Keep only the coefficient on the selected nodes
         ca.append(s_low[Gs[i+1].mr['idx']])
         # Compute prediction
-        s_pred = interpolate(Gs[i], ca[i+1], Gs[i+1].mr['idx'], **kwargs)
+        s_pred = interpolate(Gs[i], ca[i+1], Gs[i+1].mr['idx'])
         # Compute errors
         pe.append(ca[i] - s_pred)
 
@@ -449,7 +713,8 @@ def pyramid_synthesis(Gs, cap, pe, order=30, **kwargs):
     use_exact : bool
         To use exact graph spectral filtering instead of the Chebyshev approximation.
     order : int
-        Degree of the Chebyshev approximation (default=30).
+        Unused. The interpolation used to approximate the Green kernel by
+        Chebyshev polynomials of that degree.
     least_squares : bool
         To use the least squares synthesis (default=False).
     h_filters : ndarray
@@ -474,6 +739,7 @@ def pyramid_synthesis(Gs, cap, pe, order=30, **kwargs):
     """
     least_squares = bool(kwargs.pop('least_squares', False))
     def_ul = Gs[0].N > 3000 or not hasattr(Gs[0], '_e') or not hasattr(Gs[0], '_U')
+    def_ul = def_ul or len(Gs[0]._e) < Gs[0].N
     use_landweber = bool(kwargs.pop('use_landweber', def_ul))
     reg_eps = float(kwargs.get('reg_eps', 0.005))
 
@@ -490,8 +756,8 @@ def pyramid_synthesis(Gs, cap, pe, order=30, **kwargs):
     for i in range(levels):
 
         if not least_squares:
-            s_pred = interpolate(Gs[levels - i - 1], ca[i], Gs[levels - i].mr['idx'],
-                                 order=order, reg_eps=reg_eps, **kwargs)
+            s_pred = interpolate(Gs[levels - i - 1], ca[i],
+                                 Gs[levels - i].mr['idx'], reg_eps=reg_eps)
             ca.append(s_pred + pe[levels - i - 1])
 
         else:
@@ -550,27 +816,28 @@ def _pyramid_single_interpolation(G, ca, pe, keep_inds, h_filter, **kwargs):
     if use_landweber:
         x = np.zeros(N)
         z = np.concatenate((ca, pe), axis=0)
-        green_kernel = filters.Filter(G, lambda x: 1./(x+reg_eps))
-        PhiVlt = _analysis(green_kernel, S.T, **kwargs).T
+        PhiVlt = G.solver(shift=reg_eps).solve(S.T.toarray()).T
         filt = filters.Filter(G, h_filter, **kwargs)
 
+        # The systems are factorized once for all the iterations.
+        reg_L = (G.L + reg_eps * sparse.eye(N)).tocsr()
+        elim_inds = np.setdiff1d(np.arange(N, dtype=int), keep_inds)
+        L_red = reg_L[keep_inds][:, keep_inds]
+        L_in_out = reg_L[keep_inds][:, elim_inds]
+        L_out_in = reg_L[elim_inds][:, keep_inds]
+        comp_solver = LaplacianSolver(reg_L[elim_inds][:, elim_inds])
+
         for iteration in range(landweber_its):
             h_filtered_sig = _analysis(filt, x, **kwargs)
             x_bar = h_filtered_sig[keep_inds]
-            y_bar = x - interpolate(G, x_bar, keep_inds, **kwargs)
+            y_bar = x - interpolate(G, x_bar, keep_inds, reg_eps=reg_eps)
             z_delt = np.concatenate((x_bar, y_bar), axis=0)
             z_delt = z - z_delt
             alpha_new = PhiVlt * z_delt[nb_ind:]
             x_up = sparse.csr_matrix((z_delt, (range(nb_ind), [1] * nb_ind)), shape=(N, 1))
-            reg_L = G.L + reg_esp * sparse.eye(N)
-
-            elim_inds = np.setdiff1d(np.arange(N, dtype=int), keep_inds)
-            L_red = reg_L[np.ix_(keep_inds, keep_inds)]
-            L_in_out = reg_L[np.ix_(keep_inds, elim_inds)]
-            L_out_in = reg_L[np.ix_(elim_inds, keep_inds)]
-            L_comp = reg_L[np.ix_(elim_inds, elim_inds)]
 
-            next_term = L_red * alpha_new - L_in_out * linalg.spsolve(L_comp, L_out_in * alpha_new)
+            next_term = L_red * alpha_new - L_in_out * comp_solver.solve(
+                L_out_in * alpha_new)
             next_up = sparse.csr_matrix((next_term, (keep_inds, [1] * nb_ind)), shape=(N, 1))
             x += landweber_tau * _analysis(filt, x_up - next_up, **kwargs) + z_delt[nb_ind:]
 
@@ -5,6 +5,9 @@ Test suite for the filters module of the pygsp package.
 
 """
 
+import os
+import shutil
+import tempfile
 import unittest
 
 import numpy as np
@@ -62,7 +65,12 @@ class TestCase(unittest.TestCase):
             np.testing.assert_allclose(s4, A * self._signal)
             assert np.linalg.norm(s5 - A * self._signal) < 0.1
 
-        self.assertRaises(ValueError, f.filter, s2, method='lanczos')
+        if f.Nf < 100:
+            # Lanczos should be close to exact.
+            s6 = f.filter(self._signal, method='lanczos', order=100)
+            s7 = f.filter(s2, method='lanczos', order=100)
+            np.testing.assert_allclose(s2, s6, rtol=0.1, atol=0.01)
+            np.testing.assert_allclose(s4, s7, rtol=0.1, atol=0.01)
 
         if f.Nf < 10:
             # Computing the frame is an alternative way to filter.
@@ -116,6 +124,43 @@ class TestCase(unittest.TestCase):
         assert s3.shape == (self._G.N, 10)
         np.testing.assert_allclose(s3, s5)
 
+    def test_filter_stream(self):
+        g = filters.MexicanHat(self._G, Nf=4)
+        s = self._rs.uniform(size=(self._G.N, 25))
+        s1 = g.filter(s)
+        # Chunks of any size are gathered in batches.
+        chunks = [s[:, :3], s[:, 3:13], s[:, 13], s[:, 14:]]
+        s2 = list(g.filter_stream(chunks, batch_size=7))
+        self.assertEqual([s.shape[1] for s in s2], [7, 7, 7, 4])
+        np.testing.assert_allclose(np.concatenate(s2, axis=1), s1)
+        # Synthesis.
+        s2 = list(g.filter_stream(s1, batch_size=10))
+        np.testing.assert_allclose(np.concatenate(s2, axis=1), g.filter(s1))
+        # From and to memory-mapped files.
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'signals.npy')
+            np.save(path, s)
+            s2 = np.load(path, mmap_mode='r')
+            path = os.path.join(directory, 'filtered.npy')
+            out = np.lib.format.open_memmap(path, mode='w+', shape=s1.shape)
+            for r in g.filter_stream(s2, batch_size=10, out=out):
+                self.assertTrue(np.shares_memory(r, out))
+            out.flush()
+            del out, s2, r
+            np.testing.assert_allclose(np.load(path), s1)
+        finally:
+            shutil.rmtree(directory)
+        for method in ['exact', 'lanczos']:
+            s2 = g.filter_stream(s, batch_size=10, method=method)
+            s2 = np.concatenate(list(s2), axis=1)
+            np.testing.assert_allclose(s2, g.filter(s, method=method))
+        out = np.empty((self._G.N, 20, 4))
+        self.assertRaises(ValueError, list, g.filter_stream(s, out=out))
+        self.assertRaises(ValueError, list, g.filter_stream(s, batch_size=0))
+        self.assertRaises(ValueError, list, g.filter_stream(s[1:]))
+        self.assertRaises(ValueError, list, g.filter_stream([s, s1]))
+
     def test_localize(self):
         G = graphs.Grid2d(20)
         G.compute_fourier_basis()
@@ -215,6 +260,204 @@ class TestCase(unittest.TestCase):
         f = filters.Expwin(self._G)
         self._test_methods(f, tight=False)
 
+    def test_cheby_op(self):
+        f = filters.MexicanHat(self._G, Nf=4)
+        c = filters.compute_cheby_coeff(f, m=30)
+        s = self._rs.uniform(size=(self._G.N, 3))
+        # Legacy layout: filtered signals stacked along the first dimension.
+        r1 = filters.cheby_op(self._G, c, s)
+        r1 = r1.reshape(f.Nf, self._G.N, 3).transpose(1, 2, 0)
+        r2 = f.filter(s, method='chebyshev', order=30)
+        np.testing.assert_allclose(r1, r2)
+        r1 = filters.cheby_op(self._G, c[1], s[:, 0])
+        np.testing.assert_allclose(r1, r2[:, 0, 1])
+
+    def test_cheby_synthesis(self):
+        f = filters.Itersine(self._G, Nf=5)
+        c = filters.compute_cheby_coeff(f, m=40)
+        s = self._rs.uniform(size=(self._G.N, 3, f.Nf))
+        # Synthesis is the sum of the filtered features.
+        s1 = np.zeros((self._G.N, 3))
+        for i in range(f.Nf):
+            s1 += filters.cheby_op(self._G, c[i], s[..., i])
+        s2 = f.synthesize(s, method='chebyshev', order=40)
+        np.testing.assert_allclose(s1, s2)
+
+    def test_cheby_coeff_cache(self):
+        G = graphs.Sensor(50, seed=42)
+        G.estimate_lmax()
+        f = filters.Heat(G, tau=[1, 10])
+        c1 = f._compute_cheby_coeff(30)
+        c2 = filters.compute_cheby_coeff(f, m=30)
+        np.testing.assert_allclose(c1, c2)
+        self.assertIs(f._compute_cheby_coeff(30), c1)
+        self.assertFalse(c1.flags.writeable)
+        # Invalidated when lmax or the kernels change.
+        G._lmax *= 2
+        self.assertIsNot(f._compute_cheby_coeff(30), c1)
+        c1 = f._compute_cheby_coeff(30)
+        f._kernels = f._kernels[::-1]
+        np.testing.assert_allclose(f._compute_cheby_coeff(30), c1[::-1])
+        # Bounded size.
+        for order in range(10, 30):
+            f._compute_cheby_coeff(order)
+        self.assertEqual(len(f._cheby_cache), 8)
+        self.assertEqual(list(f._cheby_cache)[-1][0], 29)
+
+    def test_scaled_laplacian(self):
+        G = graphs.Sensor(50, seed=42)
+        G.compute_fourier_basis()
+        L1 = G._scaled_laplacian()
+        self.assertIs(G._scaled_laplacian(), L1)
+        e = np.linalg.eigvalsh(L1.toarray())
+        np.testing.assert_allclose([e[0], e[-1]], [-1, 1])
+        G._lmax *= 2
+        self.assertIsNot(G._scaled_laplacian(), L1)
+        G.compute_laplacian('normalized')
+        L2 = G._scaled_laplacian()
+        np.testing.assert_allclose(L2.toarray(), 2 / G.lmax * G.L.toarray() -
+                                   np.identity(G.N))
+
+    def test_lanczos_op(self):
+        f = filters.Meyer(self._G, Nf=4)
+        s = self._rs.uniform(size=(self._G.N, 3))
+        s[:, 2] = 0
+        s2 = f.filter(s, method='exact')
+        for reorthogonalization in ['partial', 'full', None]:
+            # Legacy layout: filtered signals stacked along the first dim.
+            s1 = filters.lanczos_op(f, s, order=100,
+                                    reorthogonalization=reorthogonalization)
+            s1 = s1.reshape(f.Nf, self._G.N, 3).transpose(1, 2, 0)
+            np.testing.assert_allclose(s1, s2, atol=1e-4)
+        s1 = filters.lanczos_op(f, s[:, 0], order=100)
+        np.testing.assert_allclose(s1, s2[:, 0].T.ravel(), atol=1e-4)
+        self.assertRaises(ValueError, filters.lanczos_op, f, s,
+                          reorthogonalization='selective')
+        # Krylov subspaces as large as the graph are exact.
+        G = graphs.Sensor(30, seed=42)
+        G.compute_fourier_basis()
+        f = filters.Itersine(G)
+        s = self._rs.uniform(size=(G.N, 2, f.Nf))
+        np.testing.assert_allclose(f.filter(s, method='lanczos', order=50),
+                                   f.filter(s, method='exact'), atol=1e-10)
+
+    def test_linear_operator(self):
+        f = filters.MexicanHat(self._G, Nf=4)
+        N, Nf = self._G.N, f.Nf
+        x = self._rs.uniform(size=(N, 3))
+        y = self._rs.uniform(size=(N * Nf, 3))
+        for method in ['exact', 'chebyshev']:
+            A = f.as_linear_operator('analysis', method)
+            S = f.as_linear_operator('synthesis', method)
+            F = f.as_linear_operator('frame', method)
+            self.assertEqual(A.shape, (N * Nf, N))
+            self.assertEqual(S.shape, (N, N * Nf))
+            self.assertEqual(F.shape, (N, N))
+            c = f.analyze(x, method)
+            np.testing.assert_allclose(A.matmat(x), c.transpose(0, 2, 1)
+                                       .reshape(N * Nf, 3))
+            np.testing.assert_allclose(A.matvec(x[:, 0]), c[:, 0].ravel())
+            np.testing.assert_allclose(S.matvec(c[:, 0].ravel()),
+                                       f.synthesize(c[:, 0], method))
+            np.testing.assert_allclose(F.matmat(x), f.synthesize(c, method))
+            # Adjoints.
+            np.testing.assert_allclose(A.rmatvec(y[:, 0]), S.matvec(y[:, 0]))
+            np.testing.assert_allclose(A.H.matmat(y), S.matmat(y))
+            np.testing.assert_allclose(np.sum(A.matmat(x) * y),
+                                       np.sum(x * S.matmat(y)))
+            np.testing.assert_allclose(F.rmatvec(x[:, 0]), F.matvec(x[:, 0]))
+        # Adjoints filter all the columns at once.
+        s = S.matmat(y)
+        calls = []
+        filter = f.filter
+        f.filter = lambda *args: calls.append(args) or filter(*args)
+        np.testing.assert_allclose(A.rmatmat(y), s)
+        self.assertEqual(len(calls), 1)
+        del f.filter
+        self.assertRaises(ValueError, f.as_linear_operator, 'dual')
+
+    def test_dtype(self):
+        G = graphs.Sensor(50, seed=42, dtype=np.float32)
+        G.compute_fourier_basis()
+        self.assertEqual(G.L.dtype, np.float32)
+        self.assertEqual(G.U.dtype, np.float32)
+        self.assertEqual(G.e.dtype, np.float32)
+        f = filters.MexicanHat(G, Nf=4)
+        self.assertEqual(f.evaluate(G.e).dtype, np.float32)
+        self.assertEqual(f.as_linear_operator().dtype, np.float32)
+        s = self._rs.uniform(size=(G.N, 2))
+        s = s + 1j * self._rs.uniform(size=(G.N, 2))
+        for method in ['exact', 'chebyshev', 'lanczos']:
+            # Single precision signals are not upcasted.
+            s1 = f.analyze(s.real.astype(np.float32), method)
+            self.assertEqual(s1.dtype, np.float32)
+            self.assertEqual(f.synthesize(s1, method).dtype, np.float32)
+            # Double precision and complex signals are not downcasted.
+            self.assertEqual(f.analyze(s.real, method).dtype, np.float64)
+            s1 = f.analyze(s.astype(np.complex64), method)
+            self.assertEqual(s1.dtype, np.complex64)
+            s2 = f.analyze(s, method)
+            self.assertEqual(s2.dtype, np.complex128)
+            np.testing.assert_allclose(s2.real, f.analyze(s.real, method),
+                                       atol=1e-5)
+            np.testing.assert_allclose(s2.imag, f.analyze(s.imag, method),
+                                       atol=1e-5)
+            np.testing.assert_allclose(s1, s2, atol=1e-5)
+
+    def test_cheby_auto(self):
+        s = self._rs.uniform(size=(self._G.N, 2))
+        f = filters.Heat(self._G, [1, 10, 50])
+        c = f._compute_cheby_coeff('auto', 1e-6)
+        self.assertIs(f._compute_cheby_coeff('auto', 1e-6), c)
+        self.assertIsNot(f._compute_cheby_coeff('auto', 1e-3), c)
+        # Each filter is truncated independently.
+        degrees = [np.max(np.nonzero(ci)[0]) for ci in c]
+        self.assertEqual(len(set(degrees)), 3)
+        self.assertEqual(max(degrees), c.shape[1] - 1)
+        self.assertLess(max(degrees), 30)
+        s1 = f.filter(s, method='exact')
+        s2 = f.filter(s, method='chebyshev', order='auto')
+        err = np.linalg.norm(s1 - s2, axis=0).T / np.linalg.norm(s, axis=0)
+        self.assertLess(err.max(), 1e-6)
+        s2 = f.synthesize(s1, order='auto', tol=1e-8)
+        np.testing.assert_allclose(s2, f.synthesize(s1, method='exact'),
+                                   atol=1e-8 * np.linalg.norm(s1))
+        self.assertRaises(ValueError, f.filter, s, method='lanczos',
+                          order='auto')
+
+    def test_time_vertex(self):
+        G = graphs.Sensor(40, seed=42)
+        G.compute_fourier_basis()
+        s = self._rs.normal(size=(G.N, 64, 2))
+        # Separable kernel: a graph filter followed by a temporal filter of
+        # impulse response [1/4, 1/2, 1/4].
+        f = filters.TimeVertexFilter(G, [
+            lambda x, w: np.exp(-x) * (0.5 + 0.5 * np.cos(w)),
+            lambda x, w: x * np.cos(w)**2,
+        ])
+        self.assertEqual(f.evaluate(G.e, [0, 1, 2]).shape, (2, G.N, 3))
+        s1 = f.filter(s, method='exact')
+        self.assertEqual(s1.shape, (G.N, 64, 2, 2))
+        g = filters.Filter(G, lambda x: np.exp(-x))
+        s2 = g.filter(s.reshape(G.N, -1), method='exact')
+        s2 = s2.reshape(s.shape)
+        s2 = s2 / 2 + np.roll(s2, 1, axis=1) / 4 + np.roll(s2, -1, axis=1) / 4
+        np.testing.assert_allclose(s1[..., 0], s2, atol=1e-12)
+        s2 = f.filter(s, method='chebyshev', order=50)
+        np.testing.assert_allclose(s1, s2, atol=1e-10)
+        # Short impulse responses are exactly filtered by blocks.
+        s2 = f.filter(s, method='exact', block_size=10, overlap=2)
+        np.testing.assert_allclose(s1, s2, atol=1e-12)
+        s2 = f.filter(s, method='chebyshev', order=50, block_size=10,
+                      overlap=2)
+        np.testing.assert_allclose(s1, s2, atol=1e-10)
+        # Complex signals are transformed with the full FFT.
+        s2 = f.filter(s[:, :, 0] + 1j * s[:, :, 1], method='exact')
+        np.testing.assert_allclose(s2.real, s1[:, :, 0], atol=1e-12)
+        np.testing.assert_allclose(s2.imag, s1[:, :, 1], atol=1e-12)
+        self.assertRaises(ValueError, f.filter, s[0])
+        self.assertRaises(ValueError, f.filter, s, method='lanczos')
+
     def test_approximations(self):
         r"""
         Test that the different methods for filter analysis, i.e. 'exact',
@@ -226,8 +469,11 @@ class TestCase(unittest.TestCase):
         c_exact = f.filter(self._signal, method='exact')
         c_cheby = f.filter(self._signal, method='chebyshev')
 
+        c_lanczos = f.filter(self._signal, method='lanczos')
+
         np.testing.assert_allclose(c_exact, c_cheby)
-        self.assertRaises(ValueError, f.filter, self._signal, method='lanczos')
+        np.testing.assert_allclose(c_exact, c_lanczos)
+        self.assertRaises(ValueError, f.filter, self._signal, method='krylov')
 
 
 suite = unittest.TestLoader().loadTestsFromTestCase(TestCase)
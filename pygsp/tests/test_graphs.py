@@ -5,13 +5,17 @@ Test suite for the graphs module of the pygsp package.
 
 """
 
+import shutil
+import tempfile
 import unittest
+import warnings
 
 import numpy as np
 import scipy.linalg
+from scipy import sparse
 from skimage import data, img_as_float
 
-from pygsp import graphs
+from pygsp import graphs, filters
 
 
 class TestCase(unittest.TestCase):
@@ -43,6 +47,148 @@ class TestCase(unittest.TestCase):
         self.assertEqual(ki.shape[0], G.Ne)
         self.assertEqual(kj.shape[0], G.Ne)
 
+    def test_from_csr(self):
+        G1 = graphs.Sensor(50, seed=42)
+        W = G1.W.tocsr()
+        G2 = graphs.Graph.from_csr(W, symmetric=True, validated=True)
+        self.assertIs(G2.W, W)
+        self.assertFalse(hasattr(G2, '_L'))
+        self.assertEqual(G2.N, G1.N)
+        self.assertEqual(G2.Ne, G1.Ne)
+        np.testing.assert_allclose(G2.dw, G1.dw)
+        np.testing.assert_allclose(G2.L.toarray(), G1.L.toarray())
+        G2 = graphs.Graph.from_csr(W, lap_type='normalized')
+        self.assertFalse(G2.is_directed())
+        G1.compute_laplacian('normalized')
+        np.testing.assert_allclose(G2.L.toarray(), G1.L.toarray())
+        # Explicit zeros are removed unless validated.
+        W = sparse.csr_matrix(([1., 0, 1], ([0, 1, 2], [1, 2, 0])))
+        self.assertEqual(graphs.Graph.from_csr(W.copy(), validated=True).Ne, 3)
+        G = graphs.Graph.from_csr(W)
+        self.assertEqual(G.Ne, 2)
+        self.assertTrue(G.is_directed())
+        self.assertRaises(TypeError, graphs.Graph.from_csr, W.tocoo())
+        self.assertRaises(ValueError, graphs.Graph.from_csr, W[:2])
+        self.assertRaises(ValueError, graphs.Graph.from_csr, W,
+                          lap_type='random-walk')
+        # The dtype is kept, unless another is requested.
+        W = G1.W.tocsr().astype(np.float32)
+        self.assertIs(graphs.Graph.from_csr(W).W, W)
+        self.assertIs(graphs.Graph.from_csr(W, dtype=np.float32).W, W)
+        G2 = graphs.Graph.from_csr(W, dtype=np.float64)
+        self.assertEqual(G2.dtype, np.float64)
+        self.assertEqual(G2.L.dtype, np.float64)
+        G2 = graphs.Graph.from_csr(W.astype(int))
+        self.assertEqual(G2.dtype, np.float64)
+        self.assertRaises(ValueError, graphs.Graph.from_csr, W, dtype=int)
+        G2 = graphs.Graph(sparse.block_diag([W, W]), dtype=np.float32)
+        for C in G2.extract_components():
+            self.assertEqual(C.dtype, np.float32)
+
+    def test_edit_edges(self):
+
+        def check(G):
+            G2 = graphs.Graph(G.W, lap_type=G.lap_type)
+            np.testing.assert_allclose(G.L.toarray(), G2.L.toarray(),
+                                       atol=1e-12)
+            np.testing.assert_allclose(G.dw, G2.dw)
+            self.assertEqual(G.Ne, G2.Ne)
+            self.assertEqual(G.is_directed(), G2.is_directed())
+            self.assertEqual(G.is_connected(), G2.is_connected())
+            G2.compute_fourier_basis()
+            self.assertGreaterEqual(G.lmax, G2.lmax - 1e-10)
+
+        for lap_type in ['combinatorial', 'normalized']:
+            G = graphs.Sensor(30, seed=42, lap_type=lap_type)
+            G.compute_fourier_basis()
+            G.is_connected()
+            G.dw, G.Ne
+            i, j = np.nonzero(np.triu(G.W.toarray() == 0, k=1))
+            i, j = i[:3], j[:3]
+            G.add_edges(i, j, [3., 2., 1.])
+            self.assertFalse(hasattr(G, '_U'))
+            check(G)
+            G.update_weights(j[:2], i[:2], [0.5, 5.])
+            check(G)
+            G.remove_edges(i[:2], j[:2])
+            check(G)
+
+        # Directed graph, which becomes undirected.
+        W = sparse.csr_matrix(([1., 1, 1], ([0, 1, 2], [1, 2, 0])))
+        G = graphs.Graph(W)
+        G.estimate_lmax(), G.dw, G.Ne
+        self.assertTrue(G.is_directed())
+        G.add_edges([1, 2, 0], [0, 1, 2])
+        self.assertFalse(G.is_directed())
+        check(G)
+
+        # Graphs sharing the weight matrix are left untouched.
+        for kind in ['update', 'remove']:
+            G = graphs.Graph(graphs.Path(4).W.tocsr())
+            W = G.W.copy()
+            G2 = graphs.Graph(G.W)
+            L2 = G2.L.toarray()
+            if kind == 'update':
+                G.update_weights([0], [1], [7.])
+            else:
+                G.remove_edges([0], [1])
+            np.testing.assert_array_equal(G2.W.toarray(), W.toarray())
+            np.testing.assert_array_equal(G2.L.toarray(), L2)
+            self.assertNotEqual(G.W[0, 1], W[0, 1])
+
+        G = graphs.Path(4)
+        self.assertRaises(ValueError, G.add_edges, 0, 1)
+        self.assertRaises(ValueError, G.add_edges, 0, 2, -1)
+        self.assertRaises(ValueError, G.add_edges, 0, 4)
+        self.assertRaises(ValueError, G.add_edges, [0, 0], [2, 2])
+        self.assertRaises(ValueError, G.remove_edges, 0, 2)
+        self.assertRaises(ValueError, G.update_weights, 0, 2, 1)
+        self.assertRaises(ValueError, G.update_weights, 0, 1, 0)
+
+    def test_update_fourier_basis(self):
+        for lap_type in ['combinatorial', 'normalized']:
+            for n_eigenvectors in [None, 10]:
+                G = graphs.Sensor(100, seed=42, lap_type=lap_type)
+                G.compute_fourier_basis(n_eigenvectors=n_eigenvectors)
+                i, j = np.nonzero(np.triu(G.W.toarray() == 0, k=1))
+                G.add_edges(i[:3], j[:3], [3., 2., 1.])
+                G.remove_edges(i[:1], j[:1])
+                error = G.update_fourier_basis()
+                self.assertLess(error, 1e-6)
+                G2 = graphs.Graph(G.W, lap_type=lap_type)
+                G2.compute_fourier_basis(n_eigenvectors=n_eigenvectors)
+                np.testing.assert_allclose(G.e, G2.e, atol=1e-8)
+                np.testing.assert_allclose(G.U.T.dot(G.U),
+                                           np.identity(len(G.e)), atol=1e-8)
+                self.assertAlmostEqual(G.mu, np.max(np.abs(G.U)))
+                # The basis is now current.
+                self.assertEqual(G.update_fourier_basis(), error)
+        # Rank-one updates of a full basis, in place.
+        from pygsp.graphs import fourier
+        G = graphs.Sensor(100, seed=42)
+        G.compute_fourier_basis()
+        e, U = G.e, G.U.copy()
+        i, j = np.nonzero(np.triu(G.W.toarray() == 0, k=1))
+        for n_edges in [2, 3]:
+            G2 = graphs.Graph(G.W)
+            G2.add_edges(i[:n_edges], j[:n_edges], 100.)
+            dL = G2.L - G.L
+            if n_edges > 2:
+                self.assertIsNone(fourier._update_eigendecomposition(
+                    e, U, dL, max_rank=2))
+            e2, U2 = fourier._update_eigendecomposition(e, U.copy(), dL)
+            L = G2.L.toarray()
+            np.testing.assert_allclose(e2, np.linalg.eigvalsh(L), atol=1e-10)
+            np.testing.assert_allclose(L.dot(U2), U2 * e2, atol=1e-10)
+            np.testing.assert_allclose(U2.T.dot(U2), np.identity(G.N),
+                                       atol=1e-12)
+        # The secular equation is solved by chunks of roots.
+        d, z = np.sort(e), U[0]
+        lam1, Q1 = fourier._secular_solve(d, z, 10.)
+        lam2, Q2 = fourier._secular_solve(d, z, 10., chunk_size=1000)
+        np.testing.assert_array_equal(lam1, lam2)
+        np.testing.assert_array_equal(Q1, Q2)
+
     def test_degree(self):
         W = 0.3 * (np.ones((4, 4)) - np.diag(4 * [1]))
         G = graphs.Graph(W)
@@ -51,6 +197,46 @@ class TestCase(unittest.TestCase):
         np.testing.assert_allclose(G.d, 3 * np.ones([4]))
         np.testing.assert_allclose(G.dw, 3 * 0.3)
 
+    def test_connected_components(self):
+        # Two undirected components, the second one being a triangle.
+        W = np.zeros((6, 6))
+        W[0, 2] = W[2, 0] = 1
+        W[1, 3] = W[3, 4] = W[4, 1] = 2
+        W[3, 1] = W[4, 3] = W[1, 4] = 2
+        W[5, 0] = W[0, 5] = 3
+        G = graphs.Graph(W)
+        self.assertFalse(G.is_connected())
+        labels = G.connected_components()
+        self.assertIs(G.connected_components('weak'), labels)
+        self.assertEqual(len(np.unique(labels)), 2)
+        self.assertEqual(len(set(labels[[0, 2, 5]])), 1)
+        self.assertEqual(len(set(labels[[1, 3, 4]])), 1)
+        components = G.extract_components()
+        self.assertEqual(len(components), 2)
+        for C in components:
+            idx = C.info['orig_idx']
+            np.testing.assert_equal(C.W.toarray(), W[np.ix_(idx, idx)])
+            self.assertTrue(C.is_connected())
+            self.assertNotIn('sink', C.info)
+        # Directed: a cycle 0 -> 1 -> 2 -> 0 which feeds 3.
+        W = np.zeros((5, 5))
+        W[0, 1] = W[1, 2] = W[2, 0] = W[2, 3] = 1
+        G = graphs.Graph(W)
+        self.assertFalse(G.is_connected())
+        self.assertEqual(len(np.unique(G.connected_components('weak'))), 2)
+        self.assertEqual(len(np.unique(G.connected_components('strong'))), 3)
+        components = G.extract_components()
+        self.assertEqual(len(components), 2)
+        C = [C for C in components if C.N == 4][0]
+        np.testing.assert_equal(C.info['orig_idx'], [0, 1, 2, 3])
+        np.testing.assert_equal(C.info['sink'], [3])
+        np.testing.assert_equal(C.info['source'], [])
+        self.assertEqual(len(G.extract_components('strong')), 3)
+        self.assertRaises(ValueError, G.connected_components, 'mild')
+        W[3, 4] = W[4, 0] = 1
+        G = graphs.Graph(W)
+        self.assertTrue(G.is_connected())
+
     def test_laplacian(self):
         # TODO: should test correctness.
 
@@ -65,6 +251,131 @@ class TestCase(unittest.TestCase):
         self.assertRaises(NotImplementedError, G.compute_laplacian,
                           lap_type='normalized')
 
+    def test_solver(self):
+        W = sparse.block_diag([graphs.Sensor(50, seed=42).W,
+                               graphs.Ring(10).W, sparse.csr_matrix((1, 1))])
+        rs = np.random.RandomState(42)
+        b = rs.normal(size=(61, 3))
+        for lap_type in ['combinatorial', 'normalized']:
+            G = graphs.Graph(W, lap_type=lap_type)
+            L = G.L.toarray()
+            for method, preconditioner in [('direct', None), ('cg', 'jacobi'),
+                                           ('cg', 'ilu'), ('cg', 'amg')]:
+                solver = G.solver(0.1, method, preconditioner)
+                x = solver.solve(b, tol=1e-10)
+                np.testing.assert_allclose(L.dot(x) + 0.1 * x, b, atol=1e-8)
+                x = solver.solve(b[:, 0], tol=1e-10)
+                self.assertEqual(x.shape, (61,))
+                # Pseudo-inverse of the singular Laplacian, whatever the
+                # null space of each component.
+                solver = G.solver(0, method, preconditioner)
+                x = solver.solve(b, tol=1e-10)
+                np.testing.assert_allclose(x, np.linalg.pinv(L).dot(b),
+                                           atol=1e-8)
+        # The first access to a lazy Laplacian keeps the cache.
+        G2 = graphs.Graph.from_csr(W.tocsr())
+        self.assertIs(G2.solver(), G2.solver())
+        # Cached until the Laplacian changes.
+        self.assertIs(G.solver(0, 'cg', 'amg'), solver)
+        G.compute_laplacian('combinatorial')
+        self.assertIsNot(G.solver(0, 'cg', 'amg'), solver)
+        solver = G.solver()
+        G.add_edges(0, 60)
+        self.assertIsNot(G.solver(), solver)
+        # Float32 graphs, with float64 and float32 signals.
+        G = graphs.Graph(W, dtype=np.float32)
+        L = G.L.toarray().astype(np.float64)
+        for method, preconditioner in [('direct', None), ('cg', 'jacobi'),
+                                       ('cg', 'ilu'), ('cg', 'amg')]:
+            for shift in [0, 0.1]:
+                solver = G.solver(shift, method, preconditioner)
+                x = solver.solve(b, tol=1e-10)
+                self.assertEqual(x.dtype, np.float64)
+                residual = L.dot(x) + shift * x - solver._project(b.copy())
+                np.testing.assert_allclose(residual, 0, atol=1e-4)
+                x = solver.solve(b.astype(np.float32))
+                self.assertEqual(x.dtype, np.float32)
+        # Multigrid hierarchy on a larger graph.
+        G = graphs.Grid2d(40)
+        b = rs.normal(size=G.N)
+        x1 = G.solver(method='direct').solve(b)
+        x2 = G.solver(method='cg', preconditioner='amg').solve(b, tol=1e-10)
+        np.testing.assert_allclose(x1, x2, atol=1e-7)
+        # The preconditioners are symmetric positive definite.
+        G = graphs.Sensor(300, seed=42)
+        for preconditioner in ['jacobi', 'ilu', 'amg']:
+            solver = G.solver(0.1, 'cg', preconditioner)
+            M = solver._precondition(np.identity(G.N))
+            np.testing.assert_allclose(M, M.T, atol=1e-10)
+            self.assertGreater(np.linalg.eigvalsh(M).min(), 0)
+        self.assertRaises(ValueError, G.solver, method='lu')
+        self.assertRaises(ValueError, G.solver, method='cg',
+                          preconditioner='ichol')
+
+    def test_graph_coarsening(self):
+        from pygsp import reduction
+        W = sparse.block_diag([graphs.Sensor(100, seed=42).W,
+                               graphs.Ring(10).W, sparse.csr_matrix((1, 1))])
+        for method in ['heavy_edge', 'algebraic_distance']:
+            # Graphs without coordinates, and Laplacians.
+            for M in [graphs.Graph(W), graphs.Graph(W).L]:
+                Mc, P, R = reduction.graph_coarsening(M, method, seed=42)
+                self.assertEqual(P.shape, (111, R.shape[0]))
+                self.assertLess(R.shape[0], 111 * 0.7)
+                # Each node is in a single aggregate.
+                np.testing.assert_array_equal(P.sum(axis=1), 1)
+                np.testing.assert_allclose(R.dot(P).toarray(),
+                                           np.identity(R.shape[0]))
+                # Galerkin operator of the combinatorial Laplacian.
+                L = graphs.Graph(W).L
+                Lc = Mc.L if isinstance(Mc, graphs.Graph) else Mc
+                np.testing.assert_allclose(Lc.toarray(),
+                                           P.T.dot(L).dot(P).toarray(),
+                                           atol=1e-10)
+        G = graphs.Graph(W, coords=np.random.RandomState(42).uniform(
+            size=(111, 2)))
+        Gc, P, R = reduction.graph_coarsening(G, seed=42)
+        np.testing.assert_allclose(Gc.coords, R.dot(G.coords))
+        self.assertRaises(ValueError, reduction.graph_coarsening, G,
+                          method='kron')
+        Gs = reduction.graph_multiresolution(graphs.Graph(W), 2,
+                                             reduction_method='heavy_edge')
+        self.assertEqual(len(Gs), 3)
+        self.assertLess(Gs[2].N, Gs[1].N)
+        # Coarsened levels are interpolated without a dense Kron reduction.
+        self.assertEqual(sorted(Gs[0].mr), ['idx', 'orig_idx'])
+        s = np.arange(Gs[1].N, dtype=float)
+        x = reduction.interpolate(Gs[0], s, Gs[1].mr['idx'])
+        np.testing.assert_allclose(x[Gs[1].mr['idx']], s)
+        # The leaves of a hub are aggregated with it.
+        N = 2000
+        W = sparse.csr_matrix((np.ones(N - 1),
+                               (np.zeros(N - 1), np.arange(1, N))),
+                              shape=(N, N))
+        G = graphs.Graph(W + W.T)
+        Gc, P, R = reduction.graph_coarsening(G, seed=42)
+        self.assertEqual(Gc.N, 1)
+        b = np.random.RandomState(42).normal(size=N)
+        x = G.solver(0.1, method='cg', preconditioner='amg').solve(b)
+        np.testing.assert_allclose(G.L.dot(x) + 0.1 * x, b, atol=1e-6)
+
+    def test_interpolate(self):
+        from pygsp import reduction
+        G = graphs.Sensor(100, seed=42)
+        G.mr = dict()
+        keep = np.arange(0, G.N, 3)
+        s = np.random.RandomState(42).normal(size=(len(keep), 2))
+        for reg_eps in [0.005, 1]:
+            # Green kernel applied to the Kron reduction of the signal.
+            L_reg = G.L + reg_eps * sparse.identity(G.N)
+            x = np.zeros((G.N, 2))
+            x[keep] = reduction.kron_reduction(L_reg, keep).dot(s)
+            x = np.linalg.solve(L_reg.toarray(), x)
+            y = reduction.interpolate(G, s, keep, reg_eps=reg_eps)
+            np.testing.assert_allclose(y, x, atol=1e-10)
+        with self.assertWarns(DeprecationWarning):
+            reduction.interpolate(G, s, keep, order=100)
+
     def test_fourier_basis(self):
         # Smallest eigenvalue close to zero.
         np.testing.assert_allclose(self._G.e[0], 0, atol=1e-12)
@@ -78,6 +389,95 @@ class TestCase(unittest.TestCase):
         G.compute_fourier_basis()
         assert G.e[-1] < 2
 
+    def test_fourier_basis_partial(self):
+        G = graphs.Sensor(300, seed=42)
+        G.compute_fourier_basis()
+        e, U, lmax = G.e, G.U, G.lmax
+        for solver in ['lanczos', 'lobpcg']:
+            G = graphs.Sensor(300, seed=42)
+            G.compute_fourier_basis(n_eigenvectors=10, solver=solver)
+            self.assertEqual(G.U.shape, (G.N, 10))
+            np.testing.assert_allclose(G.e, e[:10], atol=1e-6)
+            # Same subspace, up to the sign of the eigenvectors.
+            np.testing.assert_allclose(np.abs(np.sum(G.U * U[:, :10], 0)),
+                                       1, atol=1e-4)
+            self.assertFalse(hasattr(G, '_lmax'))
+        # The random initial block of LOBPCG is seeded.
+        U = G.U
+        G.compute_fourier_basis(n_eigenvectors=10, solver='lobpcg',
+                                recompute=True)
+        np.testing.assert_array_equal(G.U, U)
+        # Blocks too large for LOBPCG are computed by the dense solver.
+        G2 = graphs.Sensor(30, seed=42)
+        e2 = np.linalg.eigvalsh(G2.L.toarray())
+        for which, index in [('smallest', slice(0, 7)),
+                             ('largest', slice(23, 30))]:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error')
+                G2.compute_fourier_basis(n_eigenvectors=7, which=which,
+                                         solver='lobpcg', recompute=True)
+            np.testing.assert_allclose(G2.e, e2[index], atol=1e-10)
+        G.compute_fourier_basis(n_eigenvectors=10, which='largest')
+        np.testing.assert_allclose(G.e, e[-10:])
+        np.testing.assert_allclose(G.lmax, lmax)
+        # Transforms and exact filtering operate on the truncated band.
+        G.compute_fourier_basis(n_eigenvectors=20, shift_invert=False)
+        s = self._rs.uniform(size=(G.N, 3))
+        s_hat = G.gft(s)
+        self.assertEqual(s_hat.shape, (20, 3))
+        np.testing.assert_allclose(G.gft(G.igft(s_hat)), s_hat, atol=1e-10)
+        self.assertRaises(ValueError, G.igft, s)
+        g = filters.Heat(G, 10)
+        s1 = g.filter(s, method='exact')
+        s2 = G.U.dot(g.evaluate(G.e)[0][:, np.newaxis] * G.U.T.dot(s))
+        np.testing.assert_allclose(s1, s2)
+        self.assertRaises(ValueError, G.compute_fourier_basis,
+                          n_eigenvectors=G.N + 1)
+        self.assertRaises(ValueError, G.compute_fourier_basis,
+                          n_eigenvectors=10, which='middle')
+        # Multilevel eigensolver, through a hierarchy of coarsened graphs.
+        W = sparse.block_diag([graphs.Grid2d(40).W,
+                               graphs.Sensor(1500, seed=42).W])
+        for lap_type in ['combinatorial', 'normalized']:
+            G = graphs.Graph(W, lap_type=lap_type)
+            G.compute_fourier_basis(n_eigenvectors=20)
+            e = G.e
+            G.compute_fourier_basis(n_eigenvectors=20, solver='multilevel',
+                                    recompute=True)
+            np.testing.assert_allclose(G.e, e, atol=1e-8)
+            np.testing.assert_allclose(G.U.T.dot(G.U), np.identity(20),
+                                       atol=1e-10)
+            self.assertLess(G._fourier_residual(), 1e-8)
+        # A warning if the finest level did not converge.
+        from pygsp.graphs import fourier
+        with self.assertLogs(fourier.logger, 'WARNING'):
+            fourier._multilevel_eigenvectors(G.L, 20, maxiter=1)
+        self.assertRaises(ValueError, G.compute_fourier_basis,
+                          n_eigenvectors=10, which='largest',
+                          solver='multilevel')
+
+    def test_fourier_basis_persistence(self):
+        path = tempfile.mkdtemp()
+        try:
+            self._G.save_fourier_basis(path)
+            G = graphs.Logo()
+            G.load_fourier_basis(path)
+            self.assertIsInstance(G.U, np.memmap)
+            self.assertFalse(G.U.flags.writeable)
+            np.testing.assert_equal(G.U, self._G.U)
+            np.testing.assert_equal(G.e, self._G.e)
+            self.assertEqual(G.mu, self._G.mu)
+            self.assertEqual(G.lmax, self._G.lmax)
+            G.load_fourier_basis(path, mmap=False)
+            self.assertNotIsInstance(G.U, np.memmap)
+            # Not the same graph.
+            G = graphs.Logo(lap_type='normalized')
+            self.assertRaises(ValueError, G.load_fourier_basis, path)
+            G = graphs.Sensor()
+            self.assertRaises(ValueError, G.load_fourier_basis, path)
+        finally:
+            shutil.rmtree(path)
+
     def test_eigendecompositions(self):
         G = graphs.Logo()
         U1, e1, V1 = scipy.linalg.svd(G.L.toarray())
@@ -157,6 +557,84 @@ class TestCase(unittest.TestCase):
         G = graphs.StochasticBlockModel(N=100, directed=True)
         self.assertRaises(NotImplementedError, G.compute_differential_operator)
 
+    def test_lattice(self):
+        # Matrix-free operators agree with the sparse matrices.
+        rs = np.random.RandomState(42)
+        for G in [graphs.Path(7), graphs.Ring(9), graphs.Ring(11, k=3),
+                  graphs.Grid2d(4, 5), graphs.Torus(5, 4)]:
+            self.assertTrue(hasattr(G, '_structure'))
+            self.assertFalse(hasattr(G, '_L'))
+            s = rs.uniform(size=(G.N, 3))
+            for lap_type in ['combinatorial', 'normalized']:
+                G.compute_laplacian(lap_type)
+                G.estimate_lmax(recompute=True)
+                e = np.linalg.eigvalsh(G.L.toarray())
+                self.assertAlmostEqual(G.lmax, e[-1])
+                L = G._scaled_laplacian()
+                np.testing.assert_allclose(L.dot(s), 2 * G.L.dot(s) / G.lmax
+                                           - s, atol=1e-12)
+                G.compute_differential_operator()
+                np.testing.assert_allclose(G.grad(s), G.D.dot(s),
+                                           atol=1e-12)
+                y = rs.uniform(size=(G.Ne, 2))
+                np.testing.assert_allclose(G.div(y), G.D.T.dot(y),
+                                           atol=1e-12)
+        # Edge edits fall back to the sparse matrices.
+        G = graphs.Path(5)
+        G.add_edges(0, 4)
+        self.assertFalse(hasattr(G, '_structure'))
+        G.compute_differential_operator()
+        np.testing.assert_allclose(G.grad(np.arange(5.)), [1, 1, 1, 4, 1])
+        # Single precision.
+        G = graphs.Grid2d(4, dtype=np.float32)
+        s = rs.uniform(size=G.N).astype(np.float32)
+        self.assertEqual(G._scaled_laplacian().dot(s).dtype, np.float32)
+        self.assertEqual(G.grad(s).dtype, np.float32)
+
+    def test_lattice_fourier(self):
+        # Closed-form Fourier bases diagonalize the Laplacian.
+        rs = np.random.RandomState(42)
+        for G in [graphs.Path(7), graphs.Ring(9), graphs.Ring(11, k=3),
+                  graphs.Grid2d(4, 5), graphs.Torus(5, 4)]:
+            s = rs.normal(size=(G.N, 2)) + 1j * rs.normal(size=(G.N, 2))
+            for lap_type in ['combinatorial', 'normalized']:
+                G.compute_laplacian(lap_type)
+                G.compute_fourier_basis(recompute=True)
+                closed = hasattr(G, '_fourier_closed_form')
+                self.assertEqual(closed, not (isinstance(G, graphs.Grid2d)
+                                              and lap_type == 'normalized'))
+                self.assertEqual(hasattr(G, '_U'), not closed)
+                e = np.linalg.eigvalsh(G.L.toarray())
+                np.testing.assert_allclose(G.e, e, atol=1e-12)
+                self.assertLess(G._fourier_residual(), 1e-12)
+                np.testing.assert_allclose(G.U.T.dot(G.U), np.identity(G.N),
+                                           atol=1e-12)
+                self.assertEqual(G.mu, np.max(np.abs(G.U)))
+                np.testing.assert_allclose(G.gft(s), G.U.T.dot(s),
+                                           atol=1e-12)
+                np.testing.assert_allclose(G.igft(G.gft(s)), s, atol=1e-12)
+                G.compute_fourier_basis(n_eigenvectors=4, which='largest')
+                np.testing.assert_allclose(G.e, e[-4:], atol=1e-12)
+                np.testing.assert_allclose(G.gft(s), G.U.T.dot(s),
+                                           atol=1e-12)
+                np.testing.assert_allclose(G.igft(s[:4]), G.U.dot(s[:4]),
+                                           atol=1e-12)
+        # Exact filtering without the dense basis.
+        G = graphs.Torus(40, 30)
+        s = rs.normal(size=G.N)
+        g = filters.Heat(G)
+        s1 = g.filter(s, method='exact')
+        self.assertFalse(hasattr(G, '_U'))
+        s2 = g.filter(s, method='chebyshev', order=40)
+        np.testing.assert_allclose(s1, s2, atol=1e-10)
+        # Edge edits fall back to the eigensolver.
+        G = graphs.Path(5)
+        G.compute_fourier_basis()
+        G.add_edges(0, 4)
+        G.compute_fourier_basis()
+        self.assertFalse(hasattr(G, '_fourier_closed_form'))
+        np.testing.assert_allclose(G.e, graphs.Ring(5).e, atol=1e-12)
+
     def test_difference(self):
         for lap_type in ['combinatorial', 'normalized']:
             G = graphs.Logo(lap_type=lap_type)
@@ -196,6 +674,29 @@ class TestCase(unittest.TestCase):
                 graphs.NNGraph(Xin, use_flann=True, NNtype='knn',
                                dist_type=dist_type)
 
+    def test_nngraph_construction(self):
+        X = self._rs.uniform(size=(100, 3))
+        X0 = X.copy()
+        G = graphs.NNGraph(X, k=5, symmetrize_type='maximum')
+        np.testing.assert_equal(X, X0)  # Input not modified.
+        self.assertTrue(np.all(G.d >= 5))
+        self.assertEqual(G.W.diagonal().sum(), 0)
+        np.testing.assert_allclose(G.coords.mean(axis=0), 0, atol=1e-12)
+        # Edge weights are a function of the distance between points.
+        i, j, w = G.get_edge_list()
+        d = np.linalg.norm(G.coords[i] - G.coords[j], axis=1)
+        np.testing.assert_allclose(w, np.exp(-d**2 / G.sigma))
+        G = graphs.NNGraph(X, NNtype='radius', epsilon=0.5, center=False,
+                           rescale=False)
+        np.testing.assert_equal(X, X0)
+        self.assertEqual(G.W.diagonal().sum(), 0)
+        i, j, w = G.get_edge_list()
+        d = np.linalg.norm(X[i] - X[j], axis=1)
+        self.assertTrue(np.all(d <= 0.5))
+        np.testing.assert_allclose(w, np.exp(-d**2 / G.sigma))
+        D = np.linalg.norm(X[:, np.newaxis] - X, axis=2)
+        self.assertEqual(G.Ne, (np.sum(D <= 0.5) - G.N) // 2)
+
     def test_bunny(self):
         graphs.Bunny()
 
@@ -296,6 +797,51 @@ class TestCase(unittest.TestCase):
         graphs.Grid2d(3, 2)
         graphs.Grid2d(3)
 
+    def test_productgraph(self):
+        rs = np.random.RandomState(42)
+        for kind in ['cartesian', 'kronecker', 'strong']:
+            for lap_type in ['combinatorial', 'normalized']:
+                G1 = graphs.Sensor(10, seed=42, lap_type=lap_type)
+                G2 = graphs.Ring(7, lap_type=lap_type)
+                G = graphs.ProductGraph(G1, G2, kind, lap_type=lap_type)
+                s = rs.normal(size=(G.N, 2))
+                G.estimate_lmax()
+                s1 = filters.Heat(G).filter(s, method='chebyshev')
+                # Neither W nor L is assembled by matrix-free operations.
+                self.assertFalse(hasattr(G, '_W'))
+                self.assertFalse(hasattr(G, '_L'))
+                H = graphs.Graph(G.W, lap_type=lap_type)
+                self.assertEqual(G.Ne, H.Ne)
+                np.testing.assert_allclose(G.dw, H.dw)
+                L = G._structure.laplacian(lap_type, G.dtype)
+                np.testing.assert_allclose(L.dot(s), H.L.dot(s), atol=1e-12)
+                H._lmax = G.lmax
+                s2 = filters.Heat(H).filter(s, method='chebyshev')
+                np.testing.assert_allclose(s1, s2, atol=1e-10)
+                G.compute_fourier_basis()
+                H.compute_fourier_basis()
+                self.assertGreaterEqual(G.lmax, H.lmax - 1e-10)
+                closed = hasattr(G, '_fourier_closed_form')
+                self.assertEqual(closed, (kind, lap_type) in [
+                    ('cartesian', 'combinatorial'),
+                    ('kronecker', 'normalized')])
+                np.testing.assert_allclose(G.e, H.e, atol=1e-12)
+                self.assertLess(G._fourier_residual(), 1e-12)
+                np.testing.assert_allclose(G.gft(s), G.U.T.dot(s),
+                                           atol=1e-12)
+                np.testing.assert_allclose(G.igft(G.gft(s)), s, atol=1e-12)
+        # Factors of another Laplacian type: no factorization.
+        G = graphs.ProductGraph(graphs.Path(4), graphs.Path(3),
+                                lap_type='normalized')
+        G.compute_fourier_basis()
+        self.assertFalse(hasattr(G, '_fourier_closed_form'))
+        # The product of two paths is a grid.
+        G = graphs.ProductGraph(graphs.Path(4), graphs.Path(3))
+        np.testing.assert_allclose(G.W.toarray(),
+                                   graphs.Grid2d(4, 3).W.toarray())
+        self.assertEqual(G.coords.shape, (12, 2))
+        self.assertRaises(ValueError, graphs.ProductGraph, G, G, 'lexical')
+
     def test_imgpatches(self):
         graphs.ImgPatches(img=self._img, patch_shape=(3, 3))
 
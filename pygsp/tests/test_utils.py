@@ -5,6 +5,9 @@ Test suite for the utils module of the pygsp package.
 
 """
 
+import os
+import shutil
+import tempfile
 import unittest
 
 import numpy as np
@@ -32,6 +35,115 @@ class TestCase(unittest.TestCase):
             np.testing.assert_equal(W1.toarray(), W2)
         self.assertRaises(ValueError, utils.symmetrize, W, 'sum')
 
+    def test_cache_dir(self):
+        path = tempfile.mkdtemp()
+        try:
+            utils.set_cache_dir(path)
+            self.assertEqual(utils.get_cache_dir(), path)
+            G1 = graphs.Sensor(50, seed=42)
+            G1.estimate_lmax()
+            lmax = G1.lmax
+            G1.compute_fourier_basis()
+            G1.compute_differential_operator()
+            G1.is_connected()
+            self.assertEqual(len(os.listdir(path)), 4)
+            # Results are loaded by another graph with the same weights.
+            G2 = graphs.Sensor(50, seed=42)
+            G2.estimate_lmax()
+            self.assertEqual(G2.lmax, lmax)
+            G2.compute_fourier_basis()
+            np.testing.assert_equal(G2.U, G1.U)
+            G2.compute_differential_operator()
+            np.testing.assert_equal(G2.D.toarray(), G1.D.toarray())
+            self.assertEqual(G2.is_connected(), G1.is_connected())
+            G3 = graphs.Sensor(50, seed=42, lap_type='normalized')
+            G3.estimate_lmax()
+            self.assertLessEqual(G3.lmax, 2.02)
+            self.assertEqual(len(os.listdir(path)), 5)
+            # Least recently used results are evicted.
+            filename = [f for f in os.listdir(path) if 'fourier' in f][0]
+            size = os.path.getsize(os.path.join(path, filename))
+            utils.set_cache_dir(path, max_size=size)
+            G1.compute_fourier_basis(recompute=True)
+            self.assertEqual(os.listdir(path), [filename])
+        finally:
+            utils.set_cache_dir(None)
+            shutil.rmtree(path)
+        self.assertIsNone(utils.get_cache_dir())
+
+    def test_default_dtype(self):
+        self.assertEqual(utils.get_default_dtype(), np.float64)
+        self.assertEqual(graphs.Path(4).W.dtype, np.float64)
+        try:
+            utils.set_default_dtype(np.float32)
+            self.assertEqual(utils.get_default_dtype(), np.float32)
+            G = graphs.Path(4)
+            self.assertEqual(G.dtype, np.float32)
+            self.assertEqual(G.L.dtype, np.float32)
+            G.compute_laplacian('normalized')
+            self.assertEqual(G.L.dtype, np.float32)
+            G = graphs.Path(4, dtype=np.float64)
+            self.assertEqual(G.L.dtype, np.float64)
+        finally:
+            utils.set_default_dtype(np.float64)
+        self.assertRaises(ValueError, utils.set_default_dtype, np.int64)
+        self.assertRaises(ValueError, graphs.Path, 4, dtype=np.float16)
+
+    def test_resistance_distance(self):
+        G = graphs.Sensor(100, seed=42)
+        pseudo = np.linalg.pinv(G.L.toarray())
+        rd = (np.diag(pseudo)[:, np.newaxis] + np.diag(pseudo)[np.newaxis, :]
+              - 2 * pseudo)
+        np.testing.assert_allclose(utils.resistance_distance(G).toarray(), rd,
+                                   atol=1e-10)
+        pairs = np.random.RandomState(42).randint(G.N, size=(200, 2))
+        rd1 = utils.resistance_distance(G, pairs)
+        np.testing.assert_allclose(rd1, rd[pairs[:, 0], pairs[:, 1]],
+                                   atol=1e-10)
+        # The factorization is reused.
+        solver = G.solver()
+        utils.resistance_distance(G, pairs[:10])
+        self.assertIs(G.solver(), solver)
+        rd1 = utils.resistance_distance(G.L, pairs)
+        np.testing.assert_allclose(rd1, rd[pairs[:, 0], pairs[:, 1]],
+                                   atol=1e-10)
+        rd1 = utils.resistance_distance(G, edges=True)
+        np.testing.assert_array_equal(rd1.nonzero(), G.W.nonzero())
+        np.testing.assert_allclose(rd1.toarray(), rd * (G.W != 0).toarray(),
+                                   atol=1e-10)
+        # Sum of the weighted resistances is N - 1 (Foster's theorem).
+        np.testing.assert_allclose(rd1.multiply(G.W).sum() / 2, G.N - 1)
+        # Random projections preserve the norms as their number grows.
+        pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+        rd1 = rd[pairs[:, 0], pairs[:, 1]]
+        rd2 = utils.resistance_distance(G, pairs, method='approximate',
+                                        seed=42)
+        self.assertLess(np.median(np.abs(rd2 / rd1 - 1)), 0.15)
+        rd2 = utils.resistance_distance(G, pairs, method='approximate',
+                                        n_projections=2000, seed=42)
+        self.assertLess(np.median(np.abs(rd2 / rd1 - 1)), 0.03)
+        # Edges are needed by sparsification, which favors the precision.
+        rd1 = utils.resistance_distance(G, edges=True)
+        rd2 = utils.resistance_distance(G, edges=True, method='approximate',
+                                        n_projections=2000, seed=42)
+        np.testing.assert_allclose(rd2.data, rd1.data, rtol=0.2)
+        # Foster's theorem holds for the estimates, within their tolerance.
+        rd2 = utils.resistance_distance(G, edges=True, method='approximate',
+                                        seed=42)
+        np.testing.assert_allclose(rd2.multiply(G.W).sum() / 2, G.N - 1,
+                                   rtol=0.05)
+        # Nodes of different components are infinitely distant.
+        G = graphs.Graph(sparse.block_diag([graphs.Path(3).W,
+                                            graphs.Ring(4).W]))
+        rd1 = utils.resistance_distance(G, [[0, 2], [3, 5], [1, 4], [6, 6]])
+        np.testing.assert_allclose(rd1, [2, 1, np.inf, 0])
+        rd2 = utils.resistance_distance(G, [[1, 4]], method='approximate',
+                                        seed=42)
+        np.testing.assert_array_equal(rd2, [np.inf])
+        self.assertRaises(ValueError, utils.resistance_distance, G, [0, 1])
+        self.assertRaises(ValueError, utils.resistance_distance, G,
+                          edges=True, method='lanczos')
+
     def test_utils(self):
         # Data init
         W1 = np.arange(16).reshape((4, 4))
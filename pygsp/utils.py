@@ -7,15 +7,18 @@ the package.
 
 from __future__ import division
 
+import os
 import sys
 import importlib
 import logging
 import functools
 import pkgutil
 import io
+import tempfile
 
 import numpy as np
 from scipy import sparse
+from scipy.sparse import csgraph
 import scipy.io
 
 
@@ -38,6 +41,13 @@ def build_logger(name):
 
 logger = build_logger(__name__)
 
+# Opt-in persistent cache of graph computations, see set_cache_dir().
+_cache = {'dir': None, 'max_size': None}
+
+# Floating point type of graphs built without an explicit dtype, see
+# set_default_dtype().
+_dtype = {'default': np.dtype(np.float64)}
+
 
 def graph_array_handler(func):
 
@@ -171,23 +181,88 @@ def distanz(x, y=None):
     return np.sqrt(d)
 
 
-def resistance_distance(G):
+def resistance_distance(G, pairs=None, edges=False, method='exact',
+                        n_projections=None, seed=None):
     r"""
     Compute the resistance distances of a graph.
 
+    The resistance distance between two nodes is the effective resistance
+    between them when the edges are resistors of conductance their weight.
+    Multiplied by the volume :math:`\sum_i d_i` of the graph, it is the
+    commute time of a random walk between them.
+
+    By default, the distances between all pairs of nodes are computed from
+    the inverse of the grounded Laplacian (see below), in :math:`O(N^3)`
+    operations and :math:`O(N^2)` memory. Large graphs should query some
+    ``pairs`` or the ``edges`` only:
+
+    * The 'exact' method factorizes the Laplacian grounded at a node of each
+      connected component, i.e., without the rows and columns of those
+      nodes, which makes it invertible. The factorization is cached by the
+      graph (see :meth:`pygsp.graphs.Graph.solver`) and reused by later
+      queries. The distance between nodes
+      :math:`i` and :math:`j` is then :math:`(\delta_i - \delta_j)^\top
+      x`, with :math:`x` the solution of the grounded system for
+      :math:`\delta_i - \delta_j`. The systems of many pairs are solved by
+      batches.
+    * The 'approximate' method projects the :math:`N_e` edges on
+      ``n_projections`` :math:`k` random directions, such that the
+      distances are norms of differences of vectors of dimension :math:`k`
+      :cite:`spielman2011graph`. It only needs :math:`k` solves, by the
+      conjugate gradient, whatever the number of pairs. The relative
+      standard deviation of each distance is at most :math:`\sqrt{2 / k}`.
+
     Parameters
     ----------
     G : Graph or sparse matrix
         Graph structure or Laplacian matrix (L)
+    pairs : array_like, optional
+        Pairs of nodes, of shape ``(n_pairs, 2)``, whose distances are
+        computed.
+    edges : bool
+        Whether to compute the distances between the nodes connected by an
+        edge only. Default is False.
+    method : {'exact', 'approximate'}
+        How to compute the distances of ``pairs`` or ``edges``. Default is
+        'exact'.
+    n_projections : int
+        Number of random projections of the 'approximate' method. Default is
+        :math:`\lceil 24 \log N \rceil`.
+    seed : int
+        Seed for the random projections.
 
     Returns
     -------
-    rd : sparse matrix
-        distance matrix
+    rd : sparse matrix or ndarray
+        Distance matrix if ``pairs`` is None. It is only filled at the edges
+        if ``edges`` is True. Distances of the pairs otherwise. Nodes in
+        different connected components are infinitely distant.
 
     References
     ----------
     :cite:`klein1993resistance`
+
+    Examples
+    --------
+    >>> from pygsp import utils
+    >>> G = graphs.Path(5)
+    >>> utils.resistance_distance(G, pairs=[[0, 4], [1, 2]])
+    array([4., 1.])
+    >>> rd = utils.resistance_distance(G, edges=True)
+    >>> rd.nnz == G.W.nnz
+    True
+
+    Resistances are estimated with the same relative error whatever the
+    number of nodes and pairs:
+
+    >>> G = graphs.Grid2d(30)
+    >>> pairs = np.stack([np.arange(100), G.N - 1 - np.arange(100)], axis=1)
+    >>> rd1 = utils.resistance_distance(G, pairs)
+    >>> rd2 = utils.resistance_distance(G, pairs, method='approximate',
+    ...                                 n_projections=200, seed=42)
+    >>> print('{:.2f}'.format(np.median(np.abs(rd2 / rd1 - 1))))
+    0.09
+
     """
 
     if sparse.issparse(G):
@@ -198,20 +273,118 @@ def resistance_distance(G):
             raise ValueError('Need a combinatorial Laplacian.')
         L = G.L.tocsc()
 
-    try:
-        pseudo = sparse.linalg.inv(L)
-    except RuntimeError:
-        pseudo = sparse.lil_matrix(np.linalg.pinv(L.toarray()))
+    from pygsp.graphs.solver import LaplacianSolver
+    if sparse.issparse(G):
+        solver = LaplacianSolver(L, kernel=np.ones(L.shape[0]))
+    else:
+        solver = G.solver()
+    _, labels = csgraph.connected_components(L, directed=False)
+
+    if pairs is None and not edges:
 
-    N = np.shape(L)[0]
-    d = sparse.csc_matrix(pseudo.diagonal())
-    rd = sparse.kron(d, sparse.csc_matrix(np.ones((N, 1)))).T \
-        + sparse.kron(d, sparse.csc_matrix(np.ones((N, 1)))) \
-        - pseudo - pseudo.T
+        pseudo = solver.solve(np.identity(L.shape[0]))
+        d = np.diag(pseudo)
+        rd = d[:, np.newaxis] + d[np.newaxis, :] - pseudo - pseudo.T
+        rd[labels[:, np.newaxis] != labels[np.newaxis, :]] = np.inf
+
+        return sparse.csc_matrix(rd)
+
+    if edges:
+        sources, targets, _ = sparse.find(sparse.triu(L, k=1))
+    else:
+        pairs = np.asanyarray(pairs)
+        if pairs.ndim != 2 or pairs.shape[1] != 2:
+            raise ValueError('Pairs should be of shape (n_pairs, 2), got '
+                             '{}.'.format(pairs.shape))
+        sources, targets = pairs[:, 0], pairs[:, 1]
+
+    if method == 'exact':
+        rd = np.empty(len(sources))
+        # Solve for delta_i - delta_j by batches.
+        for start in range(0, len(sources), 64):
+            i = sources[start:start + 64]
+            j = targets[start:start + 64]
+            columns = np.arange(len(i))
+            b = np.zeros((L.shape[0], len(i)))
+            np.add.at(b, (i, columns), 1)
+            np.add.at(b, (j, columns), -1)
+            x = solver.solve(b)
+            rd[start:start + 64] = x[i, columns] - x[j, columns]
+    elif method == 'approximate':
+        rd = _estimate_resistances(L, sources, targets,
+                                   n_projections=n_projections, seed=seed)
+    else:
+        raise ValueError('Unknown method {}.'.format(method))
+    rd[labels[sources] != labels[targets]] = np.inf
+
+    if edges:
+        rd = sparse.coo_matrix((rd, (sources, targets)), shape=L.shape)
+        rd = (rd + rd.T).tocsc()
 
     return rd
 
 
+def _estimate_resistances(L, sources, targets, n_projections=None,
+                          batch_size=32, tol=1e-4, seed=None):
+    r"""Estimate resistance distances with random projections.
+
+    The distance between nodes :math:`i` and :math:`j` is :math:`R_{ij} = \|
+    W^{1/2} B L^+ (\delta_i - \delta_j) \|^2`, where :math:`B` is the
+    incidence matrix of the graph. A random projection :math:`Q` of the
+    :math:`N_e` rows on ``n_projections`` :math:`k = O(\log N /
+    \epsilon^2)` rows preserves them up to a factor :math:`1 \pm \epsilon`
+    :cite:`spielman2011graph`. The distances are estimated from the
+    :math:`k` solutions of :math:`L z = B^\top W^{1/2} q`, computed by
+    batches of ``batch_size`` with a preconditioned conjugate gradient.
+    Time is thus :math:`O(k N_e)` per iteration, and memory :math:`O(N_e +
+    N \cdot batch\_size)`, instead of :math:`O(N^3)` and :math:`O(N^2)`
+    for the pseudo-inverse.
+
+    Parameters
+    ----------
+    L : sparse matrix
+        Combinatorial Laplacian, whose off-diagonal entries define the edges
+        of the incidence matrix.
+    sources, targets : ndarray
+        Pairs of nodes whose distances are estimated.
+    n_projections : int
+        Number of random projections :math:`k`. The relative standard
+        deviation of each estimate is at most :math:`\sqrt{2 / k}`. Default
+        is :math:`\lceil 24 \log N \rceil`, i.e., about 0.1 for a thousand
+        nodes. That is plenty for sparsification, which only needs the
+        resistances up to a constant factor.
+    tol : float
+        Relative residual at which the conjugate gradient stops. Its error
+        mostly lies in the smooth eigenvectors, which differ little across an
+        edge but much between distant nodes. A tolerance of 1e-2 is thus
+        enough for edges, while the default of 1e-4 suits any pair.
+    """
+    rs = np.random.RandomState(seed)
+    n_nodes = L.shape[0]
+    if n_projections is None:
+        n_projections = int(np.ceil(24 * np.log(max(n_nodes, 2))))
+
+    # B^T W^{1/2}, of shape (N, Ne).
+    W = sparse.tril(L, k=-1).tocoo()
+    n_edges = W.nnz
+    edges = np.arange(n_edges)
+    sqrt_w = np.sqrt(np.maximum(-W.data, 0))
+    incidence = sparse.csr_matrix(
+        (np.concatenate([sqrt_w, -sqrt_w]),
+         (np.concatenate([W.row, W.col]), np.concatenate([edges, edges]))),
+        shape=(n_nodes, n_edges))
+
+    from pygsp.graphs.solver import LaplacianSolver
+    solver = LaplacianSolver(L, method='cg', kernel=np.ones(n_nodes))
+    resistances = np.zeros(len(sources))
+    for start in range(0, n_projections, batch_size):
+        n = min(batch_size, n_projections - start)
+        Q = rs.choice([-1., 1.], size=(n_edges, n))
+        Z = solver.solve(incidence.dot(Q), tol=tol)
+        resistances += np.sum((Z[sources] - Z[targets])**2, axis=1)
+    return resistances / n_projections
+
+
 def symmetrize(W, method='average'):
     r"""
     Symmetrize a square matrix.
@@ -401,6 +574,173 @@ def repmatline(A, ncol=1, nrow=1):
     return np.repeat(np.repeat(A, ncol, axis=1), nrow, axis=0)
 
 
+def set_cache_dir(path, max_size=None):
+    r"""Set the directory where graph computations are cached.
+
+    Once set, the results of :meth:`pygsp.graphs.Graph.estimate_lmax`,
+    :meth:`pygsp.graphs.Graph.compute_fourier_basis`,
+    :meth:`pygsp.graphs.Graph.compute_differential_operator`, and
+    :meth:`pygsp.graphs.Graph.is_connected` are saved in that directory and
+    loaded back instead of being recomputed, by any process, for any graph
+    with the same weight matrix and Laplacian type.
+
+    Parameters
+    ----------
+    path : string or None
+        Cache directory. It is created if it does not exist. None disables
+        the cache (the default).
+    max_size : int or None
+        Maximum size of the cache, in bytes. The least recently used results
+        are removed when it is exceeded. The size is unlimited if None.
+
+    Examples
+    --------
+    >>> import shutil
+    >>> import tempfile
+    >>> path = tempfile.mkdtemp()
+    >>> utils.set_cache_dir(path, max_size=100e6)
+    >>> G = graphs.Logo()
+    >>> G.compute_fourier_basis()  # Computed and saved.
+    >>> G = graphs.Logo()
+    >>> G.compute_fourier_basis()  # Loaded.
+    >>> utils.set_cache_dir(None)
+    >>> del G  # Close the memory-mapped basis.
+    >>> shutil.rmtree(path)
+
+    """
+    if path is not None and not os.path.isdir(path):
+        os.makedirs(path)
+    _cache['dir'] = path
+    _cache['max_size'] = max_size
+
+
+def get_cache_dir():
+    r"""Return the directory where graph computations are cached, or None.
+
+    See :func:`set_cache_dir`.
+    """
+    return _cache['dir']
+
+
+def set_default_dtype(dtype):
+    r"""Set the floating point type of graphs constructed without a dtype.
+
+    The weight matrix of a graph is converted to that type, which then
+    propagates to the Laplacian, the Fourier basis, the differential
+    operator, and the filtered signals. Single precision halves the memory
+    and bandwidth needed, at the cost of accuracy.
+
+    Parameters
+    ----------
+    dtype : data-type
+        Either ``np.float32`` or ``np.float64`` (the default).
+
+    Examples
+    --------
+    >>> utils.set_default_dtype(np.float32)
+    >>> G = graphs.Ring(10)
+    >>> G.dtype, G.L.dtype
+    (dtype('float32'), dtype('float32'))
+    >>> utils.set_default_dtype(np.float64)
+
+    """
+    _dtype['default'] = _check_dtype(dtype)
+
+
+def get_default_dtype():
+    r"""Return the floating point type of graphs constructed without a dtype.
+
+    See :func:`set_default_dtype`.
+    """
+    return _dtype['default']
+
+
+def _check_dtype(dtype):
+    dtype = np.dtype(dtype)
+    if dtype not in [np.float32, np.float64]:
+        raise ValueError('The dtype should be float32 or float64, got '
+                         '{}.'.format(dtype))
+    return dtype
+
+
+def _signal_dtype(s, dtype):
+    r"""Type of the computations on signals s with an operator of dtype.
+
+    Floating point and complex signals are not downcasted, and the operator
+    is not upcasted. Other signals (e.g. integers) take the operator's type.
+    """
+    s = np.asanyarray(s)
+    if s.dtype.kind in 'fc':
+        return np.result_type(s.dtype, dtype)
+    return np.dtype(dtype)
+
+
+def _cache_path(G, name, laplacian):
+    key = G._hash(laplacian=laplacian)
+    return os.path.join(_cache['dir'], '{}-{}.npz'.format(key, name))
+
+
+def _cache_load(G, name, laplacian=True):
+    r"""Load arrays cached for a graph, or return None if not cached.
+
+    Set laplacian to False if the result does not depend on the Laplacian.
+    """
+    if _cache['dir'] is None:
+        return None
+    path = _cache_path(G, name, laplacian)
+    try:
+        with np.load(path) as data:
+            arrays = dict(data)
+    except (IOError, ValueError):
+        # Missing (or concurrently evicted) entry, or corrupted file.
+        return None
+    try:
+        os.utime(path, None)  # Mark as recently used.
+    except OSError:
+        pass
+    return arrays
+
+
+def _cache_save(G, name, laplacian=True, **arrays):
+    r"""Cache arrays for a graph, then evict the least recently used ones."""
+    if _cache['dir'] is None:
+        return
+    # Write to a temporary file first such that concurrent readers never see
+    # a partially written entry.
+    fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=_cache['dir'])
+    with os.fdopen(fd, 'wb') as f:
+        np.savez(f, **arrays)
+    path = _cache_path(G, name, laplacian)
+    try:
+        os.rename(tmp, path)
+    except OSError:  # Windows does not replace existing files.
+        os.remove(tmp)
+    _cache_evict()
+
+
+def _cache_evict():
+    if _cache['max_size'] is None:
+        return
+    entries = []
+    for filename in os.listdir(_cache['dir']):
+        if not filename.endswith('.npz'):
+            continue
+        try:
+            stat = os.stat(os.path.join(_cache['dir'], filename))
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, filename))
+    size = sum(entry[1] for entry in entries)
+    for _, filesize, filename in sorted(entries):
+        if size <= _cache['max_size']:
+            break
+        try:
+            os.remove(os.path.join(_cache['dir'], filename))
+        except OSError:
+            pass
+        size -= filesize
+
+
 def import_modules(names, src, dst):
     """Import modules in package."""
     for name in names:
@@ -26,9 +26,11 @@ setup(
     ],
     package_data={'pygsp': ['data/pointclouds/*.mat']},
     test_suite='pygsp.tests.test_all.suite',
+    python_requires='>=3.7',
     install_requires=[
         'numpy',
-        'scipy',
+        # scipy.fft (1.4) and cKDTree.query(workers=...) (1.6).
+        'scipy>=1.6',
     ],
     extras_require={
         # Optional dependencies for some functionalities.
@@ -36,8 +38,7 @@ setup(
             # Construct patch graphs from images.
             'scikit-image',
             # Approximate nearest neighbors for kNN graphs.
-            'pyflann; python_version == "2.*"',
-            'pyflann3; python_version == "3.*"',
+            'pyflann3',
             # Convex optimization on graph.
             'pyunlocbox',
             # Plot graphs, signals, and filters.
@@ -45,10 +46,7 @@ setup(
             # Interactive graph visualization.
             'pyqtgraph',
             'PyOpenGL',
-            # PyQt5 is only available on PyPI as wheels for Python 3.5 and up.
-            'PyQt5; python_version >= "3.5"',
-            # No source package for PyQt5 on PyPI, fall back to PySide.
-            'PySide; python_version < "3.5"',
+            'PyQt5',
         ),
         # Testing dependencies.
         'test': [
@@ -82,9 +80,9 @@ setup(
         'License :: OSI Approved :: BSD License',
         'Natural Language :: English',
         'Operating System :: OS Independent',
-        'Programming Language :: Python :: 2.7',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
     ],
 )